@@ -44,6 +44,7 @@ INSTALLED_APPS = [
     "accounts",
     "library",
     "user_preferences",
+    "ai_features",
 ]
 
 MIDDLEWARE = [
@@ -82,6 +83,13 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "OPTIONS": {
+            # Take the write lock at BEGIN so concurrent writers (e.g. parallel
+            # document chunks storing results) wait instead of failing with
+            # "database is locked" when a read transaction upgrades to a write.
+            "transaction_mode": "IMMEDIATE",
+            "timeout": 20,
+        },
     }
 }
 
@@ -106,6 +114,8 @@ CORS_ALLOW_HEADERS = [
     "x-csrftoken",
     "x-requested-with",
 ]
+# Let the frontend read rate-limit headers so it can back off
+CORS_EXPOSE_HEADERS = ["Retry-After", "X-RateLimit-Limit", "X-RateLimit-Remaining"]
 
 
 # Password validation
@@ -163,6 +173,37 @@ USE_I18N = True
 USE_TZ = True
 
 
+# Shared cache — visible to every worker process (request coalescing, ...).
+# Uses Redis when REDIS_URL is set, otherwise database tables that the
+# ai_features and library migrations create (python manage.py createcachetable).
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        },
+        "progress": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+            "KEY_PREFIX": "progress",
+        },
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "django_cache",
+        },
+        # Buffered reading progress (library/progress.py). Its own table, so
+        # culling the default cache never drops updates not yet written.
+        "progress": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "library_progress_cache",
+            "OPTIONS": {"MAX_ENTRIES": 100_000},
+        },
+    }
+
+
 # Static files
 STATIC_URL = "static/"
 
@@ -170,9 +211,134 @@ STATIC_URL = "static/"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Uploads are hashed while they are received and stored once per distinct
+# contents (library.models.Blob)
+FILE_UPLOAD_HANDLERS = [
+    "library.uploads.HashingMemoryFileUploadHandler",
+    "library.uploads.HashingTemporaryFileUploadHandler",
+]
+# TXT/MD/HTML/RTF blobs are stored compressed: "gzip", "zstd" (needs the
+# zstandard package; gzip otherwise) or "" to store them raw
+LIBRARY_COMPRESSION = os.getenv("LIBRARY_COMPRESSION", "gzip")
+
+# Resumable chunked uploads (/api/library/uploads/, library/uploads.py)
+LIBRARY_UPLOAD_DIR = os.getenv("LIBRARY_UPLOAD_DIR", str(BASE_DIR / "data" / "uploads"))
+LIBRARY_UPLOAD_CHUNK_BYTES = 8 * 1024 * 1024   # largest PUT accepted
+LIBRARY_UPLOAD_MAX_BYTES = int(os.getenv("LIBRARY_UPLOAD_MAX_BYTES", 1024 ** 3))
+LIBRARY_UPLOAD_SESSION_TTL = 60 * 60 * 24      # seconds an idle upload is kept
+
+# GET /api/library/files/<pk>/serve/ (library/serving.py)
+LIBRARY_SERVE_MAX_AGE = 3600   # seconds a browser may reuse a file without revalidating
+# "x-accel-redirect" (nginx) or "x-sendfile" (Apache/lighttpd): the front proxy
+# sends the bytes. For nginx, map LIBRARY_SENDFILE_PREFIX to MEDIA_ROOT in an
+# `internal` location.
+LIBRARY_SENDFILE = os.getenv("LIBRARY_SENDFILE", "")
+LIBRARY_SENDFILE_PREFIX = os.getenv("LIBRARY_SENDFILE_PREFIX", "/protected-media/")
+
+# Write-behind buffer for reading progress (/api/library/progress/sync/,
+# library/progress.py)
+LIBRARY_PROGRESS_CACHE = "progress"
+LIBRARY_PROGRESS_FLUSH_INTERVAL = int(os.getenv("LIBRARY_PROGRESS_FLUSH_INTERVAL", 10))  # seconds
+LIBRARY_PROGRESS_SYNC_MAX = 500   # updates per sync request
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # HuggingFace Inference API key
 HF_API_KEY = os.getenv("HF_API_KEY", "")
 
+# LLM gateway — ordered fallback chain of chat models per AI task.
+# Override a chain with a comma-separated env var, e.g.
+# AI_SIMPLIFY_MODELS="meta-llama/Llama-3.2-1B-Instruct,Qwen/Qwen2.5-7B-Instruct"
+_DEFAULT_CHAT_MODELS = "meta-llama/Llama-3.2-1B-Instruct,meta-llama/Llama-3.1-8B-Instruct,Qwen/Qwen2.5-7B-Instruct"
+AI_MODEL_CHAINS = {
+    "simplify": os.getenv("AI_SIMPLIFY_MODELS", _DEFAULT_CHAT_MODELS).split(","),
+    "structure": os.getenv("AI_STRUCTURE_MODELS", _DEFAULT_CHAT_MODELS).split(","),
+}
+# Any OpenAI-compatible server (e.g. a local stub) instead of HuggingFace routing
+AI_INFERENCE_BASE_URL = os.getenv("AI_INFERENCE_BASE_URL") or None
+AI_REQUEST_TIMEOUT = float(os.getenv("AI_REQUEST_TIMEOUT", 25))  # seconds
+# Hedging: fire the next model if the first hasn't answered within its p95
+AI_HEDGE = os.getenv("AI_HEDGE", "False") == "True"
+AI_HEDGE_MIN_DELAY = float(os.getenv("AI_HEDGE_MIN_DELAY", 2.0))  # seconds
+# Whole-document mode — chunk size, parallel model calls per document, size cap
+AI_CHUNK_TOKENS = int(os.getenv("AI_CHUNK_TOKENS", 375))
+AI_DOCUMENT_CONCURRENCY = int(os.getenv("AI_DOCUMENT_CONCURRENCY", 4))
+AI_DOCUMENT_MAX_CHUNKS = int(os.getenv("AI_DOCUMENT_MAX_CHUNKS", 200))
+# Batched {"paragraphs": [...]} mode — many short paragraphs per model call
+AI_BATCH_TOKENS = int(os.getenv("AI_BATCH_TOKENS", 1200))  # input tokens packed into one call
+AI_BATCH_MAX_PARAGRAPHS = 8     # passages per call, however short
+AI_BATCH_OUTPUT_TOKENS = 2400   # max_tokens for one batched call
+AI_BATCH_MAX_REQUEST = 50       # paragraphs per request
+# /structure/ backend: llm | extractive (local TF-IDF + TextRank) | instant | fallback
+# ("fallback" answers locally on timeouts / cold starts / rate limits only;
+# auth and configuration errors still come back as errors)
+AI_STRUCTURE_ENGINE = os.getenv("AI_STRUCTURE_ENGINE", "fallback")
+AI_EXTRACTIVE_BULLETS = 6       # max bullets from the local engine
+AI_WARM_WORKERS = 2             # background model calls behind "instant" answers
+# Identical in-flight requests wait at most this long for the shared upstream call
+AI_SINGLEFLIGHT_TIMEOUT = float(os.getenv("AI_SINGLEFLIGHT_TIMEOUT", 60))  # seconds
+
+# AI result cache — completions keyed by (endpoint, model, prompt, text hash).
+# Entries live in the database so every worker shares them and they survive
+# restarts; the least recently used rows are evicted past AI_CACHE_MAX_ENTRIES.
+AI_CACHE_TTL = int(os.getenv("AI_CACHE_TTL", 60 * 60 * 24 * 7))  # seconds
+AI_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", 20000))
+
+# Background jobs (python manage.py run_jobs) — precompute AI output on upload
+AI_PRECOMPUTE_ON_UPLOAD = os.getenv("AI_PRECOMPUTE_ON_UPLOAD", "True") == "True"
+AI_PRECOMPUTE_PARAGRAPHS = int(os.getenv("AI_PRECOMPUTE_PARAGRAPHS", 5))  # hardest N per file
+AI_PRECOMPUTE_MAX_SCORE = 60    # only paragraphs below this Flesch score
+AI_PRECOMPUTE_MIN_WORDS = 30    # ignore headings and captions
+AI_JOB_MAX_ATTEMPTS = 3
+AI_JOB_RETRY_BACKOFF = 10       # seconds, doubled per attempt
+AI_JOB_LEASE_SECONDS = 600      # running jobs older than this are re-queued
+
+# Offline dictionary for /api/ai/explain/ (python manage.py build_dictionary);
+# dictionaryapi.dev is only asked for words the local index does not have
+AI_DICTIONARY_PATH = os.getenv("AI_DICTIONARY_PATH", str(BASE_DIR / "data" / "dictionary.sqlite3"))
+AI_DICTIONARY_REMOTE = os.getenv("AI_DICTIONARY_REMOTE", "True") == "True"
+AI_DICTIONARY_TIMEOUT = 8       # seconds, remote fallback only
+AI_DICTIONARY_CONCURRENCY = 8   # remote lookups in flight per batch
+AI_DICTIONARY_CACHE_TTL = 60 * 60 * 24 * 30   # remote definitions
+AI_DICTIONARY_MISS_TTL = 60 * 60 * 24         # remote "not found" answers
+AI_EXPLAIN_BATCH_MAX = 50       # words per /api/ai/explain/batch/ request
+
+# Rate limits for endpoints that spend upstream quota (ai_features/throttling.py).
+# "<scope>" is per user, "<scope>_global" is shared by everyone; None disables.
+AI_THROTTLE_RATES = {
+    "ai": os.getenv("AI_THROTTLE_AI", "30/min"),
+    "ai_global": os.getenv("AI_THROTTLE_AI_GLOBAL", "600/min"),
+    "explain": os.getenv("AI_THROTTLE_EXPLAIN", "300/min"),
+    "explain_global": None,
+    "translate": os.getenv("AI_THROTTLE_TRANSLATE", "30/min"),
+    "translate_global": os.getenv("AI_THROTTLE_TRANSLATE_GLOBAL", "300/min"),
+}
+AI_THROTTLE_MAX_IN_FLIGHT = int(os.getenv("AI_THROTTLE_MAX_IN_FLIGHT", 3))  # per user, per scope
+
+# /api/ai/agent/optimize-reading/ analyses whole files up to this many characters
+AI_ANALYZE_MAX_CHARS = 10_000_000
+
+# Per-document difficulty annotations (/api/ai/annotate/), stored as JSON Lines
+AI_ANNOTATION_DIR = os.getenv("AI_ANNOTATION_DIR", str(BASE_DIR / "data" / "annotations"))
+AI_ANNOTATION_CACHE_FILES = 2000   # oldest-used documents are evicted beyond this
+
+# POST /api/ai/agent/optimize-reading/batch/ — analysis runs in a process pool
+AI_ANALYZE_WORKERS = int(os.getenv("AI_ANALYZE_WORKERS", 0)) or None   # None = one per CPU core
+AI_OPTIMIZE_BATCH_MAX = 500     # file ids + texts per request
+
+# Server-side text extraction (ai_features/extraction.py): one isolated process
+# per upload, page-indexed output under AI_TEXT_STORE_DIR
+AI_TEXT_STORE_DIR = os.getenv("AI_TEXT_STORE_DIR", str(BASE_DIR / "data" / "text"))
+AI_TEXT_PAGE_CHARS = 3000        # page size for formats without pages (TXT/MD/HTML/RTF)
+AI_EXTRACT_TIMEOUT = 120         # wall-clock seconds per document
+AI_EXTRACT_CPU_SECONDS = 60
+AI_EXTRACT_MEMORY_MB = 1024      # address-space limit of the extraction process
+
+# Reading agent stages, run in order (ai_features/agent/stages.py)
+AI_AGENT_STAGES = [
+    "ai_features.agent.stages.AnalyzeStage",
+    "ai_features.agent.stages.DecideStage",
+    "ai_features.agent.stages.RespondStage",
+]
+AI_AGENT_TRACE = os.getenv("AI_AGENT_TRACE", "False") == "True"   # always attach stage timings
@@ -1,3 +1,23 @@
 from django.contrib import admin
+from .models import CachedResult, CacheCounter, Job
 
-# Register your models here.
+
+@admin.register(CachedResult)
+class CachedResultAdmin(admin.ModelAdmin):
+    list_display = ["endpoint", "model", "hits", "last_used_at", "expires_at"]
+    list_filter = ["endpoint", "model"]
+    search_fields = ["key", "result"]
+    readonly_fields = ["key", "created_at", "last_used_at", "hits"]
+
+
+@admin.register(CacheCounter)
+class CacheCounterAdmin(admin.ModelAdmin):
+    list_display = ["endpoint", "hits", "misses"]
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ["id", "kind", "status", "user", "file", "attempts", "created_at", "finished_at"]
+    list_filter = ["kind", "status"]
+    search_fields = ["user__email", "file__title", "error"]
+    readonly_fields = ["created_at", "updated_at", "finished_at", "locked_by", "locked_at"]
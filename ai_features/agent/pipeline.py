@@ -1,37 +1,33 @@
-from .tools import TextAnalyzerTool
-from .decision import DecisionEngine
+from .stages import load_stages, run_timed
 
 class ReadingOptimizationAgent:
     """
     Agentic Pipeline that orchestrates the Reading Optimizer functionality.
+    Runs its stages (analyze → decide → respond by default; see stages.py)
+    and times each one.
     """
 
-    def __init__(self):
-        self.analyzer = TextAnalyzerTool()
-        self.decision_engine = DecisionEngine()
+    def __init__(self, stages: list = None):
+        self.stages = stages if stages is not None else load_stages()
 
-    def process_text(self, text: str, current_settings: dict) -> dict:
+    def process_text(self, text: str, current_settings: dict, trace: bool = False) -> dict:
         """
         Main runner:
         1. Analyzes text density and readability.
         2. Decides the best reading UI settings based on the metrics.
         3. Returns the formulated JSON response.
+        With ``trace``, per-stage timings are added to analysis_details.
         """
-        # Step 1: Analyze
-        analysis_result = self.analyzer.calculate_readability(text)
-        readability_score = analysis_result.get("readability_score", 100.0)
+        return self._run({"text": text, "current_settings": current_settings}, trace)
 
-        # Step 2: Decide
-        recommended_settings, actions_taken, difficulty = self.decision_engine.decide_settings(
-            readability_score=readability_score,
-            current_settings=current_settings
-        )
+    def process_analysis(self, analysis_result: dict, current_settings: dict, trace: bool = False) -> dict:
+        """Steps 2–3 for an analysis computed earlier (e.g. a stored FileAnalysis)."""
+        return self._run({"analysis": analysis_result, "current_settings": current_settings}, trace)
 
-        # Step 3: Respond
-        return {
-            "readability_score": readability_score,
-            "difficulty_level": difficulty,
-            "recommended_settings": recommended_settings,
-            "actions_taken": actions_taken,
-            "analysis_details": analysis_result
-        }
+    def _run(self, context: dict, trace: bool) -> dict:
+        timings = [run_timed(stage, context) for stage in self.stages]
+        result = context["result"]
+        if trace:
+            # A copy: the analysis may be shared (FileAnalysis rows, caches).
+            result["analysis_details"] = {**result["analysis_details"], "timings": timings}
+        return result
@@ -0,0 +1,102 @@
+"""
+Process pool for batch reading analysis.
+
+Scoring is pure Python and CPU-bound, so threads would serialise on the GIL;
+a pool of worker processes (one per core by default) scales with the
+machine instead. Workers are started with "spawn" — they only import this
+package, never Django's app registry or a forked copy of the web worker's
+threads and connections — and are reused across requests.
+
+Files on local storage are read (and decompressed) by the worker itself, so
+only a path crosses the process boundary; other inputs are sent as text.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from library.compression import open_path
+from .pipeline import ReadingOptimizationAgent
+from .stages import load_stages, record, stage_paths
+
+_pool = None
+_lock = threading.Lock()
+
+
+def workers() -> int:
+    return getattr(settings, "AI_ANALYZE_WORKERS", None) or os.cpu_count() or 1
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers(), mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def reset():
+    """Discards the pool, e.g. after a worker died and broke it."""
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def optimize(text: str, path: str, current_settings: dict, max_chars: int, stages: tuple) -> dict:
+    """
+    Runs in a worker: ReadingOptimizationAgent.process_text on ``text`` or
+    the file at ``path``, always traced so the parent can record the timings.
+    """
+    if path is not None:
+        with open_path(path) as f:   # compressed text blobs read transparently
+            text = f.read(max_chars * 4).decode("utf-8", errors="replace")
+    agent = ReadingOptimizationAgent(stages=load_stages(stages))
+    return agent.process_text(text=text[:max_chars], current_settings=current_settings, trace=True)
+
+
+def _untrace(result: dict, trace: bool) -> dict:
+    """Records a worker's stage timings here (its histograms die with it)."""
+    details = result["analysis_details"]
+    for timing in details["timings"]:
+        record(timing)
+    if not trace:
+        result["analysis_details"] = {k: v for k, v in details.items() if k != "timings"}
+    return result
+
+
+def optimize_many(items: list, current_settings: dict, trace: bool = False):
+    """
+    ``items`` are (text, path) pairs. Yields (index, result, error) in
+    completion order; one failing item never fails the others.
+    """
+    max_chars = getattr(settings, "AI_ANALYZE_MAX_CHARS", 10_000_000)
+    stages = stage_paths()
+    pool = get_pool()
+    try:
+        futures = {
+            pool.submit(optimize, text, path, current_settings, max_chars, stages): index
+            for index, (text, path) in enumerate(items)
+        }
+    except BrokenProcessPool as e:
+        reset()
+        for index in range(len(items)):
+            yield index, None, e
+        return
+
+    broken = False
+    for future in as_completed(futures):
+        try:
+            yield futures[future], _untrace(future.result(), trace), None
+        except BrokenProcessPool as e:
+            broken = True
+            yield futures[future], None, e
+        except Exception as e:
+            yield futures[future], None, e
+    if broken:
+        reset()
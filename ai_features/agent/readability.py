@@ -0,0 +1,237 @@
+"""
+Fast readability engine behind TextAnalyzerTool.calculate_readability.
+
+Returns exactly what the original implementation
+(TextAnalyzerTool.reference_readability) returns, but:
+
+* words are tokenized once with a precompiled pattern, and sentences are
+  counted by one scan of a precompiled segment pattern — no list of split
+  segments and no per-segment ``strip()``;
+* syllables are counted once per distinct word: occurrences are tallied
+  with ``Counter`` (C speed) and each distinct word's syllable count comes
+  from a per-process memo, so the three syllable regexes run once per new
+  word rather than once per occurrence. The memo keeps the first MEMO_SIZE
+  distinct words it sees; rarer ones past that are counted each time.
+
+That makes whole books practical: see ``python manage.py bench_readability``.
+"""
+
+import re
+from collections import Counter
+
+_WORD_RE = re.compile(r"\w+")
+# One match per non-empty sentence: it starts at the first non-space,
+# non-terminator character of a segment and runs to the next terminator —
+# the same segments the original keeps after re.split(r'[.!?]+') + strip().
+_SEGMENT_RE = re.compile(r"[^\s.!?][^.!?]*")
+_VOWEL_GROUP_RE = re.compile(r"[aeiouy]{1,2}")
+
+MEMO_SIZE = 100_000   # distinct words remembered per process
+
+_syllables = {}
+
+
+def count_syllables(word: str) -> int:
+    """
+    Same heuristic as TextAnalyzerTool._count_syllables. Its two anchored
+    substitutions (silent "-es" / "-ed" / "-e", leading "y") are done with
+    character tests; only the vowel-group count is a (precompiled) regex.
+    """
+    word = word.lower()
+    if len(word) <= 3:
+        return 1
+    last = word[-1]
+    if last == "e":
+        if word[-2] not in "laeiouy":
+            word = word[:-2]
+    elif last == "s":
+        if word[-2] == "e" and word[-3] not in "laeiouy":
+            word = word[:-3]
+    elif last == "d" and word[-2] == "e":
+        word = word[:-2]
+    if word[0] == "y":
+        word = word[1:]
+    return len(_VOWEL_GROUP_RE.findall(word)) or 1
+
+
+def count(text: str) -> tuple:
+    """Returns (words, sentences, syllables) for ``text``."""
+    memo = _syllables
+    words = _WORD_RE.findall(text)
+    syllables = 0
+    for word, occurrences in Counter(words).items():
+        n = memo.get(word)
+        if n is None:
+            n = count_syllables(word)
+            if len(memo) < MEMO_SIZE:
+                memo[word] = n
+        syllables += n * occurrences
+    return len(words), len(_SEGMENT_RE.findall(text)), syllables
+
+
+def metrics(word_count: int, sentence_count: int, syllable_count: int) -> dict:
+    """Flesch Reading Ease + density metrics from raw counts."""
+    sentence_count = sentence_count or 1
+
+    if word_count == 0:
+        return {
+            "readability_score": 100.0,
+            "word_count": 0,
+            "sentence_count": sentence_count,
+            "avg_words_per_sentence": 0.0,
+            "density": "Low"
+        }
+
+    avg_words_per_sentence = word_count / sentence_count
+    avg_syllables_per_word = syllable_count / word_count
+
+    # Flesch Reading Ease Formula
+    score = 206.835 - 1.015 * avg_words_per_sentence - 84.6 * avg_syllables_per_word
+
+    if avg_words_per_sentence > 25:
+        density = "High"
+    elif avg_words_per_sentence > 15:
+        density = "Medium"
+    else:
+        density = "Low"
+
+    return {
+        "readability_score": round(max(0.0, min(100.0, score)), 2),
+        "word_count": word_count,
+        "sentence_count": sentence_count,
+        "avg_words_per_sentence": round(avg_words_per_sentence, 2),
+        "density": density
+    }
+
+
+def analyze(text: str) -> dict:
+    """Flesch Reading Ease + density metrics; see TextAnalyzerTool.calculate_readability."""
+    if not text:
+        return {
+            "readability_score": 100.0,
+            "word_count": 0,
+            "sentence_count": 0,
+            "avg_words_per_sentence": 0.0,
+            "density": "Low"
+        }
+    return metrics(*count(text))
+
+
+# ── streaming annotation ──────────────────────────────────────────────────────
+# Locates the hard parts of a document: per-paragraph and per-sentence scores
+# with character offsets, produced as a generator so memory stays bounded by
+# the longest paragraph however long the document is.
+
+_PARAGRAPH_BREAK_RE = re.compile(r"\n[ \t\r\f\v]*\n")
+# One match per sentence, trailing terminators included (see _SEGMENT_RE).
+_SENTENCE_SPAN_RE = re.compile(r"[^\s.!?][^.!?]*[.!?]*")
+
+TERMINATORS = ".!?"
+MAX_PARAGRAPH_CHARS = 100_000   # longer "paragraphs" are cut at whitespace
+
+
+def difficulty(score: float) -> str:
+    """Same bands as DecisionEngine.decide_settings."""
+    if score < 40:
+        return "High"
+    if score <= 60:
+        return "Medium"
+    return "Low"
+
+
+def _emit(raw: str, start: int):
+    text = raw.strip()
+    if text:
+        yield start + (len(raw) - len(raw.lstrip())), text
+
+
+def paragraph_spans(chunks, max_chars: int = MAX_PARAGRAPH_CHARS):
+    """
+    Splits a stream of text chunks into blank-line separated paragraphs.
+    Yields (start offset, paragraph text) with whitespace trimmed.
+    """
+    buffer, base = "", 0   # base: document offset of buffer[0]
+    for chunk in chunks:
+        buffer += chunk
+        pos = 0
+        for match in _PARAGRAPH_BREAK_RE.finditer(buffer):
+            yield from _emit(buffer[pos:match.start()], base + pos)
+            pos = match.end()
+        while len(buffer) - pos > max_chars:
+            cut = buffer.rfind(" ", pos, pos + max_chars)
+            cut = cut if cut > pos else pos + max_chars
+            yield from _emit(buffer[pos:cut], base + pos)
+            pos = cut
+        buffer, base = buffer[pos:], base + pos
+    yield from _emit(buffer, base)
+
+
+def _sentences(text: str, start: int) -> list:
+    sentences = []
+    for match in _SENTENCE_SPAN_RE.finditer(text):
+        sentence = match.group().rstrip()
+        words, _, syllables = count(sentence)
+        score = metrics(words, 1, syllables)["readability_score"]
+        sentences.append({
+            "start": start + match.start(),
+            "end": start + match.start() + len(sentence),
+            "readability_score": score,
+            "word_count": words,
+            "difficulty": difficulty(score),
+        })
+    return sentences
+
+
+def annotate(chunks, sentences: bool = True):
+    """
+    Yields ("paragraph", {...}) for every paragraph of the streamed text and
+    finally ("summary", {...}) with whole-document metrics — the same numbers
+    analyze() gives for the full text, computed without holding it.
+    """
+    totals = [0, 0, 0]         # words, sentences, syllables
+    open_segment = False       # previous paragraph ended without a terminator
+    index = -1
+    for index, (start, text) in enumerate(paragraph_spans(chunks)):
+        words, segments, syllables = count(text)
+        # Without a terminator the original split joins a sentence across the break.
+        joined = open_segment and text[0] not in TERMINATORS
+        totals[0] += words
+        totals[1] += segments - (1 if joined else 0)
+        totals[2] += syllables
+        open_segment = text[-1] not in TERMINATORS
+
+        result = metrics(words, segments, syllables)
+        paragraph = {
+            "index": index,
+            "start": start,
+            "end": start + len(text),
+            "readability_score": result["readability_score"],
+            "word_count": words,
+            "sentence_count": result["sentence_count"],
+            "density": result["density"],
+            "difficulty": difficulty(result["readability_score"]),
+        }
+        if sentences:
+            paragraph["sentences"] = _sentences(text, start)
+        yield "paragraph", paragraph
+
+    summary = metrics(*totals)
+    yield "summary", {**summary, "paragraphs": index + 1, "difficulty": difficulty(summary["readability_score"])}
+
+
+def analyze_chunks(chunks) -> dict:
+    """analyze() of the concatenated chunks, without joining them."""
+    size = 0
+
+    def counted():
+        nonlocal size
+        for chunk in chunks:
+            size += len(chunk)
+            yield chunk
+
+    summary = {}
+    for _, summary in annotate(counted(), sentences=False):
+        pass
+    if not size:
+        return analyze("")
+    return {key: summary[key] for key in analyze("")}
@@ -1,9 +1,11 @@
+from django.conf import settings
 from rest_framework import serializers
 
 class OptimizeReadingRequestSerializer(serializers.Serializer):
     file_id = serializers.IntegerField(required=False, allow_null=True)
     text = serializers.CharField(required=False, allow_blank=True, help_text="Optional text to analyze. If not provided, it tries to fetch text from UserFile.")
     current_settings = serializers.JSONField(default=dict)
+    trace = serializers.BooleanField(default=False, help_text="Attach per-stage timings to analysis_details.")
 
     def validate(self, data):
         if not data.get('file_id') and not data.get('text'):
@@ -17,3 +19,19 @@ class OptimizeReadingResponseSerializer(serializers.Serializer):
     recommended_settings = serializers.JSONField()
     actions_taken = serializers.ListField(child=serializers.CharField())
     analysis_details = serializers.JSONField(required=False)
+
+
+class OptimizeReadingBatchRequestSerializer(serializers.Serializer):
+    file_ids = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    texts = serializers.ListField(child=serializers.CharField(allow_blank=True), required=False, default=list)
+    current_settings = serializers.JSONField(default=dict)
+    trace = serializers.BooleanField(default=False)
+
+    def validate(self, data):
+        total = len(data["file_ids"]) + len(data["texts"])
+        if not total:
+            raise serializers.ValidationError("Provide 'file_ids' and/or 'texts'.")
+        limit = getattr(settings, "AI_OPTIMIZE_BATCH_MAX", 500)
+        if total > limit:
+            raise serializers.ValidationError(f"Too many items ({total}, max {limit}).")
+        return data
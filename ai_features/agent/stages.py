@@ -0,0 +1,184 @@
+"""
+Pluggable stages of the reading-optimization pipeline, with timing.
+
+A stage is any object with a ``name`` and a ``run(context)`` method that
+reads and writes the shared ``context`` dict. ReadingOptimizationAgent runs
+its stages in order — settings.AI_AGENT_STAGES (dotted paths) when Django is
+configured, DEFAULT_STAGES otherwise — so adding or reordering an analysis
+tool is a settings change.
+
+Every stage run is timed (wall clock and thread CPU time) and:
+
+* recorded in a per-process histogram for that stage (``stats()``, exposed
+  to staff at GET /api/ai/agent/stats/),
+* logged as a structured ``ai_features.agent`` record (stage, wall_ms, cpu_ms),
+* attached to ``analysis_details["timings"]`` when tracing is requested.
+"""
+
+import bisect
+import logging
+import threading
+import time
+
+from .decision import DecisionEngine
+from .tools import TextAnalyzerTool
+
+logger = logging.getLogger("ai_features.agent")
+
+# Upper bounds of the histogram buckets, in milliseconds (plus +Inf).
+BUCKETS_MS = (0.1, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Stage:
+    """Base class; subclasses set ``name`` and implement ``run``."""
+
+    name = "stage"
+
+    def run(self, context: dict):
+        raise NotImplementedError
+
+
+class AnalyzeStage(Stage):
+    """Readability + density metrics (skipped when an analysis was supplied)."""
+
+    name = "analyze"
+
+    def run(self, context: dict):
+        if context.get("analysis") is None:
+            context["analysis"] = TextAnalyzerTool.calculate_readability(context.get("text", ""))
+
+
+class DecideStage(Stage):
+    """Maps the readability score to recommended reader settings."""
+
+    name = "decide"
+
+    def run(self, context: dict):
+        recommended, actions, difficulty = DecisionEngine.decide_settings(
+            readability_score=context["analysis"].get("readability_score", 100.0),
+            current_settings=context.get("current_settings") or {},
+        )
+        context.update(recommended_settings=recommended, actions_taken=actions, difficulty_level=difficulty)
+
+
+class RespondStage(Stage):
+    """Formulates the response body."""
+
+    name = "respond"
+
+    def run(self, context: dict):
+        context["result"] = {
+            "readability_score": context["analysis"].get("readability_score", 100.0),
+            "difficulty_level": context["difficulty_level"],
+            "recommended_settings": context["recommended_settings"],
+            "actions_taken": context["actions_taken"],
+            "analysis_details": context["analysis"],
+        }
+
+
+DEFAULT_STAGES = (
+    "ai_features.agent.stages.AnalyzeStage",
+    "ai_features.agent.stages.DecideStage",
+    "ai_features.agent.stages.RespondStage",
+)
+
+
+def stage_paths() -> tuple:
+    """settings.AI_AGENT_STAGES, or DEFAULT_STAGES where Django isn't set up (pool workers)."""
+    from django.conf import settings
+
+    if not settings.configured:
+        return DEFAULT_STAGES
+    return tuple(getattr(settings, "AI_AGENT_STAGES", DEFAULT_STAGES))
+
+
+def load_stages(paths: tuple = None) -> list:
+    from django.utils.module_loading import import_string
+
+    return [import_string(path)() for path in (paths or stage_paths())]
+
+
+# ── timing ────────────────────────────────────────────────────────────────────
+class Histogram:
+    """Bucketed wall-time distribution for one stage (per process)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.wall_ms = 0.0
+        self.cpu_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, wall_ms: float, cpu_ms: float):
+        with self._lock:
+            self.counts[bisect.bisect_left(BUCKETS_MS, wall_ms)] += 1
+            self.count += 1
+            self.wall_ms += wall_ms
+            self.cpu_ms += cpu_ms
+            self.max_ms = max(self.max_ms, wall_ms)
+
+    def percentile(self, pct: float):
+        """Upper bound of the bucket holding the pct-th percentile."""
+        with self._lock:
+            if not self.count:
+                return None
+            rank, seen = pct / 100 * self.count, 0
+            for bound, n in zip(BUCKETS_MS + (None,), self.counts):
+                seen += n
+                if seen >= rank:
+                    return bound if bound is not None else round(self.max_ms, 3)
+            return round(self.max_ms, 3)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            count, wall, cpu = self.count, self.wall_ms, self.cpu_ms
+            buckets = {f"le_{bound}": n for bound, n in zip(BUCKETS_MS, self.counts)}
+            buckets["le_inf"] = self.counts[-1]
+            max_ms = self.max_ms
+        return {
+            "count": count,
+            "mean_wall_ms": round(wall / count, 3) if count else None,
+            "mean_cpu_ms": round(cpu / count, 3) if count else None,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "max_ms": round(max_ms, 3),
+            "buckets": buckets,
+        }
+
+
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+
+def histogram(stage: str) -> Histogram:
+    with _histograms_lock:
+        if stage not in _histograms:
+            _histograms[stage] = Histogram()
+        return _histograms[stage]
+
+
+def stats() -> dict:
+    with _histograms_lock:
+        stages = dict(_histograms)
+    return {name: h.as_dict() for name, h in stages.items()}
+
+
+def run_timed(stage, context: dict) -> dict:
+    """Runs one stage; returns its timing record."""
+    wall, cpu = time.perf_counter(), time.thread_time()
+    stage.run(context)
+    timing = {
+        "stage": stage.name,
+        "wall_ms": round((time.perf_counter() - wall) * 1000, 3),
+        "cpu_ms": round((time.thread_time() - cpu) * 1000, 3),
+    }
+    record(timing)
+    return timing
+
+
+def record(timing: dict):
+    """Adds a timing to its stage histogram and logs it."""
+    histogram(timing["stage"]).record(timing["wall_ms"], timing["cpu_ms"])
+    logger.info("agent stage %s took %.3f ms (cpu %.3f ms)", timing["stage"], timing["wall_ms"], timing["cpu_ms"],
+                extra=timing)
@@ -1,5 +1,7 @@
 import re
 
+from . import readability
+
 class TextAnalyzerTool:
     """
     A tool to analyze text and compute readability scores and text density.
@@ -19,6 +21,23 @@ class TextAnalyzerTool:
     def calculate_readability(cls, text: str) -> dict:
         """
         Calculates the Flesch Reading Ease score and extracts density metrics.
+        Single pass with memoized syllable counts (see readability.py);
+        returns exactly what reference_readability returns.
+        Returns: {
+            "readability_score": float,
+            "word_count": int,
+            "sentence_count": int,
+            "avg_words_per_sentence": float,
+            "density": str
+        }
+        """
+        return readability.analyze(text)
+
+    @classmethod
+    def reference_readability(cls, text: str) -> dict:
+        """
+        The original multi-pass implementation, kept as the correctness and
+        speed baseline for readability.analyze (manage.py bench_readability).
         Returns: {
             "readability_score": float,
             "word_count": int,
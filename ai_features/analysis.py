@@ -0,0 +1,54 @@
+"""
+Stored readability analysis for UserFiles.
+
+The optimize-reading agent needs TextAnalyzerTool.calculate_readability of
+(at most settings.AI_ANALYZE_MAX_CHARS of) a file. That result depends only
+on the file's bytes, so it is stored in FileAnalysis under the file's
+content hash: the first request streams the file through the analyzer in
+blocks, every later one — for any copy of the same contents — is one
+indexed lookup. Replacing a file changes its hash, which is the
+invalidation.
+"""
+
+from django.conf import settings
+from django.db import IntegrityError
+
+from .agent import readability
+from .document import iter_file_text
+from .models import FileAnalysis
+
+VERSION = 1   # bump when the analyzer's output changes
+
+
+def _max_chars() -> int:
+    return getattr(settings, "AI_ANALYZE_MAX_CHARS", 10_000_000)
+
+
+def stored(content_hashes) -> dict:
+    """{content_hash: result} for the hashes that have a current analysis."""
+    rows = FileAnalysis.objects.filter(
+        content_hash__in=list(content_hashes), version=VERSION, max_chars=_max_chars(),
+    ).values_list("content_hash", "result")
+    return dict(rows)
+
+
+def store(content_hash: str, result: dict):
+    try:
+        FileAnalysis.objects.create(content_hash=content_hash, version=VERSION, max_chars=_max_chars(), result=result)
+    except IntegrityError:
+        pass   # a concurrent request stored the same analysis
+
+
+def analyze_file(user_file) -> dict:
+    """calculate_readability() of a text-based file, from FileAnalysis when stored."""
+    content_hash = user_file.ensure_content_hash()
+    result = stored([content_hash]).get(content_hash)
+    if result is None:
+        result = readability.analyze_chunks(iter_file_text(user_file, _max_chars()))
+        store(content_hash, result)
+    return result
+
+
+def forget(content_hash: str):
+    """Drops the stored analyses of contents no remaining file has."""
+    FileAnalysis.objects.filter(content_hash=content_hash).delete()
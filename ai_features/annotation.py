@@ -0,0 +1,157 @@
+"""
+Per-document difficulty annotation: where the hard paragraphs and sentences are.
+
+``readability.annotate`` scores a stream of text chunks; this module feeds it
+a file in fixed-size blocks (document.iter_file_text), so memory stays flat
+whatever the document size, and tees the records to a JSON Lines file under
+settings.AI_ANNOTATION_DIR.
+Opening the same document again streams that file back instead of scoring it
+again. Files are keyed by their blob's content hash — shared by every upload
+of the same contents — or, for uploads from before blobs, by id, size and
+modification time (posted text by its hash), so a replaced upload never gets
+stale offsets.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import tempfile
+
+from django.conf import settings
+
+from library.models import UserFile
+from .agent.readability import annotate
+from .document import has_text, iter_file_text
+
+VERSION = 1   # bump when the record shape changes
+
+
+def directory() -> str:
+    return str(getattr(settings, "AI_ANNOTATION_DIR", settings.BASE_DIR / "data" / "annotations"))
+
+
+def file_key(user_file) -> str:
+    if user_file.blob_id:
+        return f"blob-{user_file.blob_id}"   # blob contents never change; shared by all its files
+    storage, name = user_file.file.storage, user_file.file.name
+    modified = storage.get_modified_time(name).timestamp()
+    return f"file-{user_file.pk}-{storage.size(name)}-{int(modified * 1e6)}"
+
+
+def text_key(text: str) -> str:
+    return "text-" + hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def _path(key: str) -> str:
+    return os.path.join(directory(), f"{key}-v{VERSION}.jsonl")
+
+
+def records(key: str, chunks):
+    """
+    Yields (event, data) for a document: from its cache file when there is
+    one, otherwise by scoring ``chunks()`` and caching the result.
+    """
+    path = _path(key)
+    try:
+        f = open(path, encoding="utf-8")
+    except FileNotFoundError:
+        yield from _score(path, chunks())
+        return
+    with f:
+        os.utime(path)   # eviction goes by last use
+        for line in f:
+            event, data = json.loads(line)
+            yield event, data
+
+
+def _score(path: str, chunks):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    stored = False
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as out:
+            for event, data in annotate(chunks):
+                out.write(json.dumps([event, data], separators=(",", ":")) + "\n")
+                yield event, data
+        # Only complete annotations are cached; a dropped stream leaves nothing behind.
+        os.replace(tmp, path)
+        stored = True
+        _evict()
+    finally:
+        if not stored:
+            os.remove(tmp)
+
+
+def _evict():
+    limit = getattr(settings, "AI_ANNOTATION_CACHE_FILES", 2000)
+    paths = glob.glob(os.path.join(directory(), "*.jsonl"))
+    if len(paths) <= limit:
+        return
+    paths.sort(key=lambda p: os.stat(p).st_mtime)
+    for path in paths[:len(paths) - limit]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def forget(user_file):
+    """Drops every cached annotation of a file (called when it is deleted)."""
+    _remove(f"file-{user_file.pk}-*.jsonl")
+
+
+def forget_blob(content_hash: str):
+    """Drops the annotations of contents no remaining file has."""
+    _remove(f"blob-{content_hash}-*.jsonl")
+
+
+def _remove(pattern: str):
+    for path in glob.glob(os.path.join(directory(), pattern)):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def file_records(user_file):
+    return records(file_key(user_file), lambda: iter_file_text(user_file))
+
+
+def resolve(data: dict, user) -> tuple:
+    """
+    Reads {"text": ...} or {"file_id": ...} from a request body.
+    Returns (records, None) or (None, (payload, status)).
+    """
+    text = data.get("text") or ""
+    file_id = data.get("file_id")
+    if not isinstance(text, str):
+        return None, ({"error": "'text' must be a string."}, 400)
+
+    if not text.strip() and file_id:
+        try:
+            user_file = UserFile.objects.get(id=file_id, user=user)
+        except (UserFile.DoesNotExist, ValueError, TypeError):
+            return None, ({"error": "File not found."}, 404)
+        if not has_text(user_file):
+            # PDF whose text the extract job hasn't produced (yet): 202 / 422.
+            from .jobs import extraction_pending   # jobs imports this module
+            payload, status = extraction_pending(user_file)
+            return None, ({"file_id": user_file.id, **payload}, status)
+        return file_records(user_file), None
+
+    if not text.strip():
+        return None, ({"error": "No text provided."}, 400)
+    # Offsets refer to the text exactly as posted, so it is not stripped.
+    return records(text_key(text), lambda: [text]), None
+
+
+def select(records, sentences: bool = True, max_score: float = None):
+    """Drops sentence detail and / or paragraphs scoring ``max_score`` or more."""
+    for event, data in records:
+        if event == "paragraph":
+            if max_score is not None and data["readability_score"] >= max_score:
+                continue
+            if not sentences:
+                data = {k: v for k, v in data.items() if k != "sentences"}
+        yield event, data
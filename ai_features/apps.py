@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class AiFeaturesConfig(AppConfig):
     name = 'ai_features'
+
+    def ready(self):
+        from . import signals  # noqa: F401 — registers the upload receiver
@@ -0,0 +1,231 @@
+"""
+Native async versions of the AI endpoints for the ASGI stack.
+
+The sync views hold a worker thread for the whole upstream call (up to the
+25 s model timeout or the 8 s dictionary timeout). These views await the
+call instead, so one ASGI process can keep hundreds of model and dictionary
+requests in flight while file listing and progress saves stay responsive.
+Request and response shapes match the sync views in views.py.
+"""
+
+import asyncio
+import functools
+import json
+import weakref
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from . import batching, cache, dictionary, extractive
+from .completions import RESULT_KEYS, acomplete, cache_key, error_payload, warm
+from .document import adocument_events, arun_document, document_cost, resolve_chunks
+from .throttling import athrottled
+from .streaming import astream_completion, sse_event, sse_response, wants_stream
+
+# httpx pools are bound to the event loop that created them, so keep one client
+# per loop (uvicorn runs a single loop; runserver makes one per request).
+_http_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _http_clients.get(loop)
+    if client is None:
+        client = _http_clients[loop] = httpx.AsyncClient(
+            timeout=getattr(settings, "AI_DICTIONARY_TIMEOUT", 8),
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=50),
+        )
+    return client
+
+
+_jwt = JWTAuthentication()
+
+
+def _unauthorized(detail: dict) -> JsonResponse:
+    response = JsonResponse(detail, status=401)
+    response["WWW-Authenticate"] = 'Bearer realm="api"'
+    return response
+
+
+def jwt_api_view(view):
+    """
+    Async equivalent of an IsAuthenticated APIView POST handler.
+    Authenticates the Bearer token, parses the JSON body and calls
+    ``view(request, data)``.
+    """
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            auth = await sync_to_async(_jwt.authenticate)(request)
+        except AuthenticationFailed as e:
+            detail = e.detail if isinstance(e.detail, dict) else {"detail": str(e.detail)}
+            return _unauthorized(detail)
+        if auth is None:
+            return _unauthorized({"detail": "Authentication credentials were not provided."})
+        request.user = auth[0]
+
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            return JsonResponse({"error": "Invalid JSON body."}, status=400)
+        if not isinstance(data, dict):
+            return JsonResponse({"error": "Expected a JSON object."}, status=400)
+
+        return await view(request, data, *args, **kwargs)
+
+    return csrf_exempt(require_POST(wrapper))
+
+
+def _words_cost(request, data: dict) -> int:
+    words = data.get("words")
+    return max(1, len(words)) if isinstance(words, list) else 1
+
+
+def _document_cost(request, data: dict) -> int:
+    return document_cost(data, request.user)
+
+
+def _err(e: Exception) -> JsonResponse:
+    payload, status = error_payload(e)
+    return JsonResponse(payload, status=status)
+
+
+async def _batch(task: str, data: dict) -> JsonResponse:
+    texts, error = batching.batch_paragraphs(data)
+    if error:
+        payload, status = error
+        return JsonResponse(payload, status=status)
+    return JsonResponse(await batching.arespond(task, texts, extractive.engine(data)))
+
+
+# ── 1. Simplify ───────────────────────────────────────────────────────────────
+@jwt_api_view
+@athrottled("ai")
+async def simplify(request, data):
+    """POST /api/ai/async/simplify/ — add {"stream": true} for Server-Sent Events."""
+    if "paragraphs" in data:
+        return await _batch("simplify", data)
+
+    text = (data.get("text") or "").strip()[:1500]
+    if not text:
+        return JsonResponse({"error": "No text provided."}, status=400)
+
+    if wants_stream(request, data):
+        return sse_response(astream_completion("simplify", text))
+
+    try:
+        output, cached = await acomplete("simplify", text)
+        return JsonResponse({"simplified": output, "cached": cached})
+    except Exception as e:
+        return _err(e)
+
+
+# ── 2. Structure ──────────────────────────────────────────────────────────────
+@jwt_api_view
+@athrottled("ai")
+async def structure(request, data):
+    """POST /api/ai/async/structure/ — add {"stream": true} for Server-Sent Events."""
+    if "paragraphs" in data:
+        return await _batch("structure", data)
+
+    text = (data.get("text") or "").strip()[:1500]
+    if not text:
+        return JsonResponse({"error": "No text provided."}, status=400)
+
+    engine = extractive.engine(data)
+    stream = wants_stream(request, data)
+
+    # Local bullets take milliseconds of CPU — fine to compute inline.
+    if engine == "extractive":
+        return sse_response(extractive.events(text)) if stream else JsonResponse(extractive.payload(text))
+
+    fallback = extractive.fallback if engine in ("fallback", "instant") else None
+    if engine == "instant":
+        if stream:
+            return sse_response(extractive.awith_draft(text, astream_completion("structure", text, fallback)))
+        output = await sync_to_async(cache.get)(cache_key("structure", text), "structure")
+        if output is not None:
+            return JsonResponse({"structured": output, "cached": True})
+        warm("structure", text)
+        return JsonResponse({**extractive.payload(text), "pending": True})
+
+    if stream:
+        return sse_response(astream_completion("structure", text, fallback))
+
+    try:
+        output, cached = await acomplete("structure", text)
+        return JsonResponse({"structured": output, "cached": cached})
+    except Exception as e:
+        body = fallback(text, e) if fallback else None
+        if body is not None:
+            return JsonResponse(body)
+        return _err(e)
+
+
+# ── 2b. Whole-document simplify / structure ────────────────────────────────────
+@jwt_api_view
+@athrottled("ai", cost=_document_cost)
+async def document(request, data, task):
+    """POST /api/ai/async/document/<task>/ — see views.DocumentView."""
+    if task not in RESULT_KEYS:
+        return JsonResponse({"error": f"Unknown task '{task}'."}, status=404)
+
+    chunks, error = await sync_to_async(resolve_chunks)(data, request.user)
+    if error:
+        payload, status = error
+        return JsonResponse(payload, status=status)
+
+    if wants_stream(request, data):
+        return sse_response(adocument_events(task, chunks))
+
+    payload, status = await arun_document(task, chunks)
+    return JsonResponse(payload, status=status)
+
+
+# ── 3. Explain word ───────────────────────────────────────────────────────────
+@jwt_api_view
+@athrottled("explain")
+async def explain_word(request, data):
+    """POST /api/ai/async/explain/"""
+    word = (data.get("word") or "").strip().lower()
+    if not word:
+        return JsonResponse({"error": "No word provided."}, status=400)
+
+    try:
+        explanation, source = await dictionary.aexplain(word, get_async_http_client())
+    except dictionary.DictionaryError:
+        return JsonResponse({"error": "Dictionary service unavailable. Please try again."}, status=503)
+    if explanation:
+        return JsonResponse({"word": word, "explanation": explanation, "source": source})
+
+    return JsonResponse({"error": f"Definition not found in dictionary for '{word}'."}, status=404)
+
+
+@jwt_api_view
+@athrottled("explain", cost=_words_cost)
+async def explain_batch(request, data):
+    """POST /api/ai/async/explain/batch/"""
+    words, error = dictionary.batch_words(data)
+    if error:
+        payload, status = error
+        return JsonResponse(payload, status=status)
+
+    results = dictionary.aexplain_many(words, get_async_http_client())
+    if wants_stream(request, data):
+        async def events():
+            async for index, item in results:
+                yield sse_event("word", {"index": index, **item})
+            yield sse_event("done", {"total": len(words)})
+        return sse_response(events())
+
+    ordered = [None] * len(words)
+    async for index, item in results:
+        ordered[index] = item
+    return JsonResponse({"results": ordered})
@@ -0,0 +1,202 @@
+"""
+Batched simplify / structure for many short paragraphs.
+
+For a short paragraph the fixed cost of a model call — TLS, queueing, cold
+start, the system prompt — dwarfs the work itself. Here the paragraphs a
+reader sends together are packed into as few calls as the token budget
+allows (AI_BATCH_TOKENS / AI_BATCH_MAX_PARAGRAPHS), each passage behind a
+numbered marker line, and the model is asked to answer with the same
+markers so the reply can be split back per paragraph.
+
+Every paragraph keeps its own result-cache key — the same key /simplify/
+and /structure/ use — so cached paragraphs never reach the model and batch
+output fills the cache for later single calls. A paragraph whose marker is
+missing, duplicated or empty in the reply falls back to an individual call.
+"""
+
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from . import cache, extractive
+from .completions import PROMPTS, RESULT_KEYS, cache_key, complete, error_payload
+from .document import estimate_tokens
+from .gateway import get_gateway
+
+BATCH_INSTRUCTIONS = (
+    "\n\nThe user message contains {count} separate passages. Each one starts with "
+    "a marker line such as <<<1>>>. Handle every passage on its own and answer with "
+    "the same marker lines in the same order, each followed only by the result for "
+    "that passage. Do not merge passages and write nothing before the first marker."
+)
+
+# task → first line of the batched user message
+BATCH_HEADERS = {
+    "simplify": "Simplify each of these passages:",
+    "structure": "Format each of these passages as a structural bulleted list:",
+}
+
+_MARKER_RE = re.compile(r"^[ \t]*<<<[ \t]*(\d+)[ \t]*>>>[ \t]*$", re.M)
+
+
+def batch_messages(task: str, texts: list) -> list:
+    system_prompt, _ = PROMPTS[task]
+    passages = "\n\n".join(f"<<<{i}>>>\n{text}" for i, text in enumerate(texts, 1))
+    return [
+        {"role": "system", "content": system_prompt + BATCH_INSTRUCTIONS.format(count=len(texts))},
+        {"role": "user", "content": f"{BATCH_HEADERS[task]}\n\n{passages}"},
+    ]
+
+
+def split_reply(reply: str, count: int) -> dict:
+    """
+    Splits a marked-up reply into {passage number: output}. Numbers that are
+    out of range, repeated or empty are left out so the caller retries them.
+    """
+    matches = list(_MARKER_RE.finditer(reply))
+    outputs, repeated = {}, set()
+    for i, match in enumerate(matches):
+        number = int(match.group(1))
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(reply)
+        output = reply[match.end():end].strip()
+        if number in outputs:
+            repeated.add(number)
+        outputs[number] = output
+    return {n: o for n, o in outputs.items() if 1 <= n <= count and o and n not in repeated}
+
+
+def pack(texts: list, max_tokens: int = None, max_items: int = None) -> list:
+    """Groups indexes of ``texts`` in order so each group fits the input budget."""
+    max_tokens = max_tokens or getattr(settings, "AI_BATCH_TOKENS", 1200)
+    max_items = max_items or getattr(settings, "AI_BATCH_MAX_PARAGRAPHS", 8)
+    groups, current, size = [], [], 0
+    for index, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if current and (size + tokens > max_tokens or len(current) >= max_items):
+            groups.append(current)
+            current, size = [], 0
+        current.append(index)
+        size += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _output_budget(count: int) -> int:
+    return min(600 * count, getattr(settings, "AI_BATCH_OUTPUT_TOKENS", 2400))
+
+
+# ── one batched call ──────────────────────────────────────────────────────────
+def _run_group(task: str, texts: list, keys: list) -> list:
+    """Returns [(output, cached, error)] for one packed group."""
+    outputs = {}
+    if len(texts) > 1:
+        try:
+            completion = get_gateway().complete(task, batch_messages(task, texts), _output_budget(len(texts)))
+        except Exception as e:
+            # The chain is exhausted (or auth failed): N single calls would fail the same way.
+            return [(None, False, e)] * len(texts)
+        outputs = split_reply(completion.text, len(texts))
+        for number, output in outputs.items():
+            cache.set(keys[number - 1], task, completion.model, output)
+
+    results = []
+    for number, text in enumerate(texts, 1):
+        if number in outputs:
+            results.append((outputs[number], False, None))
+            continue
+        try:
+            output, cached = complete(task, text)
+            results.append((output, cached, None))
+        except Exception as e:
+            results.append((None, False, e))
+    return results
+
+
+def _run_group_in_thread(task: str, texts: list, keys: list) -> list:
+    try:
+        return _run_group(task, texts, keys)
+    finally:
+        # Worker threads open their own DB connections; don't leak them.
+        connections.close_all()
+
+
+def complete_many(task: str, texts: list) -> list:
+    """
+    Runs ``task`` over every paragraph with as few model calls as possible.
+    Returns [(output, cached, error)] in input order.
+    """
+    keys = [cache_key(task, text) for text in texts]
+    results = [None] * len(texts)
+    misses = []
+    for index, key in enumerate(keys):
+        output = cache.get(key, task)
+        if output is not None:
+            results[index] = (output, True, None)
+        else:
+            misses.append(index)
+
+    groups = [[misses[i] for i in group] for group in pack([texts[i] for i in misses])]
+    if not groups:
+        return results
+
+    concurrency = min(len(groups), getattr(settings, "AI_DOCUMENT_CONCURRENCY", 4))
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"batch-{task}") as pool:
+        futures = [
+            (group, pool.submit(_run_group_in_thread, task, [texts[i] for i in group], [keys[i] for i in group]))
+            for group in groups
+        ]
+        for group, future in futures:
+            for index, result in zip(group, future.result()):
+                results[index] = result
+    return results
+
+
+# ── request / response helpers ────────────────────────────────────────────────
+def batch_paragraphs(data: dict) -> tuple:
+    """
+    Reads {"paragraphs": ["...", ...]} from a request body.
+    Returns (texts, None) or (None, (payload, status)).
+    """
+    items = data.get("paragraphs")
+    if not isinstance(items, list) or not items:
+        return None, ({"error": "Provide a non-empty 'paragraphs' list."}, 400)
+    limit = getattr(settings, "AI_BATCH_MAX_REQUEST", 50)
+    if len(items) > limit:
+        return None, ({"error": f"Too many paragraphs ({len(items)}, max {limit})."}, 413)
+    # Same normalisation as the single-paragraph views so cache keys match.
+    texts = [(p if isinstance(p, str) else "").strip()[:1500] for p in items]
+    if not all(texts):
+        return None, ({"error": "Paragraphs must be non-empty strings."}, 400)
+    return texts, None
+
+
+def respond(task: str, texts: list, engine: str = "llm") -> dict:
+    """
+    Response body for a batch. For structure, ``engine`` (see extractive.py)
+    can answer locally or replace paragraphs whose model call failed
+    transiently with local bullets (extractive.fallback).
+    """
+    if task == "structure" and engine == "extractive":
+        return {"results": [{**extractive.payload(text), "status": 200} for text in texts]}
+
+    items = []
+    for text, (output, cached, error) in zip(texts, complete_many(task, texts)):
+        if error is None:
+            items.append({RESULT_KEYS[task]: output, "cached": cached, "status": 200})
+        elif task == "structure" and engine in ("fallback", "instant") and (
+            local := extractive.fallback(text, error)
+        ) is not None:
+            items.append({**local, "status": 200})
+        else:
+            payload, status = error_payload(error)
+            items.append({**payload, "status": status})
+    return {"results": items}
+
+
+async def arespond(task: str, texts: list, engine: str = "llm") -> dict:
+    # The gateway, cache and fallback path are sync; keep them off the event loop.
+    return await sync_to_async(respond, thread_sensitive=False)(task, texts, engine)
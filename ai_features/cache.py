@@ -0,0 +1,119 @@
+"""
+Persistent result cache for AI completions.
+
+Results are content-addressed by (endpoint, model, prompt template, normalized
+text hash) and stored in the database, so they survive restarts and are shared
+by every worker. Entries expire after AI_CACHE_TTL seconds and the least
+recently used rows are evicted once AI_CACHE_MAX_ENTRIES is exceeded.
+"""
+
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import CacheCounter, CachedResult
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so re-flowed copies of a paragraph share a key."""
+    return " ".join(text.split())
+
+
+def make_key(endpoint: str, model: str, prompt: str, text: str) -> str:
+    """Content address for one completion request."""
+    text_hash = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    raw = json.dumps([endpoint, model, prompt, text_hash])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _count(endpoint: str, field: str):
+    updated = CacheCounter.objects.filter(endpoint=endpoint).update(
+        **{field: F(field) + 1}
+    )
+    if not updated:
+        CacheCounter.objects.get_or_create(endpoint=endpoint)
+        CacheCounter.objects.filter(endpoint=endpoint).update(**{field: F(field) + 1})
+
+
+def get(key: str, endpoint: str):
+    """Return the cached result for ``key`` or None, recording a hit or miss."""
+    now = timezone.now()
+    row = (
+        CachedResult.objects.filter(key=key, expires_at__gt=now)
+        .values_list("pk", "result")
+        .first()
+    )
+    if row is None:
+        _count(endpoint, "misses")
+        return None
+
+    pk, result = row
+    CachedResult.objects.filter(pk=pk).update(last_used_at=now, hits=F("hits") + 1)
+    _count(endpoint, "hits")
+    return result
+
+
+def peek(key: str):
+    """Return the cached result without counting a hit or touching LRU order."""
+    return (
+        CachedResult.objects.filter(key=key, expires_at__gt=timezone.now())
+        .values_list("result", flat=True)
+        .first()
+    )
+
+
+def set(key: str, endpoint: str, model: str, result: str):
+    """Store a result, then evict expired and least recently used entries."""
+    now = timezone.now()
+    ttl = getattr(settings, "AI_CACHE_TTL", 60 * 60 * 24 * 7)
+    CachedResult.objects.update_or_create(
+        key=key,
+        defaults={
+            "endpoint": endpoint,
+            "model": model,
+            "result": result,
+            "last_used_at": now,
+            "expires_at": now + timedelta(seconds=ttl),
+        },
+    )
+    _evict(now)
+
+
+def _evict(now):
+    CachedResult.objects.filter(expires_at__lte=now).delete()
+
+    max_entries = getattr(settings, "AI_CACHE_MAX_ENTRIES", 20000)
+    excess = CachedResult.objects.count() - max_entries
+    if excess > 0:
+        stale = list(
+            CachedResult.objects.order_by("last_used_at").values_list("pk", flat=True)[:excess]
+        )
+        CachedResult.objects.filter(pk__in=stale).delete()
+
+
+def stats() -> dict:
+    """Hit / miss counts per endpoint and overall, for sizing the cache."""
+    endpoints = {}
+    for c in CacheCounter.objects.order_by("endpoint"):
+        total = c.hits + c.misses
+        endpoints[c.endpoint] = {
+            "hits": c.hits,
+            "misses": c.misses,
+            "hit_rate": round(c.hits / total, 4) if total else 0.0,
+        }
+
+    totals = CacheCounter.objects.aggregate(hits=Sum("hits"), misses=Sum("misses"))
+    hits, misses = totals["hits"] or 0, totals["misses"] or 0
+    return {
+        "entries": CachedResult.objects.count(),
+        "max_entries": getattr(settings, "AI_CACHE_MAX_ENTRIES", 20000),
+        "ttl_seconds": getattr(settings, "AI_CACHE_TTL", 60 * 60 * 24 * 7),
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+        "endpoints": endpoints,
+    }
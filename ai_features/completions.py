@@ -0,0 +1,124 @@
+"""
+Prompted chat-completion tasks shared by the sync, async and document views.
+
+A task ("simplify", "structure") is a system prompt + user template. Every
+completion goes through the result cache (cache.py), identical concurrent
+calls are coalesced (singleflight.py) and the model is chosen by the LLM
+gateway (gateway.py).
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from . import cache, singleflight
+from .gateway import classify, get_gateway
+
+SIMPLIFY_PROMPT = "You are a helpful reading assistant. Simplify the user's text into plain, easy-to-understand language. Do not add any extra conversational filler, just return the simplified text directly."
+SIMPLIFY_TEMPLATE = "Simplify this text:\n\n{text}"
+
+STRUCTURE_PROMPT = "You are a helpful reading assistant. Extract the main points from the user's text and format them as a concise bulleted list. Do not add conversational filler. Use a • character for each bullet point."
+STRUCTURE_TEMPLATE = "Format this text as a structural bulleted list:\n\n{text}"
+
+logger = logging.getLogger(__name__)
+
+# task → (system prompt, user template)
+PROMPTS = {
+    "simplify": (SIMPLIFY_PROMPT, SIMPLIFY_TEMPLATE),
+    "structure": (STRUCTURE_PROMPT, STRUCTURE_TEMPLATE),
+}
+
+# task → key of the output in API responses
+RESULT_KEYS = {
+    "simplify": "simplified",
+    "structure": "structured",
+}
+
+
+def cache_key(task: str, text: str) -> str:
+    system_prompt, template = PROMPTS[task]
+    return cache.make_key(task, get_gateway().model_key(task), system_prompt + template, text)
+
+
+def messages(task: str, text: str) -> list:
+    system_prompt, template = PROMPTS[task]
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": template.format(text=text)}
+    ]
+
+
+def complete(task: str, text: str) -> tuple:
+    """
+    Runs one chat completion through the result cache.
+    Returns (output, cached) — identical requests are answered from the cache,
+    and identical concurrent requests share a single upstream call.
+    """
+    key = cache_key(task, text)
+    output = cache.get(key, task)
+    if output is not None:
+        return output, True
+
+    def call():
+        completion = get_gateway().complete(task, messages(task, text))
+        cache.set(key, task, completion.model, completion.text)
+        return completion.text
+
+    return singleflight.do(key, call, lambda: cache.peek(key))
+
+
+async def acomplete(task: str, text: str) -> tuple:
+    """Async twin of ``complete`` — same cache keys, awaited upstream call."""
+    key = cache_key(task, text)
+    output = await sync_to_async(cache.get)(key, task)
+    if output is not None:
+        return output, True
+
+    async def call():
+        completion = await get_gateway().acomplete(task, messages(task, text))
+        await sync_to_async(cache.set)(key, task, completion.model, completion.text)
+        return completion.text
+
+    return await singleflight.ado(key, call, sync_to_async(lambda: cache.peek(key)))
+
+
+_warm_pool = None
+_warm_lock = threading.Lock()
+_warm_slots = threading.BoundedSemaphore(32)   # queued + running warm-ups per process
+
+
+def _warm(task: str, text: str):
+    try:
+        complete(task, text)
+    except Exception as e:
+        logger.info("Background %s warm-up failed: %s", task, e)
+    finally:
+        connections.close_all()
+        _warm_slots.release()
+
+
+def warm(task: str, text: str):
+    """
+    Computes and caches a completion in the background, for callers that
+    answered with something quicker. Dropped when too many are pending.
+    """
+    global _warm_pool
+    if not _warm_slots.acquire(blocking=False):
+        return
+    if _warm_pool is None:
+        with _warm_lock:
+            if _warm_pool is None:
+                _warm_pool = ThreadPoolExecutor(
+                    max_workers=getattr(settings, "AI_WARM_WORKERS", 2), thread_name_prefix="ai-warm"
+                )
+    _warm_pool.submit(_warm, task, text)
+
+
+def error_payload(e: Exception) -> tuple:
+    """Maps an upstream exception to (payload, status) via the gateway's classification."""
+    err = classify(e)
+    return err.payload(), err.status
@@ -0,0 +1,470 @@
+"""
+Offline English dictionary for word explanations.
+
+Definitions are served from a read-only SQLite index on disk
+(settings.AI_DICTIONARY_PATH) built by ``python manage.py build_dictionary``
+from an open word list — a kaikki.org / wiktextract JSONL dump or a plain
+TSV. The file is opened immutable with a memory map, so every worker process
+shares the same OS page cache and a lookup is one B-tree probe: no network,
+no locks, no writes.
+
+dictionaryapi.dev is only asked for words the index does not have (or when
+no index has been built yet), over one pooled keep-alive session. Its
+answers are kept in the shared Django cache under the word that was asked —
+"not found" included, for a shorter time — so a misspelling or a proper noun
+costs one upstream call rather than one per click. ``explain_many`` resolves
+a whole batch of words concurrently for /api/ai/explain/batch/.
+"""
+
+import asyncio
+import functools
+import json
+import os
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache as shared_cache
+from django.db import connections
+from requests.adapters import HTTPAdapter
+
+DICTIONARY_URL = "https://api.dictionaryapi.dev/api/v2/entries/en/{word}"
+
+SCHEMA = """
+CREATE TABLE meanings (
+    word       TEXT    NOT NULL,
+    seq        INTEGER NOT NULL,
+    pos        TEXT    NOT NULL,
+    definition TEXT    NOT NULL,
+    example    TEXT    NOT NULL,
+    PRIMARY KEY (word, seq)
+) WITHOUT ROWID;
+CREATE TABLE phonetics (
+    word     TEXT PRIMARY KEY,
+    phonetic TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+MMAP_BYTES = 256 * 1024 * 1024
+CACHE_PREFIX = "ai:dict:word:"
+
+_EDGE_PUNCT_RE = re.compile(r"^[^\w]+|[^\w]+$")
+
+_local = threading.local()
+_session = None
+_session_lock = threading.Lock()
+
+
+class DictionaryError(Exception):
+    """The remote dictionary could not answer (timeout, 5xx, rate limit)."""
+
+
+def format_definition(entries) -> str:
+    """
+    Formats a dictionaryapi.dev response as phonetic + up to two meanings.
+    Returns "" when the response holds no usable definition.
+    """
+    if not entries:
+        return ""
+    entry    = entries[0]
+    phonetic = entry.get("phonetic", "")
+    meanings = entry.get("meanings", [])
+    parts    = []
+    for m in meanings[:2]:
+        pos  = m.get("partOfSpeech", "")
+        defs = m.get("definitions", [])
+        if defs:
+            d = defs[0]
+            defn    = d.get("definition", "")
+            example = d.get("example",    "")
+            part = f"[{pos}] {defn}"
+            if example:
+                part += f'\n  Example: "{example}"'
+            parts.append(part)
+    if not parts:
+        return ""
+    explanation = "\n\n".join(parts)
+    if phonetic:
+        explanation = f"{phonetic}\n\n" + explanation
+    return explanation
+
+
+def normalize_word(word: str) -> str:
+    """Lower-cases and strips quotes, punctuation and a trailing possessive."""
+    word = _EDGE_PUNCT_RE.sub("", (word or "").strip().lower())
+    if word.endswith(("'s", "’s")):
+        word = word[:-2]
+    return word
+
+
+def candidates(word: str) -> list:
+    """The word itself, then naive lemma guesses for inflected forms."""
+    forms = [word]
+    if len(word) > 4 and word.endswith("ies"):
+        forms.append(word[:-3] + "y")
+    if len(word) > 3 and word.endswith("es"):
+        forms.append(word[:-2])
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        forms.append(word[:-1])
+    if len(word) > 4 and word.endswith("ed"):
+        forms += [word[:-2], word[:-1]]
+        if len(word) > 5 and _doubled(word[:-2]):   # stopped → stop
+            forms.append(word[:-3])
+    if len(word) > 5 and word.endswith("ing"):
+        forms += [word[:-3], word[:-3] + "e"]
+        if len(word) > 6 and _doubled(word[:-3]):   # running → run
+            forms.append(word[:-4])
+    return list(dict.fromkeys(forms))
+
+
+def _doubled(stem: str) -> bool:
+    return stem[-1] == stem[-2] and stem[-1] not in "aeiou"
+
+
+# ── local index ───────────────────────────────────────────────────────────────
+def index_path() -> str:
+    return str(getattr(settings, "AI_DICTIONARY_PATH", ""))
+
+
+def _connection():
+    """Per-thread read-only connection, or None when no index is built."""
+    path = index_path()
+    if getattr(_local, "path", None) != path or _local.conn is None:
+        _local.path, _local.conn = path, None
+        if path and os.path.exists(path):
+            conn = sqlite3.connect(f"file:{path}?mode=ro&immutable=1", uri=True)
+            conn.execute(f"PRAGMA mmap_size = {MMAP_BYTES}")
+            _local.conn = conn
+    return _local.conn
+
+
+def _entries(conn, word: str) -> list:
+    rows = conn.execute(
+        "SELECT pos, definition, example FROM meanings WHERE word = ? ORDER BY seq", (word,)
+    ).fetchall()
+    if not rows:
+        return []
+    phonetic = conn.execute("SELECT phonetic FROM phonetics WHERE word = ?", (word,)).fetchone()
+    return [{
+        "word": word,
+        "phonetic": phonetic[0] if phonetic else "",
+        "meanings": [
+            {"partOfSpeech": pos, "definitions": [{"definition": definition, "example": example}]}
+            for pos, definition, example in rows
+        ],
+    }]
+
+
+class _Miss(Exception):
+    pass
+
+
+@functools.lru_cache(maxsize=4096)
+def _indexed(word: str) -> str:
+    # lru_cache doesn't keep exceptions, so only hits are cached: a word the
+    # index (or a missing index) couldn't answer is looked up again next time.
+    conn = _connection()
+    if conn is not None:
+        for form in candidates(word):
+            explanation = format_definition(_entries(conn, form))
+            if explanation:
+                return explanation
+    raise _Miss(word)
+
+
+def lookup(word: str) -> str:
+    """
+    Explanation for ``word`` from the local index, trying simple lemma forms.
+    Returns "" on a miss or when no index is available.
+    """
+    try:
+        return _indexed(word)
+    except _Miss:
+        return ""
+
+
+def reset():
+    """Drops this thread's connection and the lookup cache (after a rebuild)."""
+    _local.path = _local.conn = None
+    _indexed.cache_clear()
+
+
+# ── remote fallback ───────────────────────────────────────────────────────────
+def get_session() -> requests.Session:
+    """One keep-alive session per process, sized for batch lookups."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                size = getattr(settings, "AI_DICTIONARY_CONCURRENCY", 8)
+                session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=size))
+                _session = session
+    return _session
+
+
+def _parse_remote(status_code: int, body) -> str:
+    if status_code == 404:
+        return ""
+    if status_code != 200:
+        raise DictionaryError(f"Dictionary service returned {status_code}.")
+    return format_definition(body)
+
+
+def remote_lookup(word: str) -> str:
+    """
+    Explanation from dictionaryapi.dev; "" when the word is not there.
+    Raises DictionaryError when the service itself fails.
+    """
+    try:
+        r = get_session().get(DICTIONARY_URL.format(word=word), timeout=getattr(settings, "AI_DICTIONARY_TIMEOUT", 8))
+        return _parse_remote(r.status_code, r.json() if r.status_code == 200 else None)
+    except requests.RequestException as e:
+        raise DictionaryError(str(e)) from e
+    except ValueError as e:   # 200 with a body that is not JSON
+        raise DictionaryError(str(e)) from e
+
+
+async def aremote_lookup(word: str, client) -> str:
+    """Async twin of ``remote_lookup`` over a shared httpx client."""
+    try:
+        r = await client.get(DICTIONARY_URL.format(word=word))
+        return _parse_remote(r.status_code, r.json() if r.status_code == 200 else None)
+    except DictionaryError:
+        raise
+    except Exception as e:
+        raise DictionaryError(str(e)) from e
+
+
+def _cache_key(word: str) -> str:
+    return CACHE_PREFIX + word
+
+
+def _ttl(explanation: str) -> int:
+    if explanation:
+        return getattr(settings, "AI_DICTIONARY_CACHE_TTL", 60 * 60 * 24 * 30)
+    return getattr(settings, "AI_DICTIONARY_MISS_TTL", 60 * 60 * 24)
+
+
+def explain(word: str) -> tuple:
+    """
+    Returns (explanation, source) with source "local" / "remote", or ("", None)
+    for words no dictionary knows. Raises DictionaryError on a remote failure.
+    """
+    word = normalize_word(word)
+    explanation = lookup(word)
+    if explanation:
+        return explanation, "local"
+    if not word or not getattr(settings, "AI_DICTIONARY_REMOTE", True):
+        return "", None
+
+    key = _cache_key(word)
+    explanation = shared_cache.get(key)
+    if explanation is None:
+        explanation = remote_lookup(word)
+        shared_cache.set(key, explanation, _ttl(explanation))
+    return explanation, ("remote" if explanation else None)
+
+
+async def aexplain(word: str, client) -> tuple:
+    """Async twin of ``explain``; ``client`` is a shared httpx.AsyncClient."""
+    word = normalize_word(word)
+    # The local index is a memory-mapped B-tree probe — cheap enough to run inline.
+    explanation = lookup(word)
+    if explanation:
+        return explanation, "local"
+    if not word or not getattr(settings, "AI_DICTIONARY_REMOTE", True):
+        return "", None
+
+    key = _cache_key(word)
+    explanation = await sync_to_async(shared_cache.get)(key)
+    if explanation is None:
+        explanation = await aremote_lookup(word, client)
+        await sync_to_async(shared_cache.set)(key, explanation, _ttl(explanation))
+    return explanation, ("remote" if explanation else None)
+
+
+# ── batches ───────────────────────────────────────────────────────────────────
+def batch_words(data: dict) -> tuple:
+    """
+    Reads {"words": ["...", ...]} or {"words": [{"word": "...", "context": "..."}]}.
+    Returns (words, None) or (None, (payload, status)).
+    """
+    items = data.get("words")
+    if not isinstance(items, list) or not items:
+        return None, ({"error": "Provide a non-empty 'words' list."}, 400)
+    limit = getattr(settings, "AI_EXPLAIN_BATCH_MAX", 50)
+    if len(items) > limit:
+        return None, ({"error": f"Too many words ({len(items)}, max {limit})."}, 413)
+    words = [(i.get("word") if isinstance(i, dict) else i) for i in items]
+    return [w.strip() if isinstance(w, str) else "" for w in words], None
+
+
+def _item(word: str, explanation: str, source, error: Exception = None) -> dict:
+    if error is not None:
+        return {"word": word, "error": "Dictionary service unavailable. Please try again.", "status": 503}
+    if not explanation:
+        return {"word": word, "error": f"Definition not found in dictionary for '{word}'.", "status": 404}
+    return {"word": word, "explanation": explanation, "source": source, "status": 200}
+
+
+def _explain_in_thread(word: str) -> tuple:
+    try:
+        return explain(word)
+    finally:
+        # Worker threads open their own DB connections (database cache); don't leak them.
+        connections.close_all()
+
+
+def explain_many(words: list):
+    """
+    Resolves a batch with at most AI_DICTIONARY_CONCURRENCY remote calls in
+    flight. Repeated words are looked up once. Yields (index, item) in
+    completion order; a failing word never fails the batch.
+    """
+    pending = {}   # normalised word → indexes asking for it
+    for index, word in enumerate(words):
+        pending.setdefault(normalize_word(word), []).append(index)
+
+    def emit(word, explanation, source, error=None):
+        for index in pending[word]:
+            yield index, _item(words[index], explanation, source, error)
+
+    remote = []   # words the local index doesn't have
+    for word in pending:
+        explanation = lookup(word)
+        if explanation or not word:
+            yield from emit(word, explanation, "local")
+        else:
+            remote.append(word)
+    if not remote:
+        return
+
+    pool = ThreadPoolExecutor(
+        max_workers=min(len(remote), getattr(settings, "AI_DICTIONARY_CONCURRENCY", 8)),
+        thread_name_prefix="dict",
+    )
+    try:
+        futures = {pool.submit(_explain_in_thread, word): word for word in remote}
+        for future in as_completed(futures):
+            try:
+                result, error = future.result(), None
+            except Exception as e:
+                result, error = ("", None), e
+            yield from emit(futures[future], *result, error)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def aexplain_many(words: list, client):
+    """Async twin of ``explain_many`` bounded by a semaphore."""
+    semaphore = asyncio.Semaphore(getattr(settings, "AI_DICTIONARY_CONCURRENCY", 8))
+    pending = {}
+    for index, word in enumerate(words):
+        pending.setdefault(normalize_word(word), []).append(index)
+    remote = []   # words the local index doesn't have
+    for word in pending:
+        # The local index is a memory-mapped B-tree probe — cheap enough to run inline.
+        explanation = lookup(word)
+        if explanation or not word:
+            for index in pending[word]:
+                yield index, _item(words[index], explanation, "local")
+        else:
+            remote.append(word)
+
+    async def run(word):
+        async with semaphore:
+            try:
+                return word, *(await aexplain(word, client)), None
+            except Exception as e:
+                return word, "", None, e
+
+    tasks = [asyncio.ensure_future(run(word)) for word in remote]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            word, explanation, source, error = await next_done
+            for index in pending[word]:
+                yield index, _item(words[index], explanation, source, error)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+# ── building ──────────────────────────────────────────────────────────────────
+def _from_jsonl(line: str):
+    """kaikki.org / wiktextract line → (word, pos, definition, example, phonetic)."""
+    item = json.loads(line)
+    if item.get("lang_code", "en") != "en":
+        return None
+    word = (item.get("word") or "").strip().lower()
+    for sense in item.get("senses", []):
+        glosses = sense.get("glosses") or []
+        if not glosses:
+            continue
+        examples = sense.get("examples") or []
+        example = next((e.get("text", "") for e in examples if e.get("text")), "")
+        phonetic = next((s["ipa"] for s in item.get("sounds", []) if s.get("ipa")), "")
+        return word, item.get("pos", ""), glosses[-1], example, phonetic
+    return None
+
+
+def _from_tsv(line: str):
+    """word <TAB> pos <TAB> definition [<TAB> example [<TAB> phonetic]]"""
+    if line.startswith("#"):
+        return None
+    cols = line.rstrip("\n").split("\t") + ["", ""]
+    if len(cols) < 5 or not cols[2].strip():
+        return None
+    return cols[0].strip().lower(), cols[1].strip(), cols[2].strip(), cols[3].strip(), cols[4].strip()
+
+
+PARSERS = {"jsonl": _from_jsonl, "tsv": _from_tsv}
+
+
+def build_index(lines, output: str, fmt: str, meanings_per_word: int = 4) -> int:
+    """
+    Writes a fresh index from source ``lines`` and atomically swaps it into
+    ``output``. Keeps the first sense of each part of speech, up to
+    ``meanings_per_word`` per word. Returns the number of words indexed.
+    """
+    parse = PARSERS[fmt]
+    tmp = f"{output}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+
+    conn = sqlite3.connect(tmp)
+    conn.executescript("PRAGMA journal_mode = OFF; PRAGMA synchronous = OFF;" + SCHEMA)
+    seen = {}   # word → parts of speech already stored
+    batch, phonetics = [], []
+    for line in lines:
+        try:
+            row = parse(line)
+        except (ValueError, KeyError, TypeError, AttributeError):
+            continue
+        if not row or not row[0]:
+            continue
+        word, pos, definition, example, phonetic = row
+        stored = seen.setdefault(word, [])
+        if pos in stored or len(stored) >= meanings_per_word:
+            continue
+        if not stored and phonetic:
+            phonetics.append((word, phonetic))
+        batch.append((word, len(stored), pos, definition, example))
+        stored.append(pos)
+        if len(batch) >= 10000:
+            conn.executemany("INSERT INTO meanings VALUES (?, ?, ?, ?, ?)", batch)
+            conn.executemany("INSERT OR IGNORE INTO phonetics VALUES (?, ?)", phonetics)
+            batch, phonetics = [], []
+    conn.executemany("INSERT INTO meanings VALUES (?, ?, ?, ?, ?)", batch)
+    conn.executemany("INSERT OR IGNORE INTO phonetics VALUES (?, ?)", phonetics)
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+
+    os.replace(tmp, output)
+    return len(seen)
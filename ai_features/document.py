@@ -0,0 +1,371 @@
+"""
+Whole-document map-reduce for simplify / structure.
+
+Instead of cutting input off at 1500 characters, a document is split into
+token-bounded chunks on paragraph and sentence boundaries (map input), each
+chunk goes through the normal completion path — result cache, coalescing,
+gateway — with bounded parallelism (map), and the outputs are stitched back
+together in document order (reduce). For structure the reduce step merges
+the per-chunk bullet lists and drops repeated points.
+
+``map_chunks`` / ``amap_chunks`` yield results as they complete, so callers
+can hand partial results to the reader while later chunks are in flight.
+"""
+
+import asyncio
+import codecs
+import math
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.db import connections
+
+from library.compression import open_stored
+from library.models import UserFile
+from . import textstore
+from .completions import RESULT_KEYS, acomplete, complete, error_payload
+from .streaming import sse_event
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_BULLET_RE = re.compile(r"^\s*(?:[•\-\*–]|\d+[.)])\s*")
+_NON_WORD_RE = re.compile(r"\W+")
+
+CHARS_PER_TOKEN = 4   # rough average for English prose
+TEXT_FILE_TYPES = ("TXT", "MD", "HTML", "RTF")
+READ_BLOCK = 64 * 1024
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def split_paragraphs(text: str) -> list:
+    """Blank-line separated paragraphs with internal whitespace collapsed."""
+    paragraphs = (" ".join(p.split()) for p in _PARAGRAPH_RE.split(text))
+    return [p for p in paragraphs if p]
+
+
+def _pieces(text: str, max_chars: int):
+    """Yields (piece, starts_paragraph) no longer than max_chars."""
+    for paragraph in split_paragraphs(text):
+        if len(paragraph) <= max_chars:
+            yield paragraph, True
+            continue
+
+        first = True
+        for sentence in _SENTENCE_RE.split(paragraph):
+            while len(sentence) > max_chars:
+                # A single run-on sentence: cut at the last space that fits.
+                cut = sentence.rfind(" ", 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                yield sentence[:cut], first
+                sentence = sentence[cut:].lstrip()
+                first = False
+            if sentence:
+                yield sentence, first
+                first = False
+
+
+def split_chunks(text: str, max_tokens: int = None) -> list:
+    """Packs paragraphs / sentences into chunks of at most ``max_tokens``."""
+    max_tokens = max_tokens or getattr(settings, "AI_CHUNK_TOKENS", 375)
+    max_chars = max_tokens * CHARS_PER_TOKEN
+
+    chunks, current, size = [], [], 0
+    for piece, starts_paragraph in _pieces(text, max_chars):
+        sep = "\n\n" if starts_paragraph else " "
+        if current and size + len(sep) + len(piece) > max_chars:
+            chunks.append("".join(current).strip())
+            current, size = [], 0
+        if current:
+            current.append(sep)
+            size += len(sep)
+        current.append(piece)
+        size += len(piece)
+    if current:
+        chunks.append("".join(current).strip())
+    return chunks
+
+
+# ── map ───────────────────────────────────────────────────────────────────────
+def _complete_in_thread(task: str, text: str) -> tuple:
+    try:
+        return complete(task, text)
+    finally:
+        # Worker threads open their own DB connections; don't leak them.
+        connections.close_all()
+
+
+def map_chunks(task: str, chunks: list, concurrency: int = None):
+    """
+    Runs ``task`` over every chunk with at most ``concurrency`` calls in flight.
+    Yields (index, output, cached, error) in completion order.
+    """
+    concurrency = concurrency or getattr(settings, "AI_DOCUMENT_CONCURRENCY", 4)
+    pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"doc-{task}")
+    try:
+        futures = {pool.submit(_complete_in_thread, task, chunk): i for i, chunk in enumerate(chunks)}
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                output, cached = future.result()
+                yield index, output, cached, None
+            except Exception as e:
+                yield index, None, False, e
+    finally:
+        # Client gone or generator closed early: drop chunks not yet started.
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def amap_chunks(task: str, chunks: list, concurrency: int = None):
+    """Async twin of ``map_chunks`` bounded by a semaphore."""
+    concurrency = concurrency or getattr(settings, "AI_DOCUMENT_CONCURRENCY", 4)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(index, chunk):
+        async with semaphore:
+            try:
+                output, cached = await acomplete(task, chunk)
+                return index, output, cached, None
+            except Exception as e:
+                return index, None, False, e
+
+    pending = [asyncio.ensure_future(run(i, chunk)) for i, chunk in enumerate(chunks)]
+    try:
+        for next_done in asyncio.as_completed(pending):
+            yield await next_done
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+# ── reduce ────────────────────────────────────────────────────────────────────
+def merge_bullets(outputs: list) -> str:
+    """Merges per-chunk bullet lists in order, dropping repeated points."""
+    seen, lines = set(), []
+    for output in outputs:
+        for line in output.splitlines():
+            item = _BULLET_RE.sub("", line).strip()
+            if not item:
+                continue
+            normalized = _NON_WORD_RE.sub(" ", item.lower()).strip()
+            if normalized in seen:
+                continue
+            seen.add(normalized)
+            lines.append(f"• {item}")
+    return "\n".join(lines)
+
+
+def stitch(task: str, outputs: list) -> str:
+    """Reduces ordered chunk outputs (None for failed chunks) to one result."""
+    outputs = [o for o in outputs if o]
+    if task == "structure":
+        return merge_bullets(outputs)
+    return "\n\n".join(outputs)
+
+
+def text_store_path(content_hash: str) -> str:
+    """Where extraction.extract keeps a document's page-indexed text."""
+    directory = getattr(settings, "AI_TEXT_STORE_DIR", settings.BASE_DIR / "data" / "text")
+    return os.path.join(str(directory), content_hash[:2], f"{content_hash}.nrtx")
+
+
+def extracted_text_path(user_file):
+    """The file's extracted text store, or None if it has not been extracted."""
+    if not user_file.content_hash:
+        return None
+    path = text_store_path(user_file.content_hash)
+    return path if os.path.exists(path) else None
+
+
+def has_text(user_file) -> bool:
+    return user_file.file_type in TEXT_FILE_TYPES or extracted_text_path(user_file) is not None
+
+
+def _stored_pages(path: str):
+    for number, page in enumerate(textstore.iter_pages(path)):
+        if number:
+            yield "\n\n"   # page breaks read as paragraph breaks
+        yield page
+
+
+def iter_file_text(user_file, max_chars: int = None, block: int = READ_BLOCK):
+    """
+    Decoded text of a UserFile, ``block`` bytes at a time, stopping after
+    ``max_chars`` characters — the file is never held in memory whole.
+    Other formats (PDF) come page by page from their extracted text store.
+    """
+    if user_file.file_type in TEXT_FILE_TYPES:
+        chunks = _raw_text(user_file, block)
+    else:
+        path = extracted_text_path(user_file)
+        chunks = _stored_pages(path) if path else iter(())
+    remaining = max_chars
+    for text in chunks:
+        if remaining is not None:
+            text = text[:remaining]
+            remaining -= len(text)
+        if text:
+            yield text
+        if remaining == 0:
+            break
+
+
+def _raw_text(user_file, block: int):
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    with open_stored(user_file.file) as f:
+        while data := f.read(block):
+            yield decoder.decode(data)
+    yield decoder.decode(b"", final=True)
+
+
+def load_file_text(user_file, max_chars: int = None):
+    """
+    Returns the text of a UserFile (at most ``max_chars`` characters), or
+    None when it needs server-side extraction (PDF) that has not run yet.
+    """
+    if not has_text(user_file):
+        return None
+    return "".join(iter_file_text(user_file, max_chars))
+
+
+def _file_chars(file_id, user) -> int:
+    """
+    Estimated characters of one of ``user``'s files without reading it: the
+    byte size for text formats, pages × AI_TEXT_PAGE_CHARS once extracted.
+    """
+    try:
+        user_file = UserFile.objects.get(id=file_id, user=user)
+    except (UserFile.DoesNotExist, ValueError, TypeError):
+        return 0   # answered with 404 before any chunk runs
+    if user_file.file_type in TEXT_FILE_TYPES:
+        return user_file.size
+    path = extracted_text_path(user_file)
+    return textstore.page_count(path) * getattr(settings, "AI_TEXT_PAGE_CHARS", 3000) if path else 0
+
+
+def document_cost(data, user=None) -> int:
+    """Rate-limit tokens for a document request: its estimated chunk count."""
+    if not hasattr(data, "get"):
+        return 1
+    text = data.get("text")
+    if isinstance(text, str) and text.strip():
+        chars = len(text)
+    else:
+        chars = _file_chars(data.get("file_id"), user)
+    max_chars = getattr(settings, "AI_CHUNK_TOKENS", 375) * CHARS_PER_TOKEN
+    # Longer documents are refused (413) before any chunk runs.
+    max_chunks = getattr(settings, "AI_DOCUMENT_MAX_CHUNKS", 200)
+    return max(1, min(math.ceil(chars / max_chars), max_chunks))
+
+
+def resolve_chunks(data: dict, user) -> tuple:
+    """
+    Reads {"text": ...} or {"file_id": ...} from a request body and splits it.
+    Returns (chunks, None) or (None, (payload, status)).
+    """
+    text = (data.get("text") or "").strip()
+    file_id = data.get("file_id")
+    max_chunks = getattr(settings, "AI_DOCUMENT_MAX_CHUNKS", 200)
+
+    if not text and file_id:
+        try:
+            user_file = UserFile.objects.get(id=file_id, user=user)
+        except (UserFile.DoesNotExist, ValueError, TypeError):
+            return None, ({"error": "File not found."}, 404)
+        # Read at most the longest document accepted, plus a character to tell if there is more.
+        limit = max_chunks * getattr(settings, "AI_CHUNK_TOKENS", 375) * CHARS_PER_TOKEN
+        text = load_file_text(user_file, max_chars=limit + 1)
+        if text is None:
+            # PDF whose text the extract job hasn't produced (yet): 202 / 422.
+            from .jobs import extraction_pending   # jobs imports this module
+            payload, status = extraction_pending(user_file)
+            return None, ({"file_id": user_file.id, **payload}, status)
+        if len(text) > limit:
+            return None, ({"error": f"Document is too long (over {limit} characters, max {max_chunks} sections)."}, 413)
+        text = text.strip()
+
+    if not text:
+        return None, ({"error": "No text provided."}, 400)
+
+    chunks = split_chunks(text)
+    if len(chunks) > max_chunks:
+        return None, ({"error": f"Document is too long ({len(chunks)} sections, max {max_chunks})."}, 413)
+    return chunks, None
+
+
+# ── responses ─────────────────────────────────────────────────────────────────
+class _Collector:
+    """Accumulates chunk results in document order."""
+
+    def __init__(self, task: str, total: int):
+        self.task = task
+        self.outputs = [None] * total
+        self.chunks = [None] * total
+        self.errors = []
+
+    def add(self, index, output, cached, error) -> dict:
+        if error is None:
+            self.outputs[index] = output
+            item = {"index": index, "output": output, "cached": cached}
+        else:
+            payload, status = error_payload(error)
+            self.errors.append((payload, status))
+            item = {"index": index, **payload, "status": status}
+        self.chunks[index] = item
+        return item
+
+    def result(self) -> dict:
+        return {
+            RESULT_KEYS[self.task]: stitch(self.task, self.outputs),
+            "chunks": self.chunks,
+            "complete": not self.errors,
+        }
+
+
+def _event(collector: _Collector, total: int, result: tuple) -> str:
+    item = collector.add(*result)
+    return sse_event("chunk" if result[3] is None else "chunk_error", {**item, "total": total})
+
+
+def _done(collector: _Collector) -> str:
+    result = collector.result()
+    result.pop("chunks")
+    return sse_event("done", {**result, "failed": [i for i, o in enumerate(collector.outputs) if o is None]})
+
+
+def run_document(task: str, chunks: list) -> tuple:
+    """Maps and reduces a whole document. Returns (payload, status)."""
+    collector = _Collector(task, len(chunks))
+    for result in map_chunks(task, chunks):
+        collector.add(*result)
+    if len(collector.errors) == len(chunks):
+        return collector.errors[0]
+    return collector.result(), 200
+
+
+async def arun_document(task: str, chunks: list) -> tuple:
+    collector = _Collector(task, len(chunks))
+    async for result in amap_chunks(task, chunks):
+        collector.add(*result)
+    if len(collector.errors) == len(chunks):
+        return collector.errors[0]
+    return collector.result(), 200
+
+
+def document_events(task: str, chunks: list):
+    """SSE: one ``chunk`` event per finished chunk, then ``done`` with the stitched result."""
+    collector = _Collector(task, len(chunks))
+    for result in map_chunks(task, chunks):
+        yield _event(collector, len(chunks), result)
+    yield _done(collector)
+
+
+async def adocument_events(task: str, chunks: list):
+    collector = _Collector(task, len(chunks))
+    async for result in amap_chunks(task, chunks):
+        yield _event(collector, len(chunks), result)
+    yield _done(collector)
@@ -0,0 +1,127 @@
+"""
+Server-side text extraction for uploads.
+
+Each document is parsed once, by the ``extract`` job, in a separate
+``python -m ai_features.extractors`` process with CPU-time and memory caps
+(settings.AI_EXTRACT_*) plus a wall-clock timeout, so a malformed or
+hostile PDF can only kill its own process. The text is stored page by page
+in a textstore file named by the file's content hash — identical uploads
+share it — and read back one page at a time:
+
+    GET /api/library/files/<pk>/pages/            → {"pages": n, ...}
+    GET /api/library/files/<pk>/pages/<n>/text/   → {"page": n, "text": "..."}
+
+Everything that reads file text (document.iter_file_text / load_file_text)
+falls back to this store for PDFs once it exists.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from library.compression import encoding_of, open_stored
+from . import textstore
+from .document import extracted_text_path, text_store_path
+from .extractors import UNAVAILABLE
+
+
+class ExtractionError(Exception):
+    pass
+
+
+class ExtractionUnavailable(ExtractionError):
+    """The format can't be extracted on this server (e.g. pypdf not installed)."""
+
+
+@contextmanager
+def _local_copy(user_file):
+    """
+    A filesystem path to the upload's original bytes, copied out of remote
+    storage or decompressed if needed.
+    """
+    try:
+        path = user_file.file.path
+    except NotImplementedError:
+        path = None
+    if path is not None and not encoding_of(path):
+        yield path
+        return
+    with tempfile.NamedTemporaryFile(suffix=os.path.splitext(user_file.download_name)[1]) as tmp:
+        with open_stored(user_file.file) as f:
+            shutil.copyfileobj(f, tmp)
+        tmp.flush()
+        yield tmp.name
+
+
+def _run(file_type: str, source: str, output: str) -> dict:
+    timeout = getattr(settings, "AI_EXTRACT_TIMEOUT", 120)
+    command = [
+        sys.executable, "-m", "ai_features.extractors", file_type, source, output,
+        "--page-chars", str(getattr(settings, "AI_TEXT_PAGE_CHARS", 3000)),
+        "--cpu-seconds", str(getattr(settings, "AI_EXTRACT_CPU_SECONDS", 60)),
+        "--memory-mb", str(getattr(settings, "AI_EXTRACT_MEMORY_MB", 1024)),
+    ]
+    try:
+        process = subprocess.run(
+            command, cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=timeout,
+        )
+    except subprocess.TimeoutExpired:
+        raise ExtractionError(f"Extraction took longer than {timeout}s.")
+
+    if process.returncode == UNAVAILABLE:
+        raise ExtractionUnavailable(process.stderr.strip())
+    if process.returncode < 0:
+        raise ExtractionError(f"Extraction was killed by signal {-process.returncode} (CPU or memory limit).")
+    if process.returncode != 0:
+        lines = process.stderr.strip().splitlines()
+        raise ExtractionError(lines[-1] if lines else f"Extraction failed (exit status {process.returncode}).")
+    return json.loads(process.stdout)
+
+
+def extract(user_file) -> dict:
+    """
+    Extracts the file's text into its page store unless that already exists.
+    Returns {"pages": n, "characters": n} ({"pages": n, "reused": True} if it did).
+    """
+    existing = extracted_text_path(user_file)
+    if existing is not None:
+        return {"pages": textstore.page_count(existing), "reused": True}
+
+    path = text_store_path(user_file.ensure_content_hash())
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    os.close(fd)
+    try:
+        with _local_copy(user_file) as source:
+            summary = _run(user_file.file_type, source, tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return summary
+
+
+def page_count(user_file):
+    """Number of extracted pages, or None before extraction."""
+    path = extracted_text_path(user_file)
+    return textstore.page_count(path) if path else None
+
+
+def page_text(user_file, number: int):
+    """Text of page ``number`` (1-based), None before extraction; IndexError if out of range."""
+    path = extracted_text_path(user_file)
+    return textstore.read_page(path, number) if path else None
+
+
+def forget(content_hash: str):
+    """Removes the page store of contents no remaining file has."""
+    try:
+        os.remove(text_store_path(content_hash))
+    except FileNotFoundError:
+        pass
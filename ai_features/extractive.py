@@ -0,0 +1,191 @@
+"""
+Local extractive structuring engine.
+
+Picks the key sentences of a passage and returns them as "•" bullets — the
+same shape StructureView gets from the model — without a network call:
+
+    sentences → TF-IDF vectors → cosine similarity graph → TextRank scores
+    → top sentences (near-duplicates dropped) in document order
+
+Everything is a handful of NumPy operations over a sentences × terms matrix,
+so a page of text takes a few milliseconds on one core.
+
+settings.AI_STRUCTURE_ENGINE (or "engine" in the request body) chooses how
+/structure/ uses it:
+
+    llm         the model only (the previous behaviour)
+    extractive  this engine only
+    instant     cached model output if there is one, otherwise these bullets
+                right away while the model result is computed in the background
+    fallback    the model, and these bullets when the model call fails for a
+                passing reason (timeout, cold start, rate limit); auth and
+                configuration errors are still reported as errors
+"""
+
+import logging
+import math
+import re
+
+import numpy as np
+from django.conf import settings
+
+from .gateway import classify
+from .streaming import sse_event
+
+logger = logging.getLogger(__name__)
+
+ENGINES = ("llm", "extractive", "instant", "fallback")
+# Model failures the local bullets stand in for. The rest (auth, unsupported,
+# upstream) mean something needs fixing, so clients and logs must see them.
+FALLBACK_KINDS = {"timeout", "unavailable", "rate_limited"}
+
+# Split after end punctuation, keeping a closing quote or bracket on the sentence it ends.
+_SENTENCE_RE = re.compile(r"(?:(?<=[.!?])|(?<=[.!?][\"'”’)\]]))\s+(?=[\"'“‘(\[]?[A-Z0-9])|\n+")
+_WORD_RE = re.compile(r"[a-z][a-z'-]+")
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being
+below between both but by can could did do does doing down during each few for from further had has
+have having he her here hers herself him himself his how however i if in into is it its itself just
+let like may me might more most must my myself no nor not now of off on once only or other our ours
+ourselves out over own same shall she should so some such than that the their theirs them themselves
+then there these they this those through thus to too under until up upon us very was we were what
+when where which while who whom why will with within without would yet you your yours yourself
+""".split())
+
+DAMPING = 0.85
+MAX_ITERATIONS = 50
+TOLERANCE = 1e-6
+REDUNDANCY = 0.8   # cosine similarity above which a sentence repeats a chosen one
+
+
+def split_sentences(text: str) -> list:
+    sentences = (" ".join(s.split()) for s in _SENTENCE_RE.split(text))
+    return [s for s in sentences if s]
+
+
+def _terms(sentence: str) -> list:
+    terms = []
+    for word in _WORD_RE.findall(sentence.lower()):
+        if word in STOPWORDS:
+            continue
+        # Cheap plural folding so "models" and "model" share a dimension.
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+def tfidf_matrix(sentences: list) -> np.ndarray:
+    """Rows are L2-normalised TF-IDF vectors, one per sentence."""
+    vocabulary, rows, cols = {}, [], []
+    for i, sentence in enumerate(sentences):
+        for term in _terms(sentence):
+            rows.append(i)
+            cols.append(vocabulary.setdefault(term, len(vocabulary)))
+
+    counts = np.zeros((len(sentences), max(len(vocabulary), 1)))
+    np.add.at(counts, (rows, cols), 1.0)
+
+    tf = counts / np.maximum(counts.sum(axis=1, keepdims=True), 1.0)
+    df = np.count_nonzero(counts, axis=0)
+    idf = np.log((1.0 + len(sentences)) / (1.0 + df)) + 1.0
+    matrix = tf * idf
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+def textrank(similarity: np.ndarray) -> np.ndarray:
+    """PageRank over a sentence similarity graph (self-loops ignored)."""
+    n = similarity.shape[0]
+    weights = similarity.copy()
+    np.fill_diagonal(weights, 0.0)
+    out = weights.sum(axis=1, keepdims=True)
+    # Sentences sharing no terms with any other link to every sentence evenly.
+    transition = np.where(out > 0, weights / np.where(out == 0, 1.0, out), 1.0 / n)
+
+    scores = np.full(n, 1.0 / n)
+    for _ in range(MAX_ITERATIONS):
+        updated = (1.0 - DAMPING) / n + DAMPING * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < TOLERANCE:
+            return updated
+        scores = updated
+    return scores
+
+
+def bullet_count(sentences: int) -> int:
+    limit = getattr(settings, "AI_EXTRACTIVE_BULLETS", 6)
+    if sentences <= 3:
+        return sentences
+    return min(limit, max(3, math.ceil(sentences / 4)))
+
+
+def summarize(text: str, max_bullets: int = None) -> str:
+    """Key sentences of ``text`` as "•" bullets, in document order."""
+    sentences = split_sentences(text)
+    if not sentences:
+        return ""
+
+    k = max_bullets or bullet_count(len(sentences))
+    if len(sentences) <= k:
+        return "\n".join(f"• {s}" for s in sentences)
+
+    matrix = tfidf_matrix(sentences)
+    similarity = matrix @ matrix.T
+    scores = textrank(similarity)
+
+    chosen = []
+    for i in np.argsort(-scores, kind="stable"):
+        if len(chosen) == k:
+            break
+        if any(similarity[i, j] > REDUNDANCY for j in chosen):
+            continue
+        chosen.append(int(i))
+    return "\n".join(f"• {sentences[i]}" for i in sorted(chosen))
+
+
+# ── StructureView integration ─────────────────────────────────────────────────
+def engine(data) -> str:
+    requested = data.get("engine") if hasattr(data, "get") else None
+    if requested in ENGINES:
+        return requested
+    return getattr(settings, "AI_STRUCTURE_ENGINE", "fallback")
+
+
+def payload(text: str, error: Exception = None) -> dict:
+    """A /structure/ response body built locally; ``error`` is the model failure it replaces."""
+    result = {"structured": summarize(text), "cached": False, "engine": "extractive"}
+    if error is not None:
+        result["fallback"] = classify(error).kind
+    return result
+
+
+def fallback(text: str, error: Exception):
+    """
+    ``payload`` in place of a failed model call, or None when the failure
+    isn't one of FALLBACK_KINDS and should be reported as an error.
+    """
+    kind = classify(error).kind
+    if kind not in FALLBACK_KINDS:
+        return None
+    logger.warning("Structure model unavailable (%s); answering with extractive bullets", kind)
+    return payload(text, error)
+
+
+def events(text: str):
+    """SSE events for a locally structured answer (token + done, like a cache hit)."""
+    result = payload(text)
+    yield sse_event("token", {"text": result["structured"]})
+    yield sse_event("done", result)
+
+
+def with_draft(text: str, events):
+    """Sends the local bullets as a ``draft`` event before the model's stream."""
+    yield sse_event("draft", payload(text))
+    yield from events
+
+
+async def awith_draft(text: str, events):
+    yield sse_event("draft", payload(text))
+    async for event in events:
+        yield event
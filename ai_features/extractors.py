@@ -0,0 +1,209 @@
+"""
+Per-format text extraction, run in a separate, resource-limited process by
+ai_features.extraction:
+
+    python -m ai_features.extractors [--cpu-seconds N] [--memory-mb N] \
+        <file_type> <source> <output> [--page-chars N]
+
+writes a textstore file to <output> and prints {"pages": n, "characters": n}.
+The process caps its own CPU time and address space first (POSIX), so a
+hostile or broken document is killed instead of taking the server with it.
+Exit status 3 means the format cannot be extracted here (pypdf not installed).
+
+PDF pages are the PDF's own pages. TXT / MD / HTML / RTF have none, so their
+text is cut into pages of about <page_chars> characters at paragraph, line
+or word boundaries; joining the pages gives back the text exactly.
+
+Standard library only, except pypdf for PDFs (requirements.txt), imported
+only when a PDF is extracted.
+"""
+
+import argparse
+import json
+import re
+import sys
+from html.parser import HTMLParser
+
+try:
+    import resource
+except ImportError:   # Windows: only the caller's wall-clock timeout applies
+    resource = None
+
+from ai_features import textstore
+
+UNAVAILABLE = 3
+PAGE_CHARS = 3000
+
+
+class ExtractionUnavailable(Exception):
+    pass
+
+
+def paginate(text: str, page_chars: int = PAGE_CHARS):
+    """Cuts ``text`` into pages of at most ``page_chars``, preferring natural breaks."""
+    start = 0
+    while len(text) - start > page_chars:
+        limit = start + page_chars
+        for separator in ("\n\n", "\n", " "):
+            cut = text.rfind(separator, start + page_chars // 2, limit)
+            if cut != -1:
+                cut += len(separator)
+                break
+        else:
+            cut = limit
+        yield text[start:cut]
+        start = cut
+    if start < len(text) or not text:
+        yield text[start:]
+
+
+def _read(path: str) -> str:
+    with open(path, "rb") as f:
+        return f.read().decode("utf-8", errors="replace")
+
+
+# ── HTML ──────────────────────────────────────────────────────────────────────
+class _HTMLText(HTMLParser):
+    SKIP = {"script", "style", "head", "template", "noscript"}
+    BLOCKS = {
+        "p", "div", "br", "li", "ul", "ol", "tr", "table", "section", "article",
+        "header", "footer", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre",
+    }
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts, self.skipping = [], 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self.skipping += 1
+        elif tag in self.BLOCKS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP:
+            self.skipping = max(0, self.skipping - 1)
+        elif tag in self.BLOCKS:
+            self.parts.append("\n\n" if tag in ("p", "div", "li", "blockquote") or tag[0] == "h" else "\n")
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.parts.append(re.sub(r"\s+", " ", data))
+
+
+def html_text(source: str) -> str:
+    parser = _HTMLText()
+    parser.feed(source)
+    parser.close()
+    text = re.sub(r"[ \t]*\n[ \t]*", "\n", "".join(parser.parts))
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+# ── RTF ───────────────────────────────────────────────────────────────────────
+_RTF_TOKEN = re.compile(r"\\([a-z]{1,32})(-?\d{1,10})? ?|\\'([0-9a-f]{2})|\\([^a-z])|([{}])|[\r\n]+|([^\\{}\r\n]+)", re.I)
+_RTF_DESTINATIONS = {
+    "fonttbl", "colortbl", "stylesheet", "info", "pict", "header", "footer", "headerl", "headerr",
+    "footerl", "footerr", "listtable", "listoverridetable", "rsidtbl", "generator", "xmlnstbl",
+}
+_RTF_BREAKS = {"par": "\n\n", "line": "\n", "tab": "\t", "emdash": "—", "endash": "–", "bullet": "•"}
+
+
+def rtf_text(source: str) -> str:
+    """Plain text of an RTF document: control words dropped, destinations skipped."""
+    out, stack, skip, ignorable = [], [], False, False
+    fallback = 0   # characters still to drop after a \uN escape
+    for word, number, hex_code, symbol, brace, text in _RTF_TOKEN.findall(source):
+        if fallback and (hex_code or text):
+            if text and len(text) > fallback:
+                text = text[fallback:]
+                fallback = 0
+            else:
+                fallback -= 1 if hex_code else len(text)
+                continue
+        if brace == "{":
+            stack.append(skip)
+        elif brace == "}":
+            skip = stack.pop() if stack else False
+        elif symbol == "*":
+            ignorable = True
+            continue
+        elif skip:
+            pass
+        elif word:
+            word = word.lower()
+            if word in _RTF_DESTINATIONS or ignorable:
+                skip = True
+            elif word in _RTF_BREAKS:
+                out.append(_RTF_BREAKS[word])
+            elif word == "u" and number:
+                out.append(chr(int(number) % 0x10000))
+                fallback = 1
+        elif hex_code:
+            out.append(bytes([int(hex_code, 16)]).decode("cp1252", errors="replace"))
+        elif text:
+            out.append(text)
+        elif symbol in ("\\", "{", "}"):
+            out.append(symbol)
+        elif symbol == "~":
+            out.append("\u00a0")
+        ignorable = False
+    return re.sub(r"\n{3,}", "\n\n", "".join(out)).strip()
+
+
+# ── PDF ───────────────────────────────────────────────────────────────────────
+def pdf_pages(path: str):
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise ExtractionUnavailable("PDF text extraction needs the 'pypdf' package (pip install -r requirements.txt).")
+    for page in PdfReader(path).pages:
+        yield page.extract_text() or ""
+
+
+def pages(file_type: str, path: str, page_chars: int = PAGE_CHARS):
+    """Yields the text of each page of the file at ``path``."""
+    if file_type == "PDF":
+        yield from pdf_pages(path)
+    elif file_type == "HTML":
+        yield from paginate(html_text(_read(path)), page_chars)
+    elif file_type == "RTF":
+        yield from paginate(rtf_text(_read(path)), page_chars)
+    elif file_type in ("TXT", "MD"):
+        yield from paginate(_read(path), page_chars)
+    else:
+        raise ExtractionUnavailable(f"No extractor for {file_type} files.")
+
+
+def limit_resources(cpu_seconds: int, memory_mb: int):
+    if resource is None:
+        return
+    if cpu_seconds:
+        # SIGXCPU at the soft limit, SIGKILL at the hard one.
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 5))
+    if memory_mb:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def main(argv) -> int:
+    parser = argparse.ArgumentParser(prog="python -m ai_features.extractors")
+    parser.add_argument("file_type")
+    parser.add_argument("source")
+    parser.add_argument("output")
+    parser.add_argument("--page-chars", type=int, default=PAGE_CHARS)
+    parser.add_argument("--cpu-seconds", type=int, default=0)
+    parser.add_argument("--memory-mb", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    limit_resources(args.cpu_seconds, args.memory_mb)
+    try:
+        count, characters = textstore.write(args.output, pages(args.file_type, args.source, args.page_chars))
+    except ExtractionUnavailable as e:
+        print(str(e), file=sys.stderr)
+        return UNAVAILABLE
+    print(json.dumps({"pages": count, "characters": characters}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
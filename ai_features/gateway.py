@@ -0,0 +1,399 @@
+"""
+LLM gateway for the AI features.
+
+One place that owns the HuggingFace clients and decides which model answers:
+
+* Clients are built once and reused (the async client once per event loop),
+  so requests share connection pools instead of re-handshaking every time.
+* Each task ("simplify", "structure", ...) has an ordered fallback chain of
+  models (AI_MODEL_CHAINS). An unsupported, cold, rate-limited or failing
+  model is skipped and the next one is tried.
+* Latency and errors are tracked per model; the p95 latency drives hedging.
+* With AI_HEDGE enabled, if the first model has not answered within its p95
+  budget, the next model in the chain is fired too and the first answer wins.
+* Upstream exceptions are classified into a GatewayError with a stable
+  ``kind``, which is what the views turn into an HTTP status and message.
+
+Point AI_INFERENCE_BASE_URL at any OpenAI-compatible server (e.g. a local stub)
+to exercise the whole path without a HuggingFace key.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+
+from django.conf import settings
+from huggingface_hub import AsyncInferenceClient, InferenceClient
+
+logger = logging.getLogger(__name__)
+
+
+# ── Error classification ──────────────────────────────────────────────────────
+class GatewayError(Exception):
+    """
+    An upstream failure with a stable classification.
+    kind is one of: unsupported, timeout, unavailable, rate_limited, auth, upstream.
+    """
+
+    # kind → (HTTP status for our client, user-facing message)
+    RESPONSES = {
+        "unsupported": (502, "The configured AI models are not available for this task. Please try again later."),
+        "timeout": (503, "AI model is waking up (cold start). Please try again in 30 seconds."),
+        "unavailable": (503, "AI model is waking up (cold start). Please try again in 30 seconds."),
+        "rate_limited": (429, "The AI service is busy right now. Please try again shortly."),
+        "auth": (502, "Invalid HuggingFace API key or missing permissions."),
+        "upstream": (502, "AI request failed."),
+    }
+
+    def __init__(self, kind: str, message: str, model: str = "", attempts: list = None):
+        super().__init__(message)
+        self.kind = kind
+        self.model = model
+        self.attempts = attempts or []
+
+    @property
+    def status(self) -> int:
+        return self.RESPONSES[self.kind][0]
+
+    def payload(self) -> dict:
+        message = self.RESPONSES[self.kind][1]
+        if self.kind == "upstream":
+            message = f"AI request failed: {str(self)[:200]}"
+        return {"error": message, "kind": self.kind}
+
+
+def classify(exc: Exception, model: str = "") -> GatewayError:
+    """Maps any client exception to a GatewayError."""
+    if isinstance(exc, GatewayError):
+        return exc
+
+    message = str(exc)
+    lowered = message.lower()
+
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None)
+
+    if isinstance(exc, (TimeoutError, asyncio.TimeoutError)) or "timeout" in type(exc).__name__.lower():
+        kind = "timeout"
+    elif status in (401,):
+        kind = "auth"
+    elif status == 429:
+        kind = "rate_limited"
+    elif status in (503, 504):
+        kind = "unavailable"
+    elif status in (403, 404) or (status in (400, 422) and "support" in lowered):
+        kind = "unsupported"
+    elif "model_not_supported" in lowered or "not supported" in lowered or "doesn't support" in lowered:
+        kind = "unsupported"
+    elif "timed out" in lowered or "timeout" in lowered:
+        kind = "timeout"
+    elif "unauthorized" in lowered or "invalid username or password" in lowered:
+        kind = "auth"
+    else:
+        kind = "upstream"
+    return GatewayError(kind, message, model=model)
+
+
+# Kinds for which trying the next model in the chain can help. A 401 means the
+# API key itself is bad, so every other model would fail the same way.
+FALLBACK_KINDS = {"unsupported", "timeout", "unavailable", "rate_limited", "upstream"}
+
+
+# ── Per-model statistics ──────────────────────────────────────────────────────
+class ModelStats:
+    """Rolling latency window and error counts for one model (per process)."""
+
+    WINDOW = 200
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = deque(maxlen=self.WINDOW)
+        self.successes = 0
+        self.errors = {}
+
+    def record_success(self, seconds: float):
+        with self._lock:
+            self.latencies.append(seconds)
+            self.successes += 1
+
+    def record_error(self, kind: str):
+        with self._lock:
+            self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def percentile(self, pct: float):
+        with self._lock:
+            ordered = sorted(self.latencies)
+        if not ordered:
+            return None
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def as_dict(self) -> dict:
+        p50, p95 = self.percentile(50), self.percentile(95)
+        return {
+            "successes": self.successes,
+            "errors": dict(self.errors),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+
+@dataclass
+class Completion:
+    text: str
+    model: str
+    latency: float
+
+
+# ── Gateway ───────────────────────────────────────────────────────────────────
+class LLMGateway:
+    """Pooled clients + per-task fallback chains + optional hedging."""
+
+    def __init__(self, chains: dict, api_key: str = "", base_url: str = None,
+                 timeout: float = 25, hedge: bool = False, hedge_min_delay: float = 2.0):
+        self.chains = {task: list(models) for task, models in chains.items()}
+        self.api_key = api_key
+        self.base_url = base_url or None
+        self.timeout = timeout
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._hedge_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm-hedge")
+
+    @classmethod
+    def from_settings(cls) -> "LLMGateway":
+        return cls(
+            chains=getattr(settings, "AI_MODEL_CHAINS", {}),
+            api_key=getattr(settings, "HF_API_KEY", ""),
+            base_url=getattr(settings, "AI_INFERENCE_BASE_URL", None),
+            timeout=getattr(settings, "AI_REQUEST_TIMEOUT", 25),
+            hedge=getattr(settings, "AI_HEDGE", False),
+            hedge_min_delay=getattr(settings, "AI_HEDGE_MIN_DELAY", 2.0),
+        )
+
+    # ── clients ───────────────────────────────────────────────────────────────
+    def client(self) -> InferenceClient:
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = InferenceClient(
+                        base_url=self.base_url, api_key=self.api_key, timeout=self.timeout
+                    )
+        return self._client
+
+    def async_client(self) -> AsyncInferenceClient:
+        # The async client's connection pool is bound to the running event loop.
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = self._async_clients[loop] = AsyncInferenceClient(
+                base_url=self.base_url, api_key=self.api_key, timeout=self.timeout
+            )
+        return client
+
+    # ── chains & stats ────────────────────────────────────────────────────────
+    def chain(self, task: str) -> list:
+        models = self.chains.get(task)
+        if not models:
+            raise GatewayError("unsupported", f"No models configured for task '{task}'.")
+        return models
+
+    def model_key(self, task: str) -> str:
+        """Identifies the chain for cache keys; changing the chain invalidates them."""
+        return ",".join(self.chain(task))
+
+    def stats_for(self, model: str) -> ModelStats:
+        with self._stats_lock:
+            if model not in self._stats:
+                self._stats[model] = ModelStats()
+            return self._stats[model]
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            models = dict(self._stats)
+        return {
+            "chains": self.chains,
+            "hedge": self.hedge,
+            "models": {name: s.as_dict() for name, s in models.items()},
+        }
+
+    def hedge_delay(self, model: str) -> float:
+        p95 = self.stats_for(model).percentile(95)
+        return max(self.hedge_min_delay, p95 or 0.0)
+
+    # ── sync calls ────────────────────────────────────────────────────────────
+    def _call(self, model: str, messages: list, max_tokens: int) -> Completion:
+        started = time.perf_counter()
+        try:
+            res = self.client().chat_completion(
+                messages=messages, model=model, max_tokens=max_tokens
+            )
+            text = res.choices[0].message.content.strip()
+        except Exception as e:
+            err = classify(e, model)
+            self.stats_for(model).record_error(err.kind)
+            raise err from e
+        latency = time.perf_counter() - started
+        self.stats_for(model).record_success(latency)
+        return Completion(text=text, model=model, latency=latency)
+
+    def complete(self, task: str, messages: list, max_tokens: int = 600) -> Completion:
+        """Runs the task down its fallback chain; raises the last GatewayError."""
+        models = self.chain(task)
+        attempts = []
+        i = 0
+        while i < len(models):
+            model = models[i]
+            backup = models[i + 1] if self.hedge and i + 1 < len(models) else None
+            try:
+                if backup:
+                    return self._hedged(model, backup, messages, max_tokens)
+                return self._call(model, messages, max_tokens)
+            except GatewayError as err:
+                attempts.append({"model": err.model or model, "kind": err.kind})
+                logger.warning("LLM %s failed for %s: %s", err.model or model, task, err.kind)
+                if err.kind not in FALLBACK_KINDS:
+                    err.attempts = attempts
+                    raise
+                last = err
+            # A hedged pair consumes two chain entries.
+            i += 2 if backup else 1
+        last.attempts = attempts
+        raise last
+
+    def _hedged(self, primary: str, backup: str, messages: list, max_tokens: int) -> Completion:
+        first = self._hedge_pool.submit(self._call, primary, messages, max_tokens)
+        done, _ = wait([first], timeout=self.hedge_delay(primary))
+        if done and first.exception() is None:
+            return first.result()
+        # Slow or failed: fire the backup and take whichever answers first.
+        pending = {first, self._hedge_pool.submit(self._call, backup, messages, max_tokens)}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def stream(self, task: str, messages: list, max_tokens: int = 600) -> tuple:
+        """
+        Opens a token stream, falling back while no token has been produced.
+        Returns (model, stream).
+        """
+        last = None
+        for model in self.chain(task):
+            try:
+                stream = self.client().chat_completion(
+                    messages=messages, model=model, max_tokens=max_tokens, stream=True
+                )
+                return model, stream
+            except Exception as e:
+                last = classify(e, model)
+                self.stats_for(model).record_error(last.kind)
+                if last.kind not in FALLBACK_KINDS:
+                    raise last from e
+        raise last
+
+    # ── async calls ───────────────────────────────────────────────────────────
+    async def _acall(self, model: str, messages: list, max_tokens: int) -> Completion:
+        started = time.perf_counter()
+        try:
+            res = await self.async_client().chat_completion(
+                messages=messages, model=model, max_tokens=max_tokens
+            )
+            text = res.choices[0].message.content.strip()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            err = classify(e, model)
+            self.stats_for(model).record_error(err.kind)
+            raise err from e
+        latency = time.perf_counter() - started
+        self.stats_for(model).record_success(latency)
+        return Completion(text=text, model=model, latency=latency)
+
+    async def acomplete(self, task: str, messages: list, max_tokens: int = 600) -> Completion:
+        models = self.chain(task)
+        attempts = []
+        i = 0
+        while i < len(models):
+            model = models[i]
+            backup = models[i + 1] if self.hedge and i + 1 < len(models) else None
+            try:
+                if backup:
+                    return await self._ahedged(model, backup, messages, max_tokens)
+                return await self._acall(model, messages, max_tokens)
+            except GatewayError as err:
+                attempts.append({"model": err.model or model, "kind": err.kind})
+                logger.warning("LLM %s failed for %s: %s", err.model or model, task, err.kind)
+                if err.kind not in FALLBACK_KINDS:
+                    err.attempts = attempts
+                    raise
+                last = err
+            i += 2 if backup else 1
+        last.attempts = attempts
+        raise last
+
+    async def _ahedged(self, primary: str, backup: str, messages: list, max_tokens: int) -> Completion:
+        first = asyncio.ensure_future(self._acall(primary, messages, max_tokens))
+        done, _ = await asyncio.wait({first}, timeout=self.hedge_delay(primary))
+        if done and first.exception() is None:
+            return first.result()
+
+        pending = {first, asyncio.ensure_future(self._acall(backup, messages, max_tokens))}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # The loser is cancelled so we stop paying for its tokens.
+            for task in pending:
+                task.cancel()
+
+    async def astream(self, task: str, messages: list, max_tokens: int = 600) -> tuple:
+        last = None
+        for model in self.chain(task):
+            try:
+                stream = await self.async_client().chat_completion(
+                    messages=messages, model=model, max_tokens=max_tokens, stream=True
+                )
+                return model, stream
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                last = classify(e, model)
+                self.stats_for(model).record_error(last.kind)
+                if last.kind not in FALLBACK_KINDS:
+                    raise last from e
+        raise last
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway() -> LLMGateway:
+    """Process-wide gateway built from settings."""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = LLMGateway.from_settings()
+    return _gateway
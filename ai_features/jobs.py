@@ -0,0 +1,249 @@
+"""
+Database-backed background job queue.
+
+Uploading a file enqueues a small pipeline so AI output is ready before the
+reader asks for it:
+
+    extract     → text of every page, in an isolated process (extraction.py)
+    analyze     → readability of the whole text and of every paragraph
+                  (also fills the per-document annotation cache)
+    precompute  → simplify + structure the hardest paragraphs
+
+Each step enqueues the next one when it succeeds. Precomputed outputs land
+in the AI result cache, so the reader's own /simplify/ and /structure/ calls
+for those paragraphs are cache hits, and they are also kept on the job's
+``result`` for GET /api/ai/jobs/<id>/.
+
+Jobs live in the ``ai_jobs`` table; there is no external broker. Workers
+(``python manage.py run_jobs``) claim a job with a conditional UPDATE, so any
+number of worker processes can share the table. Failed jobs are retried with
+exponential backoff up to ``max_attempts``, and jobs whose worker died are
+re-queued once their lease expires.
+"""
+
+import logging
+import os
+import socket
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import F
+from django.utils import timezone
+
+from . import annotation, extraction
+from .agent.readability import paragraph_spans
+from .agent.tools import TextAnalyzerTool
+from .completions import complete
+from .document import has_text, iter_file_text
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+
+def handler(kind: str):
+    """Registers a job handler: fn(job) -> JSON-serialisable result."""
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+# ── enqueueing ────────────────────────────────────────────────────────────────
+def enqueue(kind: str, user, file=None, payload: dict = None, delay: float = 0) -> Job:
+    return Job.objects.create(
+        kind=kind,
+        user=user,
+        file=file,
+        payload=payload or {},
+        run_after=timezone.now() + timedelta(seconds=delay),
+        max_attempts=getattr(settings, "AI_JOB_MAX_ATTEMPTS", 3),
+    )
+
+
+def enqueue_file_pipeline(user_file) -> Job:
+    """Starts extract → analyze → precompute for one uploaded file."""
+    return enqueue("extract", user_file.user, file=user_file)
+
+
+def extraction_pending(user_file) -> tuple:
+    """
+    (payload, status) for a file whose text isn't extracted: 202 while its
+    extract job is queued or running (queuing one if needed), 422 if the job
+    failed or the format can't be extracted here. Only a ``run_jobs`` worker
+    runs the job; without one, such a file answers 202 until one starts.
+    """
+    job = user_file.ai_jobs.filter(kind="extract").first()
+    if job is None or (job.status == Job.SUCCEEDED and "skipped" not in (job.result or {})):
+        # Never extracted, or the stored text has since been removed.
+        job = enqueue_file_pipeline(user_file)
+    if job.status in (Job.QUEUED, Job.RUNNING):
+        return {"status": job.status, "job": job.id}, 202
+    skipped = (job.result or {}).get("skipped")
+    if skipped:
+        return {"status": "unavailable", "error": skipped}, 422
+    return {"status": job.status, "error": job.error}, 422
+
+
+# ── claiming & running ────────────────────────────────────────────────────────
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def requeue_stale():
+    """Puts back running jobs whose lease expired (worker crashed or was killed)."""
+    lease = getattr(settings, "AI_JOB_LEASE_SECONDS", 600)
+    cutoff = timezone.now() - timedelta(seconds=lease)
+    return Job.objects.filter(status=Job.RUNNING, locked_at__lt=cutoff).update(
+        status=Job.QUEUED, locked_by="", locked_at=None
+    )
+
+
+def claim(worker: str):
+    """Atomically takes the oldest runnable job, or returns None."""
+    now = timezone.now()
+    candidates = (
+        Job.objects.filter(status=Job.QUEUED, run_after__lte=now)
+        .order_by("run_after", "id")
+        .values_list("pk", flat=True)[:5]
+    )
+    for pk in candidates:
+        # Only one worker can flip a given row from queued to running.
+        claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING,
+            locked_by=worker,
+            locked_at=now,
+            attempts=F("attempts") + 1,
+        )
+        if claimed:
+            return Job.objects.select_related("file", "user").get(pk=pk)
+    return None
+
+
+def run(job: Job):
+    """Runs one claimed job and records success, retry or failure."""
+    fn = HANDLERS.get(job.kind)
+    try:
+        if fn is None:
+            raise ValueError(f"No handler for job kind '{job.kind}'.")
+        result = fn(job)
+    except Exception as e:
+        logger.exception("Job %s (%s) failed on attempt %s", job.pk, job.kind, job.attempts)
+        job.error = f"{type(e).__name__}: {str(e)[:500]}"
+        job.locked_by, job.locked_at = "", None
+        if job.attempts < job.max_attempts:
+            backoff = getattr(settings, "AI_JOB_RETRY_BACKOFF", 10) * 2 ** (job.attempts - 1)
+            job.status = Job.QUEUED
+            job.run_after = timezone.now() + timedelta(seconds=backoff)
+        else:
+            job.status = Job.FAILED
+            job.finished_at = timezone.now()
+        job.save(update_fields=["status", "error", "run_after", "locked_by", "locked_at", "finished_at", "updated_at"])
+        return
+
+    job.status = Job.SUCCEEDED
+    job.result = result
+    job.error = ""
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "result", "error", "finished_at", "updated_at"])
+
+
+def work(worker: str = None, stop: threading.Event = None, poll: float = 1.0, once: bool = False) -> int:
+    """
+    Worker loop: claim and run jobs until ``stop`` is set.
+    With ``once``, drains the runnable jobs and returns. Returns jobs run.
+    """
+    worker = worker or worker_id()
+    stop = stop or threading.Event()
+    done = 0
+    try:
+        while not stop.is_set():
+            requeue_stale()
+            job = claim(worker)
+            if job is None:
+                if once:
+                    break
+                stop.wait(poll)
+                continue
+            run(job)
+            done += 1
+    finally:
+        connections.close_all()
+    return done
+
+
+# ── handlers ──────────────────────────────────────────────────────────────────
+@handler("extract")
+def extract(job: Job) -> dict:
+    if job.file is None:
+        raise ValueError("Job has no file.")
+    try:
+        summary = extraction.extract(job.file)
+    except extraction.ExtractionUnavailable as e:
+        if not has_text(job.file):
+            logger.warning("Cannot extract %s file %s: %s", job.file.file_type, job.file.pk, e)
+            return {"skipped": str(e)}
+        summary = {}   # text formats can still be analysed from the raw file
+
+    enqueue("analyze", job.user, file=job.file)
+    return summary
+
+
+@handler("analyze")
+def analyze(job: Job) -> dict:
+    if job.file is None:
+        raise ValueError("Job has no file.")
+    if not has_text(job.file):
+        return {"document": TextAnalyzerTool.calculate_readability(""), "hardest_paragraphs": []}
+
+    # Streams the file and fills the annotation cache the reader opens later.
+    scored, document = [], None
+    for event, data in annotation.file_records(job.file):
+        if event == "summary":
+            document = {k: v for k, v in data.items() if k not in ("paragraphs", "difficulty")}
+        elif data["word_count"] >= getattr(settings, "AI_PRECOMPUTE_MIN_WORDS", 30):
+            scored.append({"index": data["index"], "readability_score": data["readability_score"]})
+
+    threshold = getattr(settings, "AI_PRECOMPUTE_MAX_SCORE", 60)
+    limit = getattr(settings, "AI_PRECOMPUTE_PARAGRAPHS", 5)
+    hardest = sorted(
+        (p for p in scored if p["readability_score"] < threshold),
+        key=lambda p: p["readability_score"],
+    )[:limit]
+
+    if hardest:
+        enqueue("precompute", job.user, file=job.file,
+                payload={"paragraphs": [p["index"] for p in hardest]})
+    return {"document": document, "hardest_paragraphs": hardest}
+
+
+@handler("precompute")
+def precompute(job: Job) -> dict:
+    if job.file is None:
+        raise ValueError("Job has no file.")
+    wanted = set(job.payload.get("paragraphs", []))
+    # The paragraphs analyze() indexed, as the reader sends them (line breaks kept).
+    paragraphs = {
+        index: text
+        for index, (_, text) in enumerate(paragraph_spans(iter_file_text(job.file)))
+        if index in wanted
+    }
+    results = []
+    for index in job.payload.get("paragraphs", []):
+        if index not in paragraphs:
+            continue
+        # Same truncation as SimplifyView / StructureView so the keys match.
+        text = paragraphs[index].strip()[:1500]
+        simplified, _ = complete("simplify", text)
+        structured, _ = complete("structure", text)
+        results.append({
+            "index": index,
+            "text": text,
+            "simplified": simplified,
+            "structured": structured,
+        })
+    return {"paragraphs": results}
+
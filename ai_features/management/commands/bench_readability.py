@@ -0,0 +1,120 @@
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_features.agent import readability
+from ai_features.agent.tools import TextAnalyzerTool
+
+UNITS = {"B": 1, "KB": 1024, "MB": 1024 ** 2}
+
+COMMON_WORDS = (
+    "the of and to in is that it for as with was on be by this are or from an which at not but have "
+    "reading text students learners attention memory comprehension paragraph sentence language research "
+    "cognitive evaluation typography accessibility analysis significantly demonstrated participants "
+    "methodology interdisciplinary infrastructure considerations approximately representative"
+).split()
+
+
+def parse_size(value: str) -> int:
+    value = value.strip().upper()
+    for unit in ("MB", "KB", "B"):
+        if value.endswith(unit):
+            return int(float(value[: -len(unit)]) * UNITS[unit])
+    return int(value)
+
+
+def synthetic_corpus(size: int, seed: int = 13) -> str:
+    """
+    Deterministic prose-like text: Zipf-distributed words (common words plus
+    a long tail of invented ones), 5–40 words per sentence, paragraphs of
+    2–8 sentences — repetitive the way real books are, not uniformly random.
+    """
+    rng = random.Random(seed)
+    tail = [
+        "".join(rng.choice("bcdfghklmnprstvw") + rng.choice("aeiouy") for _ in range(rng.randint(1, 5)))
+        for _ in range(20000)
+    ]
+    vocabulary = COMMON_WORDS + tail
+    weights = [1.0 / (rank + 1) for rank in range(len(vocabulary))]
+
+    parts, length = [], 0
+    while length < size:
+        paragraph = []
+        for _ in range(rng.randint(2, 8)):
+            words = rng.choices(vocabulary, weights, k=rng.randint(5, 40))
+            words[0] = words[0].capitalize()
+            paragraph.append(" ".join(words) + rng.choice([".", ".", ".", "?", "!"]))
+        block = " ".join(paragraph) + "\n\n"
+        parts.append(block)
+        length += len(block)
+    return "".join(parts)[:size]
+
+
+def best_of(fn, text: str, repeat: int) -> tuple:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        # Every run starts with an empty syllable memo, so --repeat doesn't
+        # turn the benchmark into a warm-cache one.
+        readability._syllables.clear()
+        start = time.perf_counter()
+        result = fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks TextAnalyzerTool.calculate_readability (fast engine) against the original "
+        "multi-pass implementation on 1 KB – 10 MB corpora, checks both return identical results, "
+        "and fails when the speed-up drops below --min-speedup."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="1KB,100KB,1MB,10MB", help="Comma-separated corpus sizes.")
+        parser.add_argument("--corpus", default=None, help="Text file to sample from instead of the synthetic corpus.")
+        parser.add_argument("--repeat", type=int, default=3, help="Runs per size; the best time counts.")
+        parser.add_argument("--min-speedup", type=float, default=3.0,
+                            help="Fail if any corpus of 100 KB or more is less than this much faster.")
+        parser.add_argument("--no-reference", action="store_true", help="Only time the fast engine.")
+        parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+
+    def handle(self, *args, **options):
+        sizes = [parse_size(s) for s in options["sizes"].split(",") if s.strip()]
+        source = None
+        if options["corpus"]:
+            with open(options["corpus"], encoding="utf-8", errors="replace") as f:
+                source = f.read()
+            if not source:
+                raise CommandError("Corpus file is empty.")
+
+        rows, failures = [], []
+        for size in sizes:
+            text = (source * (size // len(source) + 1))[:size] if source else synthetic_corpus(size)
+            fast_time, fast = best_of(TextAnalyzerTool.calculate_readability, text, options["repeat"])
+            row = {"bytes": size, "fast_mb_s": round(size / fast_time / UNITS["MB"], 2)}
+
+            if not options["no_reference"]:
+                ref_time, reference = best_of(TextAnalyzerTool.reference_readability, text, options["repeat"])
+                row["reference_mb_s"] = round(size / ref_time / UNITS["MB"], 2)
+                row["speedup"] = round(ref_time / fast_time, 2)
+                if fast != reference:
+                    failures.append(f"{size} B: results differ ({fast} != {reference})")
+                elif size >= 100 * UNITS["KB"] and row["speedup"] < options["min_speedup"]:
+                    failures.append(f"{size} B: speed-up {row['speedup']}x < {options['min_speedup']}x")
+            rows.append(row)
+
+        if options["json"]:
+            self.stdout.write(json.dumps(rows, indent=2))
+        else:
+            self.stdout.write(f"{'size':>10}  {'reference MB/s':>15}  {'fast MB/s':>10}  {'speed-up':>9}")
+            for row in rows:
+                self.stdout.write(
+                    f"{row['bytes']:>10}  {row.get('reference_mb_s', '-'):>15}  "
+                    f"{row['fast_mb_s']:>10}  {str(row.get('speedup', '-')) + 'x':>9}"
+                )
+
+        if failures:
+            raise CommandError("Readability benchmark regression:\n" + "\n".join(failures))
+        self.stdout.write(self.style.SUCCESS("Readability benchmark passed."))
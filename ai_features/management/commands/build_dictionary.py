@@ -0,0 +1,44 @@
+import gzip
+import io
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_features import dictionary
+
+
+class Command(BaseCommand):
+    help = (
+        "Builds the offline dictionary index used by /api/ai/explain/ from a "
+        "kaikki.org (wiktextract) JSONL dump or a word<TAB>pos<TAB>definition[<TAB>example[<TAB>phonetic]] TSV. "
+        "Gzipped sources are read directly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("source", help="Path to the .jsonl / .tsv word list (optionally .gz).")
+        parser.add_argument("--format", choices=["auto", "jsonl", "tsv"], default="auto")
+        parser.add_argument("--output", default=None, help="Index path (default: settings.AI_DICTIONARY_PATH).")
+        parser.add_argument("--meanings", type=int, default=4, help="Parts of speech kept per word.")
+
+    def handle(self, *args, **options):
+        source = options["source"]
+        if not os.path.exists(source):
+            raise CommandError(f"Source not found: {source}")
+
+        fmt = options["format"]
+        if fmt == "auto":
+            name = source[:-3] if source.endswith(".gz") else source
+            fmt = "tsv" if name.endswith((".tsv", ".txt")) else "jsonl"
+
+        output = options["output"] or dictionary.index_path()
+        if not output:
+            raise CommandError("Set AI_DICTIONARY_PATH or pass --output.")
+
+        opener = gzip.open if source.endswith(".gz") else io.open
+        with opener(source, "rt", encoding="utf-8", errors="replace") as f:
+            words = dictionary.build_index(f, output, fmt, options["meanings"])
+
+        size = os.path.getsize(output) / (1024 * 1024)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {words} words into {output} ({size:.1f} MB)."))
+        if output == dictionary.index_path():
+            self.stdout.write("Restart the web workers to pick up the new index.")
@@ -0,0 +1,38 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from ai_features import jobs
+
+
+class Command(BaseCommand):
+    help = "Runs background AI jobs (text extraction, analysis, precompute) from the database queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=2, help="Worker threads in this process.")
+        parser.add_argument("--poll", type=float, default=1.0, help="Seconds to sleep when the queue is empty.")
+        parser.add_argument("--once", action="store_true", help="Drain runnable jobs and exit.")
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        if not options["once"]:
+            signal.signal(signal.SIGINT, lambda *_: stop.set())
+            signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+        counts = []
+        threads = [
+            threading.Thread(
+                target=lambda: counts.append(
+                    jobs.work(stop=stop, poll=options["poll"], once=options["once"])
+                ),
+                name=f"ai-job-worker-{i}",
+            )
+            for i in range(max(1, options["concurrency"]))
+        ]
+        self.stdout.write(f"Running {len(threads)} job worker(s). Ctrl+C to stop.")
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.stdout.write(self.style.SUCCESS(f"Processed {sum(counts)} job(s)."))
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_features', '0003_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileAnalysis',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64)),
+                ('version', models.PositiveSmallIntegerField()),
+                ('max_chars', models.PositiveBigIntegerField()),
+                ('result', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'ai_file_analyses',
+                'constraints': [models.UniqueConstraint(fields=('content_hash', 'version', 'max_chars'), name='ai_file_analysis_key')],
+            },
+        ),
+    ]
@@ -1,3 +1,125 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+class CachedResult(models.Model):
+    """
+    One cached AI completion.
+    The key is a content address over (endpoint, model, prompt, text hash),
+    so identical requests from any user or worker resolve to the same row.
+    """
+
+    key = models.CharField(max_length=64, unique=True)
+    endpoint = models.CharField(max_length=32)
+    model = models.CharField(max_length=255)
+    result = models.TextField()
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(db_index=True)   # drives LRU eviction
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        db_table = "ai_result_cache"
+
+    def __str__(self):
+        return f"{self.endpoint} — {self.model} ({self.hits} hits)"
+
+
+class CacheCounter(models.Model):
+    """Hit / miss totals per endpoint, shared by every worker process."""
+
+    endpoint = models.CharField(max_length=32, unique=True)
+    hits = models.PositiveBigIntegerField(default=0)
+    misses = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        db_table = "ai_cache_counters"
+
+    def __str__(self):
+        return f"{self.endpoint}: {self.hits} hits / {self.misses} misses"
+
+
+class Job(models.Model):
+    """
+    A unit of background work, persisted so the queue needs no external broker.
+    Workers (python manage.py run_jobs) claim queued rows with a conditional
+    UPDATE, run the handler for ``kind`` and retry with backoff on failure.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED, "Failed"),
+    ]
+
+    KIND_CHOICES = [
+        ("extract", "Extract text"),
+        ("analyze", "Readability analysis"),
+        ("precompute", "Precompute simplify / structure"),
+    ]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="ai_jobs",
+    )
+    file = models.ForeignKey(
+        "library.UserFile",
+        on_delete=models.CASCADE,
+        related_name="ai_jobs",
+        null=True,
+        blank=True,
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    payload = models.JSONField(default=dict)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=64, blank=True, default="")
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "ai_jobs"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "run_after"], name="ai_jobs_status_run_after"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+
+class FileAnalysis(models.Model):
+    """
+    Readability of a file's contents, keyed by their SHA-256 so a repeat
+    optimize-reading call is one indexed lookup. Identical uploads share a
+    row; a changed file has a new hash and so never reads a stale one.
+    """
+
+    content_hash = models.CharField(max_length=64)
+    version = models.PositiveSmallIntegerField()      # analysis.VERSION when computed
+    max_chars = models.PositiveBigIntegerField()      # input cap (AI_ANALYZE_MAX_CHARS)
+    result = models.JSONField()                       # TextAnalyzerTool.calculate_readability output
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "ai_file_analyses"
+        constraints = [
+            models.UniqueConstraint(fields=["content_hash", "version", "max_chars"], name="ai_file_analysis_key"),
+        ]
+
+    def __str__(self):
+        return f"{self.content_hash[:12]}… v{self.version}"
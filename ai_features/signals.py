@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from library.models import UserFile
+from . import analysis, annotation, extraction
+from .jobs import enqueue_file_pipeline
+
+
+@receiver(post_save, sender=UserFile)
+def precompute_on_upload(sender, instance, created, **kwargs):
+    """Queue extract → analyze → precompute once the upload has committed."""
+    if created and getattr(settings, "AI_PRECOMPUTE_ON_UPLOAD", True):
+        transaction.on_commit(lambda: enqueue_file_pipeline(instance))
+
+
+@receiver(post_delete, sender=UserFile)
+def forget_annotations(sender, instance, **kwargs):
+    annotation.forget(instance)
+    if instance.content_hash and not UserFile.objects.filter(content_hash=instance.content_hash).exists():
+        analysis.forget(instance.content_hash)
+        annotation.forget_blob(instance.content_hash)
+        extraction.forget(instance.content_hash)
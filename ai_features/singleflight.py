@@ -0,0 +1,161 @@
+"""
+Single-flight coalescing for identical in-flight AI requests.
+
+When many students hit "Simplify" on the same paragraph at once, only one
+upstream call is made per key; everyone else waits for it and receives the
+same result.
+
+* Within a process, followers wait on the leader's Event (threads) or Future
+  (asyncio) — no polling.
+* Across processes, the leader holds a short-lived lock in the shared Django
+  cache (cache.add is atomic). Followers in other workers poll ``lookup`` (the
+  persistent result cache) until the result appears. If the leader fails or
+  its lock expires, a follower runs the call itself.
+
+``do`` / ``ado`` return (result, shared): shared is True when another request
+did the upstream work.
+"""
+
+import asyncio
+import threading
+import time
+import weakref
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache as shared_cache
+
+LOCK_PREFIX = "ai:singleflight:"
+
+
+def _timeout() -> float:
+    return getattr(settings, "AI_SINGLEFLIGHT_TIMEOUT", 60)
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_calls = {}
+_calls_lock = threading.Lock()
+
+
+def do(key: str, fn, lookup) -> tuple:
+    """Run ``fn()`` once per key across threads and worker processes."""
+    with _calls_lock:
+        call = _calls.get(key)
+        leader = call is None
+        if leader:
+            call = _calls[key] = _Call()
+
+    if not leader:
+        if not call.event.wait(_timeout()):
+            return fn(), False
+        if call.error is not None:
+            raise call.error
+        return call.result, True
+
+    try:
+        call.result, shared = _run_across_processes(key, fn, lookup)
+        return call.result, shared
+    except Exception as e:
+        call.error = e
+        raise
+    finally:
+        with _calls_lock:
+            _calls.pop(key, None)
+        call.event.set()
+
+
+def _run_across_processes(key: str, fn, lookup) -> tuple:
+    lock_key = LOCK_PREFIX + key
+    timeout = _timeout()
+    if shared_cache.add(lock_key, 1, timeout):
+        try:
+            return fn(), False
+        finally:
+            shared_cache.delete(lock_key)
+
+    # Another worker is already calling upstream — wait for its result.
+    deadline = time.monotonic() + timeout
+    delay = 0.05
+    while time.monotonic() < deadline:
+        time.sleep(delay)
+        delay = min(delay * 2, 0.5)
+        result = lookup()
+        if result is not None:
+            return result, True
+        if shared_cache.get(lock_key) is None:
+            break   # leader finished without storing a result (it failed)
+    return fn(), False
+
+
+# ── asyncio ───────────────────────────────────────────────────────────────────
+# Futures belong to one event loop, so in-flight calls are tracked per loop.
+_async_calls = weakref.WeakKeyDictionary()
+
+
+async def ado(key: str, afn, alookup) -> tuple:
+    """Async twin of ``do``: ``afn`` and ``alookup`` are coroutine functions."""
+    loop = asyncio.get_running_loop()
+    calls = _async_calls.setdefault(loop, {})
+
+    future = calls.get(key)
+    if future is not None:
+        try:
+            # shield: a cancelled follower must not cancel the leader's call.
+            return await asyncio.shield(future), True
+        except _LeaderCancelled:
+            return await afn(), False
+
+    future = calls[key] = loop.create_future()
+    try:
+        result, shared = await _arun_across_processes(key, afn, alookup)
+        future.set_result(result)
+        return result, shared
+    except asyncio.CancelledError:
+        # The leader's client went away; followers run the call themselves.
+        _fail(future, _LeaderCancelled())
+        raise
+    except Exception as e:
+        _fail(future, e)
+        raise
+    finally:
+        calls.pop(key, None)
+
+
+class _LeaderCancelled(Exception):
+    pass
+
+
+def _fail(future, exc):
+    future.set_exception(exc)
+    # Mark retrieved so a failure nobody awaited is not logged as lost.
+    future.exception()
+
+
+async def _arun_across_processes(key: str, afn, alookup) -> tuple:
+    lock_key = LOCK_PREFIX + key
+    timeout = _timeout()
+    if await sync_to_async(shared_cache.add)(lock_key, 1, timeout):
+        try:
+            return await afn(), False
+        finally:
+            await sync_to_async(shared_cache.delete)(lock_key)
+
+    deadline = time.monotonic() + timeout
+    delay = 0.05
+    while time.monotonic() < deadline:
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 0.5)
+        result = await alookup()
+        if result is not None:
+            return result, True
+        if await sync_to_async(shared_cache.get)(lock_key) is None:
+            break
+    return await afn(), False
@@ -0,0 +1,150 @@
+"""
+Server-Sent Events relay for chat completions.
+
+Clients opt in with ``"stream": true`` in the body or ``Accept: text/event-stream``.
+Tokens are forwarded as they are generated:
+
+    event: token   data: {"text": "..."}          (repeated)
+    event: done    data: {"<result_key>": "...", "cached": bool}
+    event: error   data: {"error": "...", "status": int}
+
+When the client disconnects, the response iterator is closed (WSGI) or
+cancelled (ASGI); the upstream stream is closed in turn so we stop paying for
+tokens nobody reads. Only complete outputs are written to the result cache.
+"""
+
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+
+from . import cache
+from .completions import RESULT_KEYS, cache_key, error_payload, messages
+from .gateway import get_gateway
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Lets DRF views accept ``Accept: text/event-stream``.
+    Streaming responses bypass rendering; this only renders the plain
+    Response objects (validation errors) as a single SSE event.
+    """
+    media_type = "text/event-stream"
+    format = "sse"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = (renderer_context or {}).get("response")
+        status = response.status_code if response is not None else 200
+        if status >= 400:
+            return sse_event("error", {**(data or {}), "status": status}).encode()
+        return sse_event("done", data or {}).encode()
+
+
+def wants_stream(request, data) -> bool:
+    if data.get("stream") in (True, "true", "1", 1):
+        return True
+    return "text/event-stream" in request.headers.get("Accept", "")
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def sse_response(events) -> StreamingHttpResponse:
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"   # stop nginx from buffering the stream
+    return response
+
+
+def _delta(chunk) -> str:
+    if not chunk.choices:
+        return ""
+    return chunk.choices[0].delta.content or ""
+
+
+def _fallback_events(payload: dict, result_key: str):
+    yield sse_event("token", {"text": payload[result_key]})
+    yield sse_event("done", payload)
+
+
+def stream_completion(task: str, text: str, fallback=None):
+    """
+    Sync generator of SSE events for one completion (WSGI / DRF views).
+    ``fallback(text, error)`` → response body, used when the model fails
+    before sending a token (None: report the error instead).
+    """
+    key, result_key = cache_key(task, text), RESULT_KEYS[task]
+    output = cache.get(key, task)
+    if output is not None:
+        yield sse_event("token", {"text": output})
+        yield sse_event("done", {result_key: output, "cached": True})
+        return
+
+    parts = []
+    stream = None
+    try:
+        model, stream = get_gateway().stream(task, messages(task, text))
+        for chunk in stream:
+            delta = _delta(chunk)
+            if delta:
+                parts.append(delta)
+                yield sse_event("token", {"text": delta})
+    except Exception as e:
+        body = fallback(text, e) if fallback is not None and not parts else None
+        if body is not None:
+            for event in _fallback_events(body, result_key):
+                yield event
+            return
+        payload, status = error_payload(e)
+        yield sse_event("error", {**payload, "status": status})
+        return
+    finally:
+        # Reached on normal completion, error, or the server closing the
+        # iterator after a client disconnect (GeneratorExit).
+        if stream is not None and hasattr(stream, "close"):
+            stream.close()
+
+    output = "".join(parts).strip()
+    cache.set(key, task, model, output)
+    yield sse_event("done", {result_key: output, "cached": False})
+
+
+async def astream_completion(task: str, text: str, fallback=None):
+    """Async generator of SSE events for one completion (ASGI views)."""
+    key, result_key = cache_key(task, text), RESULT_KEYS[task]
+    output = await sync_to_async(cache.get)(key, task)
+    if output is not None:
+        yield sse_event("token", {"text": output})
+        yield sse_event("done", {result_key: output, "cached": True})
+        return
+
+    parts = []
+    stream = None
+    try:
+        model, stream = await get_gateway().astream(task, messages(task, text))
+        async for chunk in stream:
+            delta = _delta(chunk)
+            if delta:
+                parts.append(delta)
+                yield sse_event("token", {"text": delta})
+    except Exception as e:
+        body = fallback(text, e) if fallback is not None and not parts else None
+        if body is not None:
+            for event in _fallback_events(body, result_key):
+                yield event
+            return
+        payload, status = error_payload(e)
+        yield sse_event("error", {**payload, "status": status})
+        return
+    finally:
+        # Django cancels this generator when the client disconnects; closing
+        # the upstream stream aborts the HTTP response to the provider.
+        if stream is not None and hasattr(stream, "aclose"):
+            await stream.aclose()
+
+    output = "".join(parts).strip()
+    await sync_to_async(cache.set)(key, task, model, output)
+    yield sse_event("done", {result_key: output, "cached": False})
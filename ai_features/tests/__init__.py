@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from ai_features.gateway import Completion, LLMGateway
+
+
+def echo(messages) -> str:
+    """Default fake reply: the text after the prompt's blank line, marked as processed."""
+    return "Plain: " + messages[-1]["content"].split("\n\n", 1)[-1]
+
+
+def _chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+class FakeGateway(LLMGateway):
+    """
+    An LLMGateway that answers locally: ``reply(messages)`` is the completion
+    text, or every call raises ``error``. Streams reply word by word.
+    """
+
+    def __init__(self, reply=echo, error=None):
+        super().__init__({"simplify": ["fake-model"], "structure": ["fake-model"]})
+        self.reply = reply
+        self.error = error
+        self.calls = []
+
+    def _answer(self, model, messages) -> Completion:
+        self.calls.append(messages)
+        if self.error is not None:
+            self.stats_for(model).record_error(self.error.kind)
+            raise self.error
+        return Completion(text=self.reply(messages).strip(), model=model, latency=0.0)
+
+    def _call(self, model, messages, max_tokens):
+        return self._answer(model, messages)
+
+    async def _acall(self, model, messages, max_tokens):
+        return self._answer(model, messages)
+
+    def stream(self, task, messages, max_tokens=600):
+        model = self.chain(task)[0]
+        words = self._answer(model, messages).text.split(" ")
+        return model, iter([_chunk(word + " ") for word in words])
+
+    async def astream(self, task, messages, max_tokens=600):
+        model, chunks = self.stream(task, messages, max_tokens)
+
+        async def agen():
+            for chunk in chunks:
+                yield chunk
+        return model, agen()
+
+
+def use_gateway(gateway):
+    """Makes get_gateway() return ``gateway`` (patch context manager / decorator)."""
+    return mock.patch("ai_features.gateway._gateway", gateway)
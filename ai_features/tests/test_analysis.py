@@ -0,0 +1,52 @@
+from unittest import mock
+
+from ai_features import analysis
+from ai_features.agent import pool, readability
+from ai_features.models import FileAnalysis
+from library.tests import MediaTestCase, make_user
+
+TEXT = "The cat sat on the mat.\n\nNotwithstanding considerable heterogeneity, investigations demonstrate influences."
+
+
+class FileAnalysisTests(MediaTestCase):
+    def optimize(self, file_id):
+        return self.client.post("/api/ai/agent/optimize-reading/", {"file_id": file_id}, format="json")
+
+    def test_analysis_is_stored_per_contents(self):
+        user_file = self.upload(TEXT.encode(), name="notes.txt", file_type="TXT")
+        first = self.optimize(user_file.pk)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.data["readability_score"], readability.analyze(TEXT)["readability_score"])
+        self.assertEqual(FileAnalysis.objects.get().content_hash, user_file.content_hash)
+
+        copy = self.upload(TEXT.encode(), name="copy.txt", file_type="TXT", user=make_user())
+        with mock.patch.object(analysis, "iter_file_text") as read:
+            self.assertEqual(analysis.analyze_file(copy), readability.analyze(TEXT))
+            self.assertEqual(self.optimize(user_file.pk).data, first.data)
+        read.assert_not_called()
+
+    def test_a_different_limit_is_a_different_analysis(self):
+        user_file = self.upload(TEXT.encode(), name="notes.txt", file_type="TXT")
+        analysis.analyze_file(user_file)
+        with self.settings(AI_ANALYZE_MAX_CHARS=10):
+            self.assertEqual(analysis.analyze_file(user_file), readability.analyze(TEXT[:10]))
+        self.assertEqual(FileAnalysis.objects.count(), 2)
+
+    def test_forgotten_with_the_last_copy(self):
+        user_file = self.upload(TEXT.encode(), name="notes.txt", file_type="TXT")
+        copy = self.upload(TEXT.encode(), name="copy.txt", file_type="TXT")
+        analysis.analyze_file(user_file)
+        user_file.delete()
+        self.assertTrue(FileAnalysis.objects.exists())
+        copy.delete()
+        self.assertFalse(FileAnalysis.objects.exists())
+
+    def test_batch_reuses_and_fills_the_store(self):
+        stored = self.upload(TEXT.encode(), name="notes.txt", file_type="TXT")
+        analysis.analyze_file(stored)
+        with mock.patch.object(pool, "optimize_many", return_value=iter(())) as optimize_many:
+            response = self.client.post(
+                "/api/ai/agent/optimize-reading/batch/", {"file_ids": [stored.pk]}, format="json",
+            )
+        self.assertEqual(response.data["results"][0]["status"], 200)
+        self.assertEqual(optimize_many.call_args.args[0], [])   # nothing left for the pool
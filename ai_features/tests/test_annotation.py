@@ -0,0 +1,92 @@
+import glob
+import json
+import os
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from ai_features import annotation
+from ai_features.agent import readability
+from library.tests import MediaTestCase
+
+from .test_streaming import parse_events
+
+TEXT = (
+    "The cat sat. It was warm.\n\n"
+    "Notwithstanding considerable methodological heterogeneity, contemporary investigations "
+    "demonstrate substantial socioeconomic influences.\n  \n"
+    "Short again! Done"
+)
+
+
+class AnnotateTests(SimpleTestCase):
+    def test_offsets_point_into_the_text(self):
+        records = list(readability.annotate([TEXT]))
+        paragraphs = [data for event, data in records if event == "paragraph"]
+        self.assertEqual(len(paragraphs), 3)
+        self.assertEqual(TEXT[paragraphs[0]["start"]:paragraphs[0]["end"]], "The cat sat. It was warm.")
+        sentences = paragraphs[2]["sentences"]
+        self.assertEqual([TEXT[s["start"]:s["end"]] for s in sentences], ["Short again!", "Done"])
+        self.assertEqual(paragraphs[1]["difficulty"], "High")
+        self.assertEqual(paragraphs[0]["difficulty"], "Low")
+
+    def test_summary_matches_whole_text_analysis_however_it_is_chunked(self):
+        expected = readability.analyze(TEXT)
+        for size in (1, 7, 64, len(TEXT)):
+            with self.subTest(size=size):
+                chunks = [TEXT[i:i + size] for i in range(0, len(TEXT), size)]
+                self.assertEqual(readability.analyze_chunks(iter(chunks)), expected)
+                event, summary = list(readability.annotate(iter(chunks)))[-1]
+                self.assertEqual((event, summary["paragraphs"]), ("summary", 3))
+
+    def test_overlong_paragraphs_are_cut_at_whitespace(self):
+        spans = list(readability.paragraph_spans(["word " * 10], max_chars=12))
+        self.assertTrue(all(len(text) <= 12 for _, text in spans))
+        self.assertEqual(" ".join(text for _, text in spans), ("word " * 10).strip())
+
+    def test_select(self):
+        records = list(readability.annotate([TEXT]))
+        selected = list(annotation.select(iter(records), sentences=False, max_score=40))
+        self.assertEqual([event for event, _ in selected], ["paragraph", "summary"])
+        self.assertNotIn("sentences", selected[0][1])
+
+
+class AnnotateViewTests(MediaTestCase):
+    def post(self, data, **extra):
+        return self.client.post("/api/ai/annotate/", data, format="json", **extra)
+
+    def test_text_is_scored_once_then_read_back(self):
+        first = json.loads(b"".join(self.post({"text": TEXT}).streaming_content))
+        self.assertEqual(len(first["paragraphs"]), 3)
+        self.assertEqual(first["summary"]["readability_score"], readability.analyze(TEXT)["readability_score"])
+        self.assertEqual(len(glob.glob(os.path.join(self.media, "annotations", "text-*.jsonl"))), 1)
+
+        with mock.patch.object(annotation, "annotate") as annotate:
+            second = json.loads(b"".join(self.post({"text": TEXT}).streaming_content))
+        annotate.assert_not_called()
+        self.assertEqual(second, first)
+
+    def test_file_and_filters(self):
+        user_file = self.upload(TEXT.encode(), name="notes.txt", file_type="TXT")
+        body = json.loads(b"".join(self.post({"file_id": user_file.pk, "max_score": 40, "sentences": False}).streaming_content))
+        self.assertEqual([p["index"] for p in body["paragraphs"]], [1])
+        self.assertNotIn("sentences", body["paragraphs"][0])
+
+        annotation.forget(user_file)
+        self.assertEqual(glob.glob(os.path.join(self.media, "annotations", "file-*")), [])
+
+    def test_stream(self):
+        events = parse_events(b"".join(self.post({"text": TEXT, "stream": True}).streaming_content))
+        self.assertEqual([event for event, _ in events], ["paragraph"] * 3 + ["done"])
+
+    def test_bad_requests(self):
+        self.assertEqual(self.post({"text": "  "}).status_code, 400)
+        self.assertEqual(self.post({"text": 5}).status_code, 400)
+        self.assertEqual(self.post({"text": TEXT, "max_score": "hard"}).status_code, 400)
+        self.assertEqual(self.post({"file_id": 999999}).status_code, 404)
+
+    @override_settings(AI_ANNOTATION_CACHE_FILES=2)
+    def test_oldest_annotations_are_evicted(self):
+        for i in range(4):
+            b"".join(self.post({"text": f"Text number {i}."}).streaming_content)
+        self.assertEqual(len(glob.glob(os.path.join(self.media, "annotations", "*.jsonl"))), 2)
@@ -0,0 +1,74 @@
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from ai_features import dictionary
+
+from . import FakeGateway, use_gateway
+
+
+class AsyncViewTests(TestCase):
+    """The /api/ai/async/* twins answer like the sync views, without a worker thread per call."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email="async@example.com", password="pw")
+        token = str(RefreshToken.for_user(self.user).access_token)
+        self.auth = {"Authorization": f"Bearer {token}"}
+        self.gateway = FakeGateway()
+        patcher = use_gateway(self.gateway)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def post(self, path, data):
+        return await self.async_client.post(path, data, content_type="application/json", headers=self.auth)
+
+    async def test_simplify(self):
+        response = await self.post("/api/ai/async/simplify/", {"text": "Hard words here."})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"simplified": "Plain: Hard words here.", "cached": False})
+
+    async def test_shares_the_result_cache_with_the_sync_view(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        await sync_to_async(client.post)("/api/ai/simplify/", {"text": "Shared."}, format="json")
+        response = await self.post("/api/ai/async/simplify/", {"text": "Shared."})
+        self.assertEqual(response.json(), {"simplified": "Plain: Shared.", "cached": True})
+        self.assertEqual(len(self.gateway.calls), 1)
+
+    async def test_structure_with_the_local_engine(self):
+        text = "Cells divide by mitosis. Mitosis has four phases. Each phase has a role."
+        response = await self.post("/api/ai/async/structure/", {"text": text, "engine": "extractive"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("•", response.json()["structured"])
+        self.assertEqual(self.gateway.calls, [])
+
+    async def test_explain_word(self):
+        with mock.patch.object(dictionary, "aexplain", mock.AsyncMock(return_value=("A greeting.", "offline"))):
+            response = await self.post("/api/ai/async/explain/", {"word": " Hello "})
+        self.assertEqual(response.json(), {"word": "hello", "explanation": "A greeting.", "source": "offline"})
+
+        with mock.patch.object(dictionary, "aexplain", mock.AsyncMock(side_effect=dictionary.DictionaryError())):
+            response = await self.post("/api/ai/async/explain/", {"word": "hello"})
+        self.assertEqual(response.status_code, 503)
+
+    async def test_requires_a_bearer_token(self):
+        response = await AsyncClient().post("/api/ai/async/simplify/", {"text": "x"}, content_type="application/json")
+        self.assertEqual(response.status_code, 401)
+        self.assertIn("Bearer", response["WWW-Authenticate"])
+
+        response = await AsyncClient(headers={"Authorization": "Bearer nonsense"}).post(
+            "/api/ai/async/simplify/", {"text": "x"}, content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 401)
+
+    async def test_bad_requests(self):
+        response = await self.async_client.post("/api/ai/async/simplify/", "{not json",
+                                                content_type="application/json", headers=self.auth)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual((await self.post("/api/ai/async/simplify/", {"text": "  "})).status_code, 400)
+        self.assertEqual((await self.post("/api/ai/async/document/translate/", {"text": "x"})).status_code, 404)
+        self.assertEqual((await self.async_client.get("/api/ai/async/simplify/", headers=self.auth)).status_code, 405)
@@ -0,0 +1,64 @@
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
+
+from django.test import override_settings
+
+from ai_features.agent import pool
+from library.tests import MediaTestCase
+
+EASY = "The cat sat on the mat. It was a sunny day."
+HARD = (
+    "Notwithstanding considerable methodological heterogeneity, contemporary epidemiological "
+    "investigations consistently demonstrate that socioeconomic characteristics substantially "
+    "influence cardiovascular morbidity throughout industrialised metropolitan communities."
+)
+
+
+@override_settings(AI_ANALYZE_WORKERS=1)
+class BatchOptimizeTests(MediaTestCase):
+    """Runs the real (spawned) worker pool; it is discarded after each test."""
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(pool.reset)
+
+    def post(self, data):
+        return self.client.post("/api/ai/agent/optimize-reading/batch/", data, format="json")
+
+    def single(self, text):
+        return self.client.post("/api/ai/agent/optimize-reading/", {"text": text}, format="json").data
+
+    def test_each_item_gets_the_single_endpoint_result(self):
+        user_file = self.upload(HARD.encode(), name="paper.txt", file_type="TXT")
+        response = self.post({"file_ids": [user_file.pk, 999999], "texts": [EASY]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data["succeeded"], response.data["failed"]), (2, 1))
+
+        by_file, missing, by_text = response.data["results"]
+        self.assertEqual(by_file["file_id"], user_file.pk)
+        self.assertEqual(by_file["readability_score"], self.single(HARD)["readability_score"])
+        self.assertEqual(missing, {"file_id": 999999, "error": "File not found.", "status": 404})
+        self.assertEqual(by_text["text_index"], 0)
+        self.assertEqual(by_text["recommended_settings"], self.single(EASY)["recommended_settings"])
+        self.assertNotIn("timings", by_text["analysis_details"])
+
+    def test_trace_keeps_worker_timings(self):
+        result = self.post({"texts": [EASY], "trace": True}).data["results"][0]
+        self.assertTrue(result["analysis_details"]["timings"])
+
+    def test_unextracted_files_report_the_extract_job(self):
+        user_file = self.upload(b"%PDF-1.4", name="scan.pdf")
+        [result] = self.post({"file_ids": [user_file.pk]}).data["results"]
+        self.assertEqual((result["status"], result["extraction"]["status"]), (202, "queued"))
+
+    def test_a_broken_pool_fails_its_items_only(self):
+        broken = mock.Mock(submit=mock.Mock(side_effect=BrokenProcessPool("worker died")))
+        with mock.patch.object(pool, "get_pool", return_value=broken), mock.patch.object(pool, "reset") as reset:
+            response = self.post({"texts": [EASY, HARD]})
+        self.assertEqual([r["status"] for r in response.data["results"]], [503, 503])
+        reset.assert_called_once()
+
+    def test_validation(self):
+        self.assertEqual(self.post({}).status_code, 400)
+        with self.settings(AI_OPTIMIZE_BATCH_MAX=1):
+            self.assertEqual(self.post({"texts": [EASY, HARD]}).status_code, 400)
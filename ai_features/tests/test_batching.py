@@ -0,0 +1,103 @@
+import re
+
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from ai_features import batching
+from ai_features.gateway import GatewayError
+from library.tests import make_user
+
+from . import FakeGateway, echo, use_gateway
+
+
+def batch_echo(messages) -> str:
+    """Answers a batched prompt passage by passage, markers kept; single prompts as ``echo``."""
+    user = messages[-1]["content"]
+    if "<<<1>>>" not in user:
+        return echo(messages)
+    return re.sub(r"(<<<\d+>>>\n)", r"\1Plain: ", user.split("\n\n", 1)[1])
+
+
+class MarkerTests(SimpleTestCase):
+    def test_batch_messages_number_every_passage(self):
+        system, user = batching.batch_messages("simplify", ["One.", "Two."])
+        self.assertIn("2 separate passages", system["content"])
+        self.assertEqual(user["content"], "Simplify each of these passages:\n\n<<<1>>>\nOne.\n\n<<<2>>>\nTwo.")
+
+    def test_split_reply(self):
+        self.assertEqual(batching.split_reply("<<<1>>>\nA.\n\n<<< 2 >>>\nB.\n", 2), {1: "A.", 2: "B."})
+
+    def test_split_reply_leaves_out_bad_markers(self):
+        reply = "Sure!\n<<<1>>>\nA.\n<<<2>>>\n\n<<<3>>>\nC.\n<<<3>>>\nC again.\n<<<9>>>\nZ."
+        self.assertEqual(batching.split_reply(reply, 4), {1: "A."})   # 2 empty, 3 repeated, 9 out of range, 4 missing
+        self.assertEqual(batching.split_reply("No markers at all.", 2), {})
+
+    def test_pack_respects_tokens_and_count(self):
+        texts = ["x" * 400, "x" * 400, "x" * 400, "short", "short", "short"]
+        self.assertEqual(batching.pack(texts, max_tokens=250, max_items=2), [[0, 1], [2, 3], [4, 5]])
+        self.assertEqual(batching.pack(["x" * 4000], max_tokens=100), [[0]])   # oversized passages go alone
+
+    def test_paragraph_validation(self):
+        self.assertEqual(batching.batch_paragraphs({"paragraphs": [" a ", "b"]}), (["a", "b"], None))
+        self.assertEqual(batching.batch_paragraphs({"paragraphs": []})[1][1], 400)
+        self.assertEqual(batching.batch_paragraphs({"paragraphs": ["a", 3]})[1][1], 400)
+        with self.settings(AI_BATCH_MAX_REQUEST=1):
+            self.assertEqual(batching.batch_paragraphs({"paragraphs": ["a", "b"]})[1][1], 413)
+
+
+@override_settings(AI_DOCUMENT_CONCURRENCY=1)
+class BatchViewTests(TransactionTestCase):
+    """Groups run in worker threads, so cache writes must be committed; one at a time for SQLite."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(make_user())
+        self.gateway = FakeGateway(reply=batch_echo)
+        patcher = use_gateway(self.gateway)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, paragraphs, task="simplify", **data):
+        return self.client.post(f"/api/ai/{task}/", {"paragraphs": paragraphs, **data}, format="json")
+
+    def test_paragraphs_share_one_call_and_fill_the_cache(self):
+        response = self.post(["First.", "Second.", "Third."])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(r["simplified"], r["cached"]) for r in response.data["results"]],
+            [("Plain: First.", False), ("Plain: Second.", False), ("Plain: Third.", False)],
+        )
+        self.assertEqual(len(self.gateway.calls), 1)
+
+        single = self.client.post("/api/ai/simplify/", {"text": "Second."}, format="json")
+        self.assertEqual((single.data["simplified"], single.data["cached"]), ("Plain: Second.", True))
+        self.assertEqual([r["cached"] for r in self.post(["First.", "Fourth."]).data["results"]], [True, False])
+        self.assertEqual(len(self.gateway.calls), 2)
+
+    def test_missing_markers_fall_back_to_single_calls(self):
+        self.gateway.reply = lambda messages: (
+            "<<<1>>>\nOnly the first." if "<<<1>>>" in messages[-1]["content"] else echo(messages)
+        )
+        results = self.post(["First.", "Second."]).data["results"]
+        self.assertEqual([r["simplified"] for r in results], ["Only the first.", "Plain: Second."])
+        self.assertEqual(len(self.gateway.calls), 2)
+
+    @override_settings(AI_BATCH_MAX_PARAGRAPHS=2)
+    def test_groups_are_split_by_size(self):
+        self.post(["One.", "Two.", "Three."])
+        self.assertEqual(len(self.gateway.calls), 2)
+
+    def test_failures_are_reported_per_paragraph(self):
+        self.gateway.error = GatewayError("upstream", "boom")
+        with self.assertLogs("ai_features.gateway", "WARNING"):
+            response = self.post(["First.", "Second."], task="structure")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r["status"] for r in response.data["results"]], [502, 502])
+        self.assertEqual(len(self.gateway.calls), 1)   # no single-call retries after a failed batch
+
+        # A passing failure gets local bullets instead (extractive.FALLBACK_KINDS).
+        self.gateway.error = GatewayError("timeout", "cold start")
+        with self.assertLogs("ai_features", "WARNING"):
+            results = self.post(["Cells divide by mitosis.", "Mitosis has phases."], task="structure").data["results"]
+        self.assertEqual([(r["status"], r["fallback"]) for r in results], [(200, "timeout"), (200, "timeout")])
+        self.assertTrue(all(r["structured"].startswith("•") for r in results))
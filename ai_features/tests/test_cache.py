@@ -0,0 +1,86 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ai_features import cache
+from ai_features.gateway import GatewayError
+from ai_features.models import CacheCounter, CachedResult
+
+from . import FakeGateway, use_gateway
+
+
+class ResultCacheTests(TestCase):
+    def key(self, text="A paragraph."):
+        return cache.make_key("simplify", "m", "prompt", text)
+
+    def test_key_ignores_whitespace_reflow(self):
+        self.assertEqual(self.key("one  two\nthree"), self.key(" one two three "))
+        self.assertNotEqual(self.key("one two"), self.key("one three"))
+
+    def test_hit_and_miss_are_counted(self):
+        self.assertIsNone(cache.get(self.key(), "simplify"))
+        cache.set(self.key(), "simplify", "m", "Simpler.")
+        self.assertEqual(cache.get(self.key(), "simplify"), "Simpler.")
+        counter = CacheCounter.objects.get(endpoint="simplify")
+        self.assertEqual((counter.hits, counter.misses), (1, 1))
+        self.assertEqual(cache.stats()["hit_rate"], 0.5)
+
+    def test_expired_entries_miss(self):
+        cache.set(self.key(), "simplify", "m", "Simpler.")
+        CachedResult.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertIsNone(cache.get(self.key(), "simplify"))
+        self.assertIsNone(cache.peek(self.key()))
+
+    @override_settings(AI_CACHE_TTL=60)
+    def test_ttl_sets_expiry(self):
+        cache.set(self.key(), "simplify", "m", "Simpler.")
+        expires_at = CachedResult.objects.get().expires_at
+        self.assertAlmostEqual((expires_at - timezone.now()).total_seconds(), 60, delta=5)
+
+    @override_settings(AI_CACHE_MAX_ENTRIES=2)
+    def test_least_recently_used_entry_is_evicted(self):
+        cache.set(self.key("a"), "simplify", "m", "A")
+        cache.set(self.key("b"), "simplify", "m", "B")
+        CachedResult.objects.filter(key=self.key("a")).update(last_used_at=timezone.now() - timedelta(minutes=1))
+        CachedResult.objects.filter(key=self.key("b")).update(last_used_at=timezone.now() - timedelta(minutes=2))
+        cache.get(self.key("b"), "simplify")   # b is now the most recently used
+        cache.set(self.key("c"), "simplify", "m", "C")
+        self.assertIsNone(cache.peek(self.key("a")))
+        self.assertEqual(cache.peek(self.key("b")), "B")
+        self.assertEqual(cache.peek(self.key("c")), "C")
+
+
+class CachedViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(email="cache@example.com", password="pw"))
+        self.gateway = FakeGateway()
+        patcher = use_gateway(self.gateway)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_repeated_text_is_answered_from_the_cache(self):
+        first = self.client.post("/api/ai/simplify/", {"text": "Hard words here."}, format="json")
+        second = self.client.post("/api/ai/simplify/", {"text": "  Hard   words here. "}, format="json")
+        self.assertEqual(first.data, {"simplified": "Plain: Hard words here.", "cached": False})
+        self.assertEqual(second.data, {"simplified": "Plain: Hard words here.", "cached": True})
+        self.assertEqual(len(self.gateway.calls), 1)
+
+    def test_tasks_are_cached_separately(self):
+        self.client.post("/api/ai/simplify/", {"text": "Same text."}, format="json")
+        response = self.client.post("/api/ai/structure/", {"text": "Same text.", "engine": "llm"}, format="json")
+        self.assertFalse(response.data["cached"])
+        self.assertEqual(len(self.gateway.calls), 2)
+
+    def test_failures_are_not_cached(self):
+        self.gateway.error = GatewayError("upstream", "boom")
+        with self.assertLogs("ai_features.gateway", "WARNING"):
+            self.assertEqual(self.client.post("/api/ai/simplify/", {"text": "Oops."}, format="json").status_code, 502)
+        self.gateway.error = None
+        self.assertFalse(self.client.post("/api/ai/simplify/", {"text": "Oops."}, format="json").data["cached"])
+
+    def test_stats_are_staff_only(self):
+        self.assertEqual(self.client.get("/api/ai/cache/stats/").status_code, 403)
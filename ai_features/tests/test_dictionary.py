@@ -0,0 +1,158 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from ai_features import dictionary
+from library.tests import make_user
+
+WORDS = (
+    "# word\tpos\tdefinition\texample\tphonetic\n"
+    "run\tverb\tTo move quickly on foot.\tShe runs every day.\t/rʌn/\n"
+    "run\tnoun\tAn act of running.\n"
+    "run\tverb\tA second verb sense, not kept.\n"
+    "study\tverb\tTo learn about a subject.\n"
+    "bake\tverb\tTo cook in an oven.\n"
+)
+
+
+class DictionaryTestMixin:
+    """Points AI_DICTIONARY_PATH at a temporary index and keeps lookups offline."""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.source = os.path.join(directory, "words.tsv")
+        with open(self.source, "w", encoding="utf-8") as f:
+            f.write(WORDS)
+        self.path = os.path.join(directory, "dictionary.sqlite3")
+        overrides = override_settings(AI_DICTIONARY_PATH=self.path, AI_DICTIONARY_REMOTE=False)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        dictionary.reset()
+        self.addCleanup(dictionary.reset)
+
+    def build(self):
+        out = StringIO()
+        call_command("build_dictionary", self.source, stdout=out)
+        return out.getvalue()
+
+
+class LookupTests(DictionaryTestMixin, TestCase):
+    def test_build_and_lookup(self):
+        self.assertIn("Indexed 3 words", self.build())
+        self.assertEqual(
+            dictionary.lookup("run"),
+            '/rʌn/\n\n[verb] To move quickly on foot.\n  Example: "She runs every day."\n\n[noun] An act of running.',
+        )
+
+    def test_inflected_forms_fall_back_to_the_lemma(self):
+        self.build()
+        for word in ("runs", "running", "studies", "baked", "baking"):
+            with self.subTest(word=word):
+                self.assertTrue(dictionary.lookup(word))
+        self.assertEqual(dictionary.lookup("unknown"), "")
+
+    def test_misses_are_not_cached(self):
+        self.assertEqual(dictionary.lookup("run"), "")   # no index yet
+        self.build()
+        self.assertIn("To move quickly", dictionary.lookup("run"))
+
+    def test_normalize_word(self):
+        self.assertEqual(dictionary.normalize_word(' "Reader\'s," '), "reader")
+        self.assertEqual(dictionary.normalize_word("…"), "")
+
+
+class ExplainViewTests(DictionaryTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.build()
+        self.client = APIClient()
+        self.client.force_authenticate(make_user())
+
+    def test_explains_from_the_local_index(self):
+        response = self.client.post("/api/ai/explain/", {"word": "Running"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["source"], "local")
+        self.assertIn("To move quickly", response.data["explanation"])
+
+    def test_unknown_and_empty_words(self):
+        self.assertEqual(self.client.post("/api/ai/explain/", {"word": "zzyzx"}, format="json").status_code, 404)
+        self.assertEqual(self.client.post("/api/ai/explain/", {"word": " "}, format="json").status_code, 400)
+
+
+def remote_answer(word):
+    if word == "fail":
+        raise dictionary.DictionaryError("timeout")
+    return "" if word == "zzyzx" else f"[noun] Remote meaning of {word}."
+
+
+class RemoteTests(DictionaryTestMixin, TestCase):
+    """
+    Words the index lacks go to dictionaryapi.dev, cached under the word asked.
+    Batches look words up in worker threads, so the cache is local memory.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.build()
+        overrides = override_settings(AI_DICTIONARY_REMOTE=True, CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "dictionary-tests"},
+        })
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        cache.clear()
+        patcher = mock.patch.object(dictionary, "remote_lookup", side_effect=remote_answer)
+        self.remote = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_distinct_words_get_distinct_answers(self):
+        self.assertEqual(dictionary.explain("even"), ("[noun] Remote meaning of even.", "remote"))
+        self.assertEqual(dictionary.explain("evening"), ("[noun] Remote meaning of evening.", "remote"))
+        self.assertEqual(dictionary.explain("Even!"), ("[noun] Remote meaning of even.", "remote"))
+        self.assertEqual([c.args[0] for c in self.remote.call_args_list], ["even", "evening"])
+
+    def test_not_found_is_cached_too(self):
+        self.assertEqual(dictionary.explain("zzyzx"), ("", None))
+        self.assertEqual(dictionary.explain("zzyzx"), ("", None))
+        self.assertEqual(self.remote.call_count, 1)
+
+    def test_failures_are_not_cached(self):
+        self.remote.side_effect = dictionary.DictionaryError("timeout")
+        with self.assertRaises(dictionary.DictionaryError):
+            dictionary.explain("even")
+        self.remote.side_effect = remote_answer
+        self.assertEqual(dictionary.explain("even")[1], "remote")
+        self.assertEqual(self.remote.call_count, 2)
+
+    def test_batch_looks_each_word_up_once(self):
+        words = ["even", "evening", "Even", "running", "zzyzx"]
+        results = dict(dictionary.explain_many(words))
+        self.assertEqual([results[i]["status"] for i in range(5)], [200, 200, 200, 200, 404])
+        self.assertEqual(results[0]["explanation"], results[2]["explanation"])
+        self.assertNotEqual(results[0]["explanation"], results[1]["explanation"])
+        self.assertEqual(results[3]["source"], "local")
+        self.assertEqual(sorted(c.args[0] for c in self.remote.call_args_list), ["even", "evening", "zzyzx"])
+
+    def test_batch_endpoint_reports_each_word(self):
+        client = APIClient()
+        client.force_authenticate(make_user())
+        response = client.post("/api/ai/explain/batch/", {"words": ["even", {"word": "fail"}]}, format="json")
+        self.assertEqual([r["status"] for r in response.data["results"]], [200, 503])
+        self.assertEqual(client.post("/api/ai/explain/batch/", {"words": []}, format="json").status_code, 400)
+
+    async def test_async_batch(self):
+        async def aremote(word, client):
+            return remote_answer(word)
+
+        with mock.patch.object(dictionary, "aremote_lookup", side_effect=aremote):
+            results = dict([item async for item in dictionary.aexplain_many(["even", "evening"], client=None)])
+        self.assertEqual(results[0]["explanation"], "[noun] Remote meaning of even.")
+        self.assertEqual(results[1]["explanation"], "[noun] Remote meaning of evening.")
@@ -0,0 +1,105 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from ai_features import document
+from ai_features.gateway import GatewayError
+from library.tests import MediaMixin
+
+from . import FakeGateway, use_gateway
+from .test_streaming import parse_events
+
+
+class SplitTests(SimpleTestCase):
+    def test_paragraphs_are_packed_up_to_the_budget(self):
+        paragraphs = [f"Paragraph {i} " + "word " * 30 for i in range(10)]
+        chunks = document.split_chunks("\n\n".join(paragraphs), max_tokens=100)
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(len(chunk) <= 400 for chunk in chunks))
+        self.assertEqual(" ".join(" ".join(chunks).split()), " ".join(" ".join(paragraphs).split()))
+        self.assertTrue(chunks[0].startswith("Paragraph 0"))
+        self.assertIn("\n\nParagraph 1", chunks[0])
+
+    def test_long_paragraphs_split_on_sentences_then_spaces(self):
+        sentence = "This sentence is about forty characters. "
+        chunks = document.split_chunks(sentence * 5 + "x" * 30 + " " + "y " * 100, max_tokens=25)
+        self.assertTrue(all(len(chunk) <= 100 for chunk in chunks))
+        self.assertEqual(chunks[0], "This sentence is about forty characters. This sentence is about forty characters.")
+
+    def test_merge_bullets_drops_repeats(self):
+        merged = document.merge_bullets(["• Cells divide.\n- Mitosis has phases.", "1. cells divide\n* New point."])
+        self.assertEqual(merged, "• Cells divide.\n• Mitosis has phases.\n• New point.")
+
+    def test_stitch_skips_failed_chunks(self):
+        self.assertEqual(document.stitch("simplify", ["One.", None, "Three."]), "One.\n\nThree.")
+
+
+class DocumentViewTests(MediaMixin, TransactionTestCase):
+    """
+    Chunks are mapped in a worker thread, so its cache writes must see
+    committed data; one at a time, as the in-memory test database doesn't
+    wait for locks.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.gateway = FakeGateway()
+        patcher = use_gateway(self.gateway)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        settings = override_settings(AI_CHUNK_TOKENS=10, AI_DOCUMENT_CONCURRENCY=1)   # 40 characters per chunk
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.text = "First paragraph is here.\n\nSecond paragraph is here.\n\nThird paragraph is here."
+
+    def post(self, task, data, **extra):
+        return self.client.post(f"/api/ai/document/{task}/", data, format="json", **extra)
+
+    def test_simplify_maps_every_chunk_and_stitches_in_order(self):
+        response = self.post("simplify", {"text": self.text})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["simplified"], "\n\n".join(
+            f"Plain: {p}" for p in self.text.split("\n\n")
+        ))
+        self.assertEqual([c["index"] for c in response.data["chunks"]], [0, 1, 2])
+        self.assertTrue(response.data["complete"])
+        self.assertEqual(len(self.gateway.calls), 3)
+
+    def test_structure_merges_bullets(self):
+        self.gateway.reply = lambda messages: "• Shared point.\n• " + messages[-1]["content"].split("\n\n", 1)[1]
+        structured = self.post("structure", {"text": self.text}).data["structured"]
+        self.assertEqual(structured.count("Shared point"), 1)
+        self.assertEqual(len(structured.splitlines()), 4)
+
+    def test_reads_a_users_file(self):
+        user_file = self.upload(self.text.encode(), name="notes.txt", file_type="TXT")
+        response = self.post("simplify", {"file_id": user_file.pk})
+        self.assertEqual(len(response.data["chunks"]), 3)
+
+    @override_settings(AI_DOCUMENT_MAX_CHUNKS=2)
+    def test_too_long_documents_are_refused(self):
+        self.assertEqual(self.post("simplify", {"text": self.text}).status_code, 413)
+        user_file = self.upload(b"word " * 1000, name="long.txt", file_type="TXT")
+        with mock.patch.object(document, "load_file_text", wraps=document.load_file_text) as load:
+            response = self.post("simplify", {"file_id": user_file.pk})
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(load.call_args.kwargs["max_chars"], 2 * 40 + 1)
+        self.assertEqual(self.gateway.calls, [])
+
+    def test_failures(self):
+        self.gateway.error = GatewayError("upstream", "boom")
+        with self.assertLogs("ai_features.gateway", "WARNING"):
+            response = self.post("simplify", {"text": self.text})
+        self.assertEqual(response.status_code, 502)
+
+        self.assertEqual(self.post("translate", {"text": self.text}).status_code, 404)
+        self.assertEqual(self.post("simplify", {"file_id": 999999}).status_code, 404)
+        self.assertEqual(self.post("simplify", {}).status_code, 400)
+
+    def test_stream_sends_a_chunk_event_each(self):
+        response = self.post("simplify", {"text": self.text, "stream": True})
+        events = parse_events(b"".join(response.streaming_content))
+        self.assertEqual(sorted(data["index"] for event, data in events if event == "chunk"), [0, 1, 2])
+        event, done = events[-1]
+        self.assertEqual(event, "done")
+        self.assertEqual((done["complete"], done["failed"]), (True, []))
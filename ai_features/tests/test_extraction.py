@@ -0,0 +1,113 @@
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from ai_features import extraction, extractors, jobs, textstore
+from ai_features.models import Job
+from library.tests import MediaTestCase
+
+PAGES = ["First page of the scan.", "Second page, with more words in it."]
+
+
+def fake_pdf_run(file_type, source, output):
+    """extraction._run for a PDF, without pypdf: writes PAGES to the store."""
+    count, characters = textstore.write(output, PAGES)
+    return {"pages": count, "characters": characters}
+
+
+class TextStoreTests(SimpleTestCase):
+    def test_pages_read_back_one_at_a_time(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "doc.nrtx")
+            self.assertEqual(textstore.write(path, ["One", "", "Three ✓"]), (3, 10))
+            self.assertEqual(textstore.page_count(path), 3)
+            self.assertEqual(textstore.read_page(path, 3), "Three ✓")
+            self.assertEqual(list(textstore.iter_pages(path)), ["One", "", "Three ✓"])
+            with self.assertRaises(IndexError):
+                textstore.read_page(path, 4)
+
+            with open(path, "r+b") as f:
+                f.truncate(10)
+            with self.assertRaises(textstore.StoreError):
+                textstore.page_count(path)
+
+    def test_paginate_joins_back_exactly(self):
+        text = ("A sentence of words. " * 40 + "\n\n") * 5
+        pages = list(extractors.paginate(text, page_chars=300))
+        self.assertEqual("".join(pages), text)
+        self.assertTrue(all(len(page) <= 300 for page in pages))
+        self.assertEqual(list(extractors.paginate("")), [""])
+
+    def test_html_and_rtf_text(self):
+        self.assertEqual(
+            extractors.html_text("<html><head><title>x</title></head><body><h1>Title</h1><p>One &amp; two</p>"
+                                 "<script>skip()</script><p>Three</p></body></html>"),
+            "Title\n\nOne & two\n\nThree",
+        )
+        self.assertEqual(
+            extractors.rtf_text(r"{\rtf1{\fonttbl{\f0 Arial;}}\f0 Hello\par caf\'e9 \u8212?done}"),
+            "Hello\n\ncafé —done",
+        )
+
+
+class ExtractionTests(MediaTestCase):
+    def test_text_formats_are_extracted_in_a_child_process(self):
+        user_file = self.upload(b"<p>Hello</p><p>World</p>", name="page.html", file_type="HTML")
+        self.assertEqual(extraction.extract(user_file), {"pages": 1, "characters": 12})
+        self.assertEqual(extraction.page_text(user_file, 1), "Hello\n\nWorld")
+        self.assertTrue(extraction.extract(user_file)["reused"])
+
+    def test_pages_endpoints_follow_the_extract_job(self):
+        user_file = self.upload(b"%PDF-1.4 scan", name="scan.pdf")
+        pages_url = f"/api/library/files/{user_file.pk}/pages/"
+        response = self.client.get(pages_url)
+        self.assertEqual((response.status_code, response.data["status"]), (202, Job.QUEUED))
+        self.assertEqual(self.client.get(pages_url).data["job"], response.data["job"])   # queued once
+
+        with mock.patch.object(extraction, "_run", side_effect=fake_pdf_run):
+            jobs.work(once=True)
+        self.assertEqual(self.client.get(pages_url).data, {"id": user_file.pk, "pages": 2, "status": "ready"})
+        page = self.client.get(f"{pages_url}2/text/")
+        self.assertEqual(page.data["text"], PAGES[1])
+        self.assertIn("max-age", page["Cache-Control"])
+        self.assertEqual(self.client.get(f"{pages_url}3/text/").status_code, 404)
+
+    def test_unextracted_pdfs_are_pending_everywhere(self):
+        user_file = self.upload(b"%PDF-1.4 scan", name="scan.pdf")
+        requests = [
+            ("/api/ai/document/simplify/", {"file_id": user_file.pk}),
+            ("/api/ai/annotate/", {"file_id": user_file.pk}),
+            ("/api/ai/agent/optimize-reading/", {"file_id": user_file.pk}),
+        ]
+        for url, data in requests:
+            with self.subTest(url=url):
+                response = self.client.post(url, data, format="json")
+                self.assertEqual((response.status_code, response.data["file_id"]), (202, user_file.pk))
+        self.assertEqual(Job.objects.filter(file=user_file, kind="extract").count(), 1)
+
+        with mock.patch.object(extraction, "_run", side_effect=extraction.ExtractionUnavailable("no pypdf")), \
+                self.assertLogs("ai_features.jobs", "WARNING"):
+            jobs.work(once=True)
+        for url, data in requests:
+            with self.subTest(url=url):
+                response = self.client.post(url, data, format="json")
+                self.assertEqual((response.status_code, response.data["error"]), (422, "no pypdf"))
+
+    def test_extracted_pdfs_are_read_from_the_store(self):
+        user_file = self.upload(b"%PDF-1.4 scan", name="scan.pdf")
+        with mock.patch.object(extraction, "_run", side_effect=fake_pdf_run):
+            extraction.extract(user_file)
+        response = self.client.post("/api/ai/annotate/", {"file_id": user_file.pk, "sentences": False}, format="json")
+        self.assertEqual(response.status_code, 200)
+        summary = json.loads(b"".join(response.streaming_content))["summary"]
+        self.assertEqual((summary["paragraphs"], summary["word_count"]), (2, 12))
+
+    def test_store_is_removed_with_the_last_copy(self):
+        user_file = self.upload(b"Some text.", name="notes.txt", file_type="TXT")
+        extraction.extract(user_file)
+        path = extraction.extracted_text_path(user_file)
+        user_file.delete()
+        self.assertFalse(os.path.exists(path))
@@ -0,0 +1,103 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from ai_features import extractive
+from ai_features.gateway import GatewayError
+from library.tests import make_user
+
+from . import FakeGateway, use_gateway
+from .test_streaming import parse_events
+
+TEXT = (
+    "Cells divide by mitosis. Mitosis produces two identical daughter cells. "
+    "The weather was pleasant yesterday. Each daughter cell carries the same chromosomes as the parent cell. "
+    "Mitosis has four phases: prophase, metaphase, anaphase and telophase. "
+    "During mitosis the chromosomes line up and separate. Lunch was served at noon. "
+    "Cells that divide too often can form tumours."
+)
+
+
+class SummarizeTests(SimpleTestCase):
+    def test_split_sentences(self):
+        self.assertEqual(
+            extractive.split_sentences('He said "Stop." Then left.\nNew line here'),
+            ['He said "Stop."', "Then left.", "New line here"],
+        )
+
+    def test_short_passages_keep_every_sentence(self):
+        self.assertEqual(extractive.summarize("One thing. Two things."), "• One thing.\n• Two things.")
+        self.assertEqual(extractive.summarize("   "), "")
+
+    def test_picks_central_sentences_in_document_order(self):
+        bullets = extractive.summarize(TEXT).splitlines()
+        self.assertEqual(len(bullets), extractive.bullet_count(8))
+        sentences = extractive.split_sentences(TEXT)
+        chosen = [sentences.index(b[2:]) for b in bullets]
+        self.assertEqual(chosen, sorted(chosen))
+        self.assertNotIn("• Lunch was served at noon.", bullets)
+        self.assertNotIn("• The weather was pleasant yesterday.", bullets)
+
+    def test_near_duplicates_are_dropped(self):
+        text = "Cells divide by mitosis. Cells divide by mitosis! Plants need light. Roots take up water. Leaves make sugar."
+        self.assertEqual(extractive.summarize(text, max_bullets=4).count("Cells divide"), 1)
+
+    def test_engine_selection(self):
+        self.assertEqual(extractive.engine({"engine": "llm"}), "llm")
+        self.assertEqual(extractive.engine({"engine": "bogus"}), "fallback")
+        with self.settings(AI_STRUCTURE_ENGINE="extractive"):
+            self.assertEqual(extractive.engine({}), "extractive")
+
+    def test_only_passing_failures_fall_back(self):
+        for kind in ("timeout", "unavailable", "rate_limited"):
+            with self.subTest(kind=kind), self.assertLogs("ai_features.extractive", "WARNING"):
+                self.assertEqual(extractive.fallback(TEXT, GatewayError(kind, "x"))["fallback"], kind)
+        for kind in ("auth", "unsupported", "upstream"):
+            with self.subTest(kind=kind):
+                self.assertIsNone(extractive.fallback(TEXT, GatewayError(kind, "x")))
+
+
+class StructureEngineTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(make_user())
+        self.gateway = FakeGateway(reply=lambda messages: "• From the model.")
+        patcher = use_gateway(self.gateway)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, engine, **data):
+        return self.client.post("/api/ai/structure/", {"text": TEXT, "engine": engine, **data}, format="json")
+
+    def test_extractive_never_calls_the_model(self):
+        response = self.post("extractive")
+        self.assertEqual(response.data["engine"], "extractive")
+        self.assertTrue(response.data["structured"].startswith("• "))
+        events = parse_events(b"".join(self.post("extractive", stream=True).streaming_content))
+        self.assertEqual([event for event, _ in events], ["token", "done"])
+        self.assertEqual(self.gateway.calls, [])
+
+    def test_fallback_on_timeout_but_not_on_auth(self):
+        self.gateway.error = GatewayError("timeout", "cold start")
+        with self.assertLogs("ai_features", "WARNING"):
+            response = self.post("fallback")
+        self.assertEqual((response.status_code, response.data["fallback"]), (200, "timeout"))
+
+        self.gateway.error = GatewayError("auth", "bad key")
+        with self.assertLogs("ai_features.gateway", "WARNING"):
+            self.assertEqual(self.post("fallback").status_code, 502)
+        self.gateway.error = GatewayError("timeout", "cold start")
+        with self.assertLogs("ai_features.gateway", "WARNING"):
+            self.assertEqual(self.post("llm").status_code, 503)
+
+    @override_settings(AI_STRUCTURE_ENGINE="instant")
+    def test_instant_answers_locally_then_serves_the_model_output(self):
+        with mock.patch("ai_features.views.warm") as warm:
+            response = self.post("instant")
+        self.assertTrue(response.data["pending"])
+        warm.assert_called_once_with("structure", TEXT)
+
+        self.post("llm")   # what the warm-up would have cached
+        response = self.client.post("/api/ai/structure/", {"text": TEXT}, format="json")
+        self.assertEqual(response.data, {"structured": "• From the model.", "cached": True})
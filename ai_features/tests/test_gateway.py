@@ -0,0 +1,162 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.test import SimpleTestCase
+
+from ai_features.gateway import GatewayError, LLMGateway, classify
+
+MESSAGES = [{"role": "user", "content": "Simplify this."}]
+
+
+class StubInference(BaseHTTPRequestHandler):
+    """
+    An OpenAI-compatible chat endpoint whose behaviour depends on the model
+    name: missing-* → 404, busy-* → 429, locked-* → 401, slow-* answers
+    after a second, anything else answers straight away.
+    """
+
+    calls = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        model = body["model"]
+        self.calls.append(model)
+        errors = {"missing": (404, "Model not supported"), "busy": (429, "Rate limit reached"),
+                  "locked": (401, "Invalid credentials")}
+        if model.split("-")[0] in errors:
+            code, message = errors[model.split("-")[0]]
+            return self._send(code, {"error": message})
+        if model.startswith("slow"):
+            time.sleep(1)
+        self._send(200, {
+            "id": "stub", "object": "chat.completion", "created": 0, "model": model,
+            "system_fingerprint": "",
+            "choices": [{"index": 0, "finish_reason": "stop", "logprobs": None,
+                         "message": {"role": "assistant", "content": f" answer from {model} "}}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        })
+
+    def _send(self, code, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except BrokenPipeError:
+            pass   # a hedged call that lost the race was cancelled
+
+
+class GatewayTests(SimpleTestCase):
+    """LLMGateway against a local stub server (no HuggingFace key needed)."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubInference)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        StubInference.calls = []
+
+    def gateway(self, chain, **kwargs):
+        return LLMGateway({"simplify": chain}, base_url=self.base_url, timeout=5, **kwargs)
+
+    def test_falls_back_past_unsupported_and_rate_limited_models(self):
+        gateway = self.gateway(["missing-a", "busy-b", "good-c"])
+        with self.assertLogs("ai_features.gateway", "WARNING"):
+            completion = gateway.complete("simplify", MESSAGES)
+        self.assertEqual(completion.text, "answer from good-c")
+        self.assertEqual(completion.model, "good-c")
+        self.assertEqual(StubInference.calls, ["missing-a", "busy-b", "good-c"])
+        self.assertEqual(gateway.stats()["models"]["missing-a"]["errors"], {"unsupported": 1})
+        self.assertEqual(gateway.stats()["models"]["good-c"]["successes"], 1)
+
+    def test_auth_failure_stops_the_chain(self):
+        gateway = self.gateway(["locked-a", "good-b"])
+        with self.assertLogs("ai_features.gateway", "WARNING"), self.assertRaises(GatewayError) as raised:
+            gateway.complete("simplify", MESSAGES)
+        self.assertEqual(raised.exception.kind, "auth")
+        self.assertEqual(raised.exception.attempts, [{"model": "locked-a", "kind": "auth"}])
+        self.assertEqual(StubInference.calls, ["locked-a"])
+
+    def test_exhausted_chain_raises_the_last_error(self):
+        gateway = self.gateway(["missing-a", "busy-b"])
+        with self.assertLogs("ai_features.gateway", "WARNING"), self.assertRaises(GatewayError) as raised:
+            gateway.complete("simplify", MESSAGES)
+        self.assertEqual(raised.exception.kind, "rate_limited")
+        self.assertEqual(raised.exception.status, 429)
+        self.assertEqual([a["kind"] for a in raised.exception.attempts], ["unsupported", "rate_limited"])
+
+    def test_unconfigured_task_is_unsupported(self):
+        with self.assertRaises(GatewayError) as raised:
+            self.gateway(["good-a"]).complete("translate", MESSAGES)
+        self.assertEqual(raised.exception.kind, "unsupported")
+
+    def test_hedging_answers_from_the_backup_when_the_primary_is_slow(self):
+        gateway = self.gateway(["slow-a", "good-b"], hedge=True, hedge_min_delay=0.1)
+        started = time.perf_counter()
+        completion = gateway.complete("simplify", MESSAGES)
+        self.assertEqual(completion.model, "good-b")
+        self.assertLess(time.perf_counter() - started, 0.9)
+
+    def test_hedging_keeps_a_fast_primary(self):
+        gateway = self.gateway(["good-a", "good-b"], hedge=True, hedge_min_delay=0.5)
+        self.assertEqual(gateway.complete("simplify", MESSAGES).model, "good-a")
+        self.assertEqual(StubInference.calls, ["good-a"])
+
+    def test_async_fallback_and_hedging(self):
+        async def run():
+            fallback = await self.gateway(["missing-a", "good-b"]).acomplete("simplify", MESSAGES)
+            hedged = await self.gateway(["slow-a", "good-b"], hedge=True, hedge_min_delay=0.1) \
+                .acomplete("simplify", MESSAGES)
+            return fallback, hedged
+
+        with self.assertLogs("ai_features.gateway", "WARNING"):
+            fallback, hedged = asyncio.run(run())
+        self.assertEqual(fallback.model, "good-b")
+        self.assertEqual(hedged.model, "good-b")
+
+
+class ClassifyTests(SimpleTestCase):
+    class Response:
+        def __init__(self, status_code):
+            self.status_code = status_code
+
+    def http_error(self, status_code, message="error"):
+        exc = Exception(message)
+        exc.response = self.Response(status_code)
+        return exc
+
+    def test_status_codes(self):
+        expected = {401: "auth", 429: "rate_limited", 503: "unavailable", 504: "unavailable",
+                    403: "unsupported", 404: "unsupported", 500: "upstream"}
+        for status_code, kind in expected.items():
+            with self.subTest(status_code=status_code):
+                self.assertEqual(classify(self.http_error(status_code)).kind, kind)
+
+    def test_messages_and_exception_types(self):
+        self.assertEqual(classify(TimeoutError()).kind, "timeout")
+        self.assertEqual(classify(self.http_error(400, "Model doesn't support chat")).kind, "unsupported")
+        self.assertEqual(classify(ValueError("model_not_supported")).kind, "unsupported")
+        self.assertEqual(classify(ValueError("read timed out")).kind, "timeout")
+        self.assertEqual(classify(ValueError("boom")).kind, "upstream")
+
+    def test_gateway_errors_pass_through(self):
+        error = GatewayError("auth", "bad key", model="m")
+        self.assertIs(classify(error), error)
+        self.assertEqual(error.payload()["kind"], "auth")
@@ -0,0 +1,110 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from ai_features import extraction, jobs
+from ai_features.models import Job
+from library.tests import MediaMixin, make_user
+
+from . import FakeGateway, use_gateway
+
+HARD = (
+    "Notwithstanding considerable methodological heterogeneity, contemporary epidemiological\n"
+    "investigations consistently demonstrate that socioeconomic characteristics substantially\n"
+    "influence cardiovascular morbidity, particularly amongst individuals experiencing\n"
+    "persistent occupational instability, inadequate nutritional availability and\n"
+    "insufficient preventative healthcare accessibility throughout industrialised\n"
+    "metropolitan communities."
+)
+EASY = "The cat sat on the mat."
+
+
+class JobQueueTests(MediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.gateway = FakeGateway()
+        patcher = use_gateway(self.gateway)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_upload_pipeline_precomputes_the_hardest_paragraphs(self):
+        user_file = self.upload(f"{EASY}\n\n{HARD}".encode(), name="paper.txt", file_type="TXT")
+        jobs.enqueue_file_pipeline(user_file)
+        self.assertEqual(jobs.work(once=True), 3)
+
+        done = {job.kind: job for job in Job.objects.filter(file=user_file)}
+        self.assertEqual(sorted(done), ["analyze", "extract", "precompute"])
+        self.assertTrue(all(job.status == Job.SUCCEEDED for job in done.values()))
+        self.assertEqual([p["index"] for p in done["analyze"].result["hardest_paragraphs"]], [1])
+
+        [paragraph] = done["precompute"].result["paragraphs"]
+        self.assertEqual(paragraph["text"], HARD)   # line breaks kept, as the reader sends it
+        self.assertEqual(paragraph["simplified"], f"Plain: {HARD}")
+
+        # The reader's own request for that paragraph is a cache hit.
+        calls = len(self.gateway.calls)
+        response = self.client.post("/api/ai/simplify/", {"text": HARD}, format="json")
+        self.assertTrue(response.data["cached"])
+        self.assertEqual(len(self.gateway.calls), calls)
+
+    def test_failures_retry_with_backoff_then_fail(self):
+        boom = mock.Mock(side_effect=RuntimeError("broken"))
+        with mock.patch.dict(jobs.HANDLERS, {"boom": boom}), self.settings(AI_JOB_MAX_ATTEMPTS=2, AI_JOB_RETRY_BACKOFF=10):
+            job = jobs.enqueue("boom", self.user)
+            with self.assertLogs("ai_features.jobs", "ERROR"):
+                jobs.work(once=True)
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts, job.error), (Job.QUEUED, 1, "RuntimeError: broken"))
+            self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=5))
+
+            self.assertEqual(jobs.work(once=True), 0)   # not due yet
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            with self.assertLogs("ai_features.jobs", "ERROR"):
+                jobs.work(once=True)
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+            self.assertIsNotNone(job.finished_at)
+
+    def test_jobs_of_dead_workers_are_requeued(self):
+        job = jobs.enqueue("extract", self.user)
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.RUNNING, locked_by="gone", locked_at=timezone.now() - timedelta(hours=1),
+        )
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual(jobs.claim("me").locked_by, "me")
+        self.assertIsNone(jobs.claim("other"))
+
+    def test_formats_that_cannot_be_extracted_are_skipped(self):
+        user_file = self.upload(b"%PDF-1.4 not really", name="scan.pdf")
+        with mock.patch.object(extraction, "extract", side_effect=extraction.ExtractionUnavailable("no pypdf")):
+            self.assertEqual(jobs.extraction_pending(user_file)[1], 202)
+            with self.assertLogs("ai_features.jobs", "WARNING"):
+                jobs.work(once=True)
+        self.assertEqual(jobs.extraction_pending(user_file), ({"status": "unavailable", "error": "no pypdf"}, 422))
+        self.assertFalse(Job.objects.filter(kind="analyze").exists())
+
+
+class JobViewTests(MediaMixin, TestCase):
+    def test_queue_and_list(self):
+        user_file = self.upload(b"Some text.", name="notes.txt", file_type="TXT")
+        other = self.upload(b"Other text.", name="other.txt", file_type="TXT")
+        response = self.client.post("/api/ai/jobs/", {"file_id": user_file.pk}, format="json")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual((response.data["kind"], response.data["status"]), ("extract", Job.QUEUED))
+        self.client.post("/api/ai/jobs/", {"file_id": other.pk}, format="json")
+
+        listed = self.client.get("/api/ai/jobs/", {"file_id": user_file.pk}).data
+        self.assertEqual([job["id"] for job in listed], [response.data["id"]])
+        self.assertEqual(len(self.client.get("/api/ai/jobs/").data), 2)
+        self.assertEqual(self.client.get(f"/api/ai/jobs/{response.data['id']}/").data["file"], user_file.pk)
+
+    def test_bad_file_ids(self):
+        self.assertEqual(self.client.get("/api/ai/jobs/", {"file_id": "abc"}).status_code, 400)
+        self.assertEqual(self.client.post("/api/ai/jobs/", {"file_id": "abc"}, format="json").status_code, 404)
+
+    def test_other_users_jobs_are_hidden(self):
+        job = jobs.enqueue("extract", make_user())
+        self.assertEqual(self.client.get(f"/api/ai/jobs/{job.pk}/").status_code, 404)
+        self.assertEqual(self.client.get("/api/ai/jobs/").data, [])
@@ -0,0 +1,68 @@
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from ai_features.agent import stages
+from ai_features.agent.pipeline import ReadingOptimizationAgent
+from ai_features.agent.stages import Histogram, Stage
+from library.tests import make_user
+
+HARD = "Notwithstanding considerable methodological heterogeneity, investigations demonstrate influences."
+
+
+class NoteStage(Stage):
+    """A stage added through settings."""
+
+    name = "note"
+
+    def run(self, context):
+        context["result"]["actions_taken"].append("Noted.")
+
+
+class PipelineTests(SimpleTestCase):
+    def test_default_stages(self):
+        with self.assertLogs("ai_features.agent", "INFO") as logs:
+            result = ReadingOptimizationAgent().process_text(HARD, {"theme": "light"})
+        self.assertEqual(result["difficulty_level"], "High")
+        self.assertEqual(result["recommended_settings"]["theme"], "contrast")
+        self.assertNotIn("timings", result["analysis_details"])
+        self.assertEqual([r.stage for r in logs.records], ["analyze", "decide", "respond"])
+
+    def test_trace_does_not_touch_a_shared_analysis(self):
+        shared = {"readability_score": 70.0, "word_count": 10}
+        with self.assertLogs("ai_features.agent", "INFO"):
+            result = ReadingOptimizationAgent().process_analysis(shared, {}, trace=True)
+        self.assertEqual([t["stage"] for t in result["analysis_details"]["timings"]], ["analyze", "decide", "respond"])
+        self.assertEqual(shared, {"readability_score": 70.0, "word_count": 10})
+        self.assertEqual(result["difficulty_level"], "Low")
+
+    @override_settings(AI_AGENT_STAGES=stages.DEFAULT_STAGES + ("ai_features.tests.test_pipeline.NoteStage",))
+    def test_stages_come_from_settings(self):
+        with self.assertLogs("ai_features.agent", "INFO"):
+            result = ReadingOptimizationAgent().process_text(HARD, {})
+        self.assertEqual(result["actions_taken"][-1], "Noted.")
+
+    def test_histogram(self):
+        histogram = Histogram()
+        self.assertIsNone(histogram.percentile(50))
+        for wall_ms in (0.05, 0.3, 0.3, 7, 20000):
+            histogram.record(wall_ms, wall_ms / 2)
+        summary = histogram.as_dict()
+        self.assertEqual((summary["count"], summary["p50_ms"], summary["max_ms"]), (5, 0.5, 20000))
+        self.assertEqual(summary["p95_ms"], 20000)   # past the last bucket: the maximum
+        self.assertEqual((summary["buckets"]["le_0.5"], summary["buckets"]["le_inf"]), (2, 1))
+
+
+class AgentStatsViewTests(TestCase):
+    def test_staff_only(self):
+        client = APIClient()
+        user = make_user()
+        client.force_authenticate(user)
+        self.assertEqual(client.get("/api/ai/agent/stats/").status_code, 403)
+
+        user.is_staff = True
+        user.save()
+        with self.assertLogs("ai_features.agent", "INFO"):
+            client.post("/api/ai/agent/optimize-reading/", {"text": HARD}, format="json")
+        body = client.get("/api/ai/agent/stats/").data
+        self.assertEqual(body["stages"], ["analyze", "decide", "respond"])
+        self.assertGreaterEqual(body["timings"]["analyze"]["count"], 1)
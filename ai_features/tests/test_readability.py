@@ -0,0 +1,68 @@
+import json
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from ai_features.agent import readability
+from ai_features.agent.tools import TextAnalyzerTool
+from ai_features.management.commands.bench_readability import synthetic_corpus
+
+TEXTS = [
+    "",
+    "   ",
+    "...!?",
+    "One.",
+    "No terminator at all",
+    "Hello world. How are you?! Fine...",
+    "Trailing spaces .  . Then more!   ",
+    "Numbers 3.14 and e.g. abbreviations split sentences.",
+    "Café naïve résumé — über façade. Ünïcödé wörds!",
+    "Line one\nline two\n\nNew paragraph.\r\nWindows line.",
+    "yes yesterday yellow style rhythm fly flies flied ladies hated",
+    "the " * 50 + "end.",
+]
+
+
+class ReadabilityTests(SimpleTestCase):
+    def setUp(self):
+        readability._syllables.clear()
+        self.addCleanup(readability._syllables.clear)
+
+    def test_matches_the_reference_implementation(self):
+        for text in TEXTS + [synthetic_corpus(20_000)]:
+            with self.subTest(text=text[:40]):
+                self.assertEqual(
+                    TextAnalyzerTool.calculate_readability(text),
+                    TextAnalyzerTool.reference_readability(text),
+                )
+
+    def test_count_syllables_matches_the_reference(self):
+        words = (
+            "a the cake cakes baked bake table tables able horses houses used yes yellow "
+            "eye queue beautiful rhythm syzygy xylophone readability comprehension lee sees"
+        ).split()
+        for word in words:
+            with self.subTest(word=word):
+                self.assertEqual(readability.count_syllables(word), TextAnalyzerTool._count_syllables(word))
+
+    def test_memo_is_bounded(self):
+        with mock.patch.object(readability, "MEMO_SIZE", 3):
+            readability.count("alpha beta gamma delta epsilon alpha")
+        self.assertEqual(set(readability._syllables), {"alpha", "beta", "gamma"})
+
+    def test_bands(self):
+        self.assertEqual([readability.difficulty(s) for s in (10, 40, 60, 61)], ["High", "Medium", "Medium", "Low"])
+        self.assertEqual(readability.analyze("Short words. Big dog.")["density"], "Low")
+
+
+class BenchmarkCommandTests(SimpleTestCase):
+    def test_reports_matching_results(self):
+        out = StringIO()
+        call_command("bench_readability", sizes="1KB,2KB", repeat=1, json=True, stdout=out)
+        rows, passed = out.getvalue().strip().rsplit("\n", 1)
+        self.assertEqual(passed, "Readability benchmark passed.")
+        rows = json.loads(rows)
+        self.assertEqual([row["bytes"] for row in rows], [1024, 2048])
+        self.assertTrue(all("speedup" in row for row in rows))
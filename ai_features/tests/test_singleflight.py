@@ -0,0 +1,102 @@
+import asyncio
+import threading
+import time
+
+from django.core.cache import cache as shared_cache
+from django.test import SimpleTestCase, override_settings
+
+from ai_features import singleflight
+
+LOCMEM = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "singleflight-tests"}}
+
+
+@override_settings(CACHES=LOCMEM, AI_SINGLEFLIGHT_TIMEOUT=5)
+class SingleflightTests(SimpleTestCase):
+    def setUp(self):
+        shared_cache.clear()
+
+    def test_concurrent_callers_share_one_call(self):
+        calls, release = [], threading.Event()
+
+        def fn():
+            calls.append(1)
+            release.wait(5)
+            return "result"
+
+        results = []
+
+        def caller():
+            results.append(singleflight.do("k", fn, lambda: None))
+
+        leader = threading.Thread(target=caller)
+        leader.start()
+        while "k" not in singleflight._calls:
+            time.sleep(0.001)
+        followers = [threading.Thread(target=caller) for _ in range(4)]
+        for thread in followers:
+            thread.start()
+        time.sleep(0.2)   # let the followers reach the in-flight call
+        release.set()
+        for thread in [leader, *followers]:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(results), [("result", False)] + [("result", True)] * 4)
+        self.assertNotIn("k", singleflight._calls)
+
+    def test_leader_errors_reach_followers(self):
+        release = threading.Event()
+
+        def fn():
+            release.wait(5)
+            raise ValueError("upstream failed")
+
+        errors = []
+
+        def caller():
+            try:
+                singleflight.do("k", fn, lambda: None)
+            except ValueError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=caller) for _ in range(3)]
+        threads[0].start()
+        while "k" not in singleflight._calls:
+            time.sleep(0.001)
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.2)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(len(errors), 3)
+        self.assertEqual(len({id(e) for e in errors}), 1)
+
+    def test_waits_for_another_processes_result(self):
+        shared_cache.add(singleflight.LOCK_PREFIX + "k", 1, 5)   # another worker is the leader
+        lookups = iter([None, "stored"])
+        result = singleflight.do("k", lambda: self.fail("should not call upstream"), lambda: next(lookups))
+        self.assertEqual(result, ("stored", True))
+
+    def test_runs_itself_when_the_other_leader_fails(self):
+        shared_cache.add(singleflight.LOCK_PREFIX + "k", 1, 5)
+        threading.Timer(0.1, shared_cache.delete, [singleflight.LOCK_PREFIX + "k"]).start()
+        self.assertEqual(singleflight.do("k", lambda: "mine", lambda: None), ("mine", False))
+
+    def test_async_callers_share_one_call(self):
+        calls = []
+
+        async def afn():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "result"
+
+        async def alookup():
+            return None
+
+        async def run():
+            return await asyncio.gather(*(singleflight.ado("k", afn, alookup) for _ in range(5)))
+
+        results = asyncio.run(run())
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(results), [("result", False)] + [("result", True)] * 4)
@@ -0,0 +1,74 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from ai_features.gateway import GatewayError
+
+from . import FakeGateway, use_gateway
+
+
+def parse_events(body: bytes) -> list:
+    """[(event, data)] of a text/event-stream body."""
+    events = []
+    for block in body.decode().strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+class StreamingTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email="stream@example.com", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.gateway = FakeGateway()
+        patcher = use_gateway(self.gateway)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def stream(self, path, data, **headers):
+        response = self.client.post(path, data, format="json", **headers)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        return parse_events(b"".join(response.streaming_content))
+
+    def test_tokens_then_done(self):
+        events = self.stream("/api/ai/simplify/", {"text": "Hard words here.", "stream": True})
+        tokens = [data["text"] for event, data in events if event == "token"]
+        self.assertGreater(len(tokens), 1)
+        self.assertEqual("".join(tokens).strip(), "Plain: Hard words here.")
+        self.assertEqual(events[-1], ("done", {"simplified": "Plain: Hard words here.", "cached": False}))
+
+    def test_accept_header_opts_in_and_output_is_cached(self):
+        self.stream("/api/ai/simplify/", {"text": "Once."}, HTTP_ACCEPT="text/event-stream")
+        events = self.stream("/api/ai/simplify/", {"text": "Once."}, HTTP_ACCEPT="text/event-stream")
+        self.assertEqual(events, [
+            ("token", {"text": "Plain: Once."}),
+            ("done", {"simplified": "Plain: Once.", "cached": True}),
+        ])
+        self.assertEqual(len(self.gateway.calls), 1)
+        # The plain JSON endpoint shares the entry.
+        self.assertTrue(self.client.post("/api/ai/simplify/", {"text": "Once."}, format="json").data["cached"])
+
+    def test_upstream_error_is_an_event(self):
+        self.gateway.error = GatewayError("auth", "bad key")
+        events = self.stream("/api/ai/structure/", {"text": "Text.", "stream": True, "engine": "llm"})
+        self.assertEqual(events, [("error", {**self.gateway.error.payload(), "status": 502})])
+
+    def test_validation_errors_render_as_an_event(self):
+        response = self.client.post("/api/ai/simplify/", {"text": ""}, format="json", HTTP_ACCEPT="text/event-stream")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(parse_events(response.content), [("error", {"error": "No text provided.", "status": 400})])
+
+    async def test_async_stream(self):
+        token = await sync_to_async(lambda: str(RefreshToken.for_user(self.user).access_token))()
+        response = await self.async_client.post(
+            "/api/ai/async/simplify/", {"text": "Async words.", "stream": True},
+            content_type="application/json", headers={"Authorization": f"Bearer {token}"},
+        )
+        body = b"".join([chunk async for chunk in response.streaming_content])
+        events = parse_events(body)
+        self.assertEqual(events[-1], ("done", {"simplified": "Plain: Async words.", "cached": False}))
@@ -0,0 +1,88 @@
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from ai_features import throttling
+from ai_features.document import document_cost
+from library.tests import MediaMixin, make_user
+
+from . import FakeGateway, use_gateway
+
+RATES = {"ai": "3/min", "ai_global": "5/min", "explain": "2/min", "explain_global": None}
+
+
+@override_settings(AI_THROTTLE_RATES=RATES, AI_THROTTLE_MAX_IN_FLIGHT=2, AI_DICTIONARY_PATH="", AI_DICTIONARY_REMOTE=False)
+class AdmissionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_bucket_refills_over_the_period(self):
+        rate = throttling.parse_rate("3/min")
+        self.assertEqual(rate, (3, 60.0))
+        self.assertEqual([throttling.take("k", rate)[:2] for _ in range(3)], [(True, 2), (True, 1), (True, 0)])
+        allowed, remaining, wait = throttling.take("k", rate)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(wait, 20, delta=1)
+
+    def test_costly_requests_spend_several_tokens(self):
+        self.assertTrue(throttling.admit("ai", 1, cost=3).allowed)
+        decision = throttling.admit("ai", 1)
+        self.assertEqual((decision.allowed, decision.reason), (False, "user"))
+        self.assertTrue(throttling.admit("explain", 1, cost=99).allowed)   # capped at a full bucket
+
+    def test_global_refusal_gives_the_users_tokens_back(self):
+        throttling.admit("ai", 1, cost=3)
+        decision = throttling.admit("ai", 2, cost=3)
+        self.assertEqual((decision.allowed, decision.reason), (False, "global"))
+        self.assertEqual(throttling.admit("ai", 2, cost=2).remaining, 1)
+
+    def test_in_flight_cap(self):
+        first, second = throttling.admit("explain", 1), throttling.admit("explain", 1)
+        self.assertTrue(first.allowed and second.allowed)
+        throttling.refund(f"{throttling.PREFIX}explain:user:1", throttling.parse_rate("2/min"), 2)
+        self.assertEqual(throttling.admit("explain", 1).reason, "in_flight")
+        throttling.release_slot(*first.slot)
+        self.assertTrue(throttling.admit("explain", 1).allowed)
+
+    def test_contended_locks_refuse_instead_of_skipping_the_check(self):
+        cache.add(f"{throttling.PREFIX}ai:user:1:lock", 1, 2)
+        self.assertEqual(throttling.admit("ai", 1).allowed, False)
+        self.assertTrue(throttling.admit("ai", 2).allowed)
+
+    def test_view_headers_and_429(self):
+        client = APIClient()
+        client.force_authenticate(make_user())
+        statuses = [client.post("/api/ai/explain/", {"word": "x"}, format="json") for _ in range(3)]
+        self.assertEqual([r.status_code for r in statuses], [404, 404, 429])
+        self.assertEqual((statuses[0]["X-RateLimit-Limit"], statuses[0]["X-RateLimit-Remaining"]), ("2", "1"))
+        self.assertEqual(statuses[2]["Retry-After"], "30")
+        self.assertEqual(statuses[2].json()["kind"], "rate_limited")
+
+    async def test_async_views_are_throttled_too(self):
+        user = await sync_to_async(make_user)()
+        token = await sync_to_async(lambda: str(RefreshToken.for_user(user).access_token))()
+        statuses = []
+        with use_gateway(FakeGateway()):
+            for _ in range(4):
+                response = await self.async_client.post(
+                    "/api/ai/async/simplify/", {"text": "Words."},
+                    content_type="application/json", headers={"Authorization": f"Bearer {token}"},
+                )
+                statuses.append(response.status_code)
+        self.assertEqual(statuses, [200, 200, 200, 429])
+
+
+@override_settings(AI_CHUNK_TOKENS=10, AI_DOCUMENT_MAX_CHUNKS=50)   # 40 characters per chunk
+class DocumentCostTests(MediaMixin, TestCase):
+    def test_cost_is_the_estimated_chunk_count(self):
+        self.assertEqual(document_cost({"text": "x" * 100}), 3)
+        user_file = self.upload(b"x" * 400, name="notes.txt", file_type="TXT")
+        self.assertEqual(document_cost({"file_id": user_file.pk}, self.user), 10)
+        self.assertEqual(document_cost({"file_id": user_file.pk}, make_user()), 1)
+        self.assertEqual(document_cost({"file_id": "abc"}, self.user), 1)
+
+    def test_cost_stops_at_the_longest_accepted_document(self):
+        user_file = self.upload(b"x" * 40_000, name="long.txt", file_type="TXT")
+        self.assertEqual(document_cost({"file_id": user_file.pk}, self.user), 50)
@@ -0,0 +1,110 @@
+"""
+Page-indexed text store: a document's extracted text, one compressed blob
+per page, readable a page at a time.
+
+Layout (integers little-endian):
+
+    b"NRTX\x01"                       magic + format version
+    page 1 … page n                   each zlib-compressed UTF-8
+    (n + 1) × uint64                  absolute offset of every page, then the end
+    uint64 index offset, uint32 n, b"NRTX"
+
+The index sits at the end so pages can be written as they are extracted;
+reading page k is two seeks and one decompress, whatever the document size.
+Standard library only — the extraction worker imports it without Django.
+"""
+
+import os
+import struct
+import zlib
+
+MAGIC = b"NRTX"
+HEADER = MAGIC + b"\x01"
+TRAILER = struct.Struct("<QI4s")
+OFFSET = struct.Struct("<Q")
+LEVEL = 6
+
+
+class StoreError(Exception):
+    pass
+
+
+class Writer:
+    """Appends pages to a new store file; ``close()`` writes the index."""
+
+    def __init__(self, path: str):
+        self.f = open(path, "wb")
+        self.f.write(HEADER)
+        self.offsets = []
+        self.pages = 0
+        self.characters = 0
+
+    def add(self, text: str):
+        self.offsets.append(self.f.tell())
+        self.f.write(zlib.compress(text.encode("utf-8", "replace"), LEVEL))
+        self.pages += 1
+        self.characters += len(text)
+
+    def close(self):
+        index = self.f.tell()
+        self.offsets.append(index)
+        self.f.write(b"".join(OFFSET.pack(o) for o in self.offsets))
+        self.f.write(TRAILER.pack(index, self.pages, MAGIC))
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.f.close()
+
+
+def write(path: str, pages) -> tuple:
+    """Writes an iterable of page texts. Returns (pages, characters)."""
+    with Writer(path) as writer:
+        for text in pages:
+            writer.add(text)
+    return writer.pages, writer.characters
+
+
+def _trailer(f) -> tuple:
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    if size < len(HEADER) + OFFSET.size + TRAILER.size:
+        raise StoreError("Text store is truncated.")
+    f.seek(size - TRAILER.size)
+    index, count, magic = TRAILER.unpack(f.read(TRAILER.size))
+    if magic != MAGIC:
+        raise StoreError("Not a text store.")
+    return index, count
+
+
+def page_count(path: str) -> int:
+    with open(path, "rb") as f:
+        return _trailer(f)[1]
+
+
+def read_page(path: str, number: int) -> str:
+    """Text of page ``number`` (1-based)."""
+    with open(path, "rb") as f:
+        index, count = _trailer(f)
+        if not 1 <= number <= count:
+            raise IndexError(f"Page {number} out of range (1–{count}).")
+        f.seek(index + (number - 1) * OFFSET.size)
+        start, end = struct.unpack("<QQ", f.read(2 * OFFSET.size))
+        f.seek(start)
+        return zlib.decompress(f.read(end - start)).decode("utf-8")
+
+
+def iter_pages(path: str):
+    """Yields every page's text in order, one page in memory at a time."""
+    with open(path, "rb") as f:
+        index, count = _trailer(f)
+        f.seek(index)
+        offsets = [OFFSET.unpack(f.read(OFFSET.size))[0] for _ in range(count + 1)]
+        for start, end in zip(offsets, offsets[1:]):
+            f.seek(start)
+            yield zlib.decompress(f.read(end - start)).decode("utf-8")
@@ -0,0 +1,304 @@
+"""
+Rate limits for the endpoints that spend upstream quota (HuggingFace models,
+the dictionary API, Google Translate).
+
+Each request has to pass three checks, all kept in the shared Django cache
+so they hold across every worker process:
+
+* a per-user token bucket   — settings.AI_THROTTLE_RATES[scope]
+* a global token bucket     — settings.AI_THROTTLE_RATES[f"{scope}_global"]
+* a per-user in-flight cap  — settings.AI_THROTTLE_MAX_IN_FLIGHT
+
+Buckets use GCRA: one timestamp per key (the "theoretical arrival time")
+that advances by rate-period / rate-count per token, so a "30/min" bucket
+holds up to 30 tokens and refills one every two seconds.
+
+Each read-modify-write of a counter holds a short cache lock (``cache.add``).
+A request that can't get the lock within LOCK_WAIT is refused like a
+throttled one rather than let through unmetered.
+
+Throttled requests get 429 with ``Retry-After``; every response carries
+``X-RateLimit-Limit`` / ``X-RateLimit-Remaining`` for the user's bucket so
+the frontend can back off before it is refused.
+"""
+
+import functools
+import logging
+import math
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache as shared_cache
+from django.http import JsonResponse
+from rest_framework.exceptions import APIException
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "ai:throttle:"
+LOCK_WAIT = 0.05      # seconds to wait for a bucket lock before refusing the request
+RELEASE_WAIT = 1.0    # refunds and slot releases wait longer: they only give tokens back
+SLOT_TTL = 120     # in-flight counters expire if a worker dies mid-request
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+@dataclass
+class Decision:
+    allowed: bool
+    limit: int = 0
+    remaining: int = 0
+    retry_after: float = 0.0
+    reason: str = ""          # "user" | "global" | "in_flight" when refused
+    slot: tuple = None        # (scope, user id) to release when the request ends
+
+    def headers(self) -> dict:
+        headers = {}
+        if self.limit:
+            headers["X-RateLimit-Limit"] = str(self.limit)
+            headers["X-RateLimit-Remaining"] = str(self.remaining)
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+    def payload(self) -> dict:
+        messages = {
+            "user": "You're sending requests too quickly. Please wait a moment.",
+            "global": "The AI service is busy right now. Please try again shortly.",
+            "in_flight": "Too many requests in progress. Wait for one to finish.",
+        }
+        return {"error": messages[self.reason], "kind": "rate_limited"}
+
+
+class RateLimited(APIException):
+    status_code = 429
+    default_code = "throttled"
+
+    def __init__(self, decision: Decision):
+        super().__init__(decision.payload())
+        self.wait = max(1, math.ceil(decision.retry_after))
+
+
+def parse_rate(rate):
+    """'30/min' → (30, 60.0); None → None."""
+    if not rate:
+        return None
+    count, period = rate.split("/")
+    return int(count), float(PERIODS[period.strip()[0]])
+
+
+class Contended(Exception):
+    """A counter's lock stayed taken for the whole wait."""
+
+
+@contextmanager
+def _locked(key: str, wait: float = LOCK_WAIT):
+    lock = key + ":lock"
+    deadline = time.monotonic() + wait
+    acquired = shared_cache.add(lock, 1, 2)
+    while not acquired and time.monotonic() < deadline:
+        time.sleep(0.002)
+        acquired = shared_cache.add(lock, 1, 2)
+    if not acquired:
+        raise Contended(key)
+    try:
+        yield
+    finally:
+        shared_cache.delete(lock)
+
+
+def take(key: str, rate: tuple, cost: int = 1) -> tuple:
+    """
+    Takes ``cost`` tokens from a GCRA bucket.
+    Returns (allowed, remaining, retry_after seconds); refused when the
+    bucket's lock is contended.
+    """
+    count, period = rate
+    interval = period / count
+    try:
+        with _locked(key):
+            now = time.time()
+            tat = max(shared_cache.get(key) or now, now)
+            new_tat = tat + interval * cost
+            allow_at = new_tat - period   # a full bucket is one period's worth of tokens
+            if now < allow_at:
+                return False, 0, allow_at - now
+            shared_cache.set(key, new_tat, math.ceil(new_tat - now) + 1)
+            return True, int((now - allow_at) // interval), 0.0
+    except Contended:
+        return False, 0, 1.0
+
+
+def refund(key: str, rate: tuple, cost: int = 1):
+    count, period = rate
+    try:
+        with _locked(key, RELEASE_WAIT):
+            tat = shared_cache.get(key)
+            if tat is not None:
+                tat -= period / count * cost
+                shared_cache.set(key, tat, max(1, math.ceil(tat - time.time()) + 1))
+    except Contended:
+        logger.warning("Could not refund %s token(s) to %s: lock contended", cost, key)
+
+
+def _slot_key(scope: str, user_id) -> str:
+    return f"{PREFIX}{scope}:inflight:{user_id}"
+
+
+def acquire_slot(scope: str, user_id) -> bool:
+    limit = getattr(settings, "AI_THROTTLE_MAX_IN_FLIGHT", 3)
+    if not limit:
+        return True
+    key = _slot_key(scope, user_id)
+    try:
+        with _locked(key):
+            current = shared_cache.get(key) or 0
+            if current >= limit:
+                return False
+            shared_cache.set(key, current + 1, SLOT_TTL)
+            return True
+    except Contended:
+        return False
+
+
+def release_slot(scope: str, user_id):
+    key = _slot_key(scope, user_id)
+    try:
+        with _locked(key, RELEASE_WAIT):
+            current = shared_cache.get(key) or 0
+            if current > 0:
+                shared_cache.set(key, current - 1, SLOT_TTL)
+    except Contended:
+        # The counter expires SLOT_TTL after its last change, freeing the slot then.
+        logger.warning("Could not release in-flight slot %s: lock contended", key)
+
+
+def admit(scope: str, user_id, cost: int = 1) -> Decision:
+    """Runs the user bucket, global bucket and in-flight checks for one request."""
+    rates = getattr(settings, "AI_THROTTLE_RATES", {})
+    user_rate = parse_rate(rates.get(scope))
+    global_rate = parse_rate(rates.get(f"{scope}_global"))
+    user_key = f"{PREFIX}{scope}:user:{user_id}"
+
+    decision = Decision(allowed=True)
+    if user_rate:
+        cost = min(cost, user_rate[0])   # an oversized batch waits for a full bucket
+        allowed, remaining, wait = take(user_key, user_rate, cost)
+        decision = Decision(allowed, user_rate[0], remaining, wait, "" if allowed else "user")
+        if not allowed:
+            return decision
+
+    if global_rate:
+        allowed, _, wait = take(f"{PREFIX}{scope}:global", global_rate, min(cost, global_rate[0]))
+        if not allowed:
+            if user_rate:
+                refund(user_key, user_rate, cost)
+                decision.remaining += cost
+            decision.allowed, decision.retry_after, decision.reason = False, wait, "global"
+            return decision
+
+    if not acquire_slot(scope, user_id):
+        if user_rate:
+            refund(user_key, user_rate, cost)
+            decision.remaining += cost
+        decision.allowed, decision.retry_after, decision.reason = False, 1.0, "in_flight"
+        return decision
+
+    decision.slot = (scope, user_id)
+    return decision
+
+
+def request_cost(data) -> int:
+    """Batched requests spend one token per paragraph; everything else one."""
+    paragraphs = data.get("paragraphs") if hasattr(data, "get") else None
+    return max(1, len(paragraphs)) if isinstance(paragraphs, list) else 1
+
+
+def finish(decision: Decision, response):
+    """Adds rate-limit headers and frees the in-flight slot once the response is done."""
+    for name, value in decision.headers().items():
+        response[name] = value
+    if decision.slot is None:
+        return response
+
+    release = functools.partial(release_slot, *decision.slot)
+    decision.slot = None
+    if not getattr(response, "streaming", False):
+        release()
+    elif getattr(response, "is_async", False):
+        response.streaming_content = _arelease_after(response.streaming_content, release)
+    else:
+        response.streaming_content = _release_after(response.streaming_content, release)
+    return response
+
+
+def _release_after(content, release):
+    try:
+        yield from content
+    finally:
+        release()
+
+
+async def _arelease_after(content, release):
+    try:
+        async for chunk in content:
+            yield chunk
+    finally:
+        await sync_to_async(release)()
+
+
+# ── DRF views ─────────────────────────────────────────────────────────────────
+class ThrottledViewMixin:
+    """
+    APIView mixin: admits the request after authentication and releases its
+    in-flight slot when the response (or SSE stream) finishes.
+    """
+
+    throttle_scope = "ai"
+
+    def throttle_cost(self, request) -> int:
+        return request_cost(request.data)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._admission = admit(self.throttle_scope, request.user.pk, self.throttle_cost(request))
+        if not self._admission.allowed:
+            raise RateLimited(self._admission)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        admission = getattr(self, "_admission", None)
+        if admission is not None:
+            finish(admission, response)
+        return response
+
+
+# ── async views ───────────────────────────────────────────────────────────────
+def athrottled(scope: str, cost=None):
+    """
+    Decorator for ``jwt_api_view`` handlers (``view(request, data, ...)``):
+    the same admission and headers as ThrottledViewMixin. ``cost(request,
+    data)`` is the tokens a request spends (default ``request_cost``); it
+    runs in a worker thread, so it may query the database.
+    """
+
+    def admit_request(request, data) -> Decision:
+        tokens = cost(request, data) if cost else request_cost(data)
+        return admit(scope, request.user.pk, tokens)
+
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, data, *args, **kwargs):
+            decision = await sync_to_async(admit_request)(request, data)
+            if not decision.allowed:
+                return finish(decision, JsonResponse(decision.payload(), status=429))
+            try:
+                response = await view(request, data, *args, **kwargs)
+            except BaseException:
+                await sync_to_async(release_slot)(*decision.slot)
+                raise
+            return await sync_to_async(finish)(decision, response)
+        return wrapper
+    return decorator
@@ -1,16 +1,69 @@
 from django.urls import path
-from .views import SimplifyView, StructureView, ExplainWordView, AgentOptimizeReadingView
+from . import async_views
+from .views import (
+    SimplifyView,
+    StructureView,
+    DocumentView,
+    ExplainWordView,
+    ExplainBatchView,
+    AgentOptimizeReadingView,
+    AgentOptimizeReadingBatchView,
+    AnnotateView,
+    CacheStatsView,
+    GatewayStatsView,
+    AgentStatsView,
+    JobListCreateView,
+    JobDetailView,
+)
 
 urlpatterns = [
     # POST {"text": "..."} → {"simplified": "..."}
+    # POST {"paragraphs": ["...", ...]} → {"results": [{"simplified": "..."}, ...]}
     path("simplify/", SimplifyView.as_view(), name="ai-simplify"),
 
     # POST {"text": "..."} → {"structured": "..."}
+    # POST {"paragraphs": ["...", ...]} → {"results": [{"structured": "..."}, ...]}
     path("structure/", StructureView.as_view(), name="ai-structure"),
 
+    # POST {"text": "..."} or {"file_id": int} → whole document, chunked
+    # (task: simplify | structure; add "stream": true for per-chunk SSE)
+    path("document/<str:task>/", DocumentView.as_view(), name="ai-document"),
+
     # POST {"word": "...", "context": "..."} → {"word": "...", "explanation": "..."}
     path("explain/", ExplainWordView.as_view(), name="ai-explain"),
 
+    # POST {"words": ["...", ...]} → {"results": [...]} (per-word status; "stream": true for SSE)
+    path("explain/batch/", ExplainBatchView.as_view(), name="ai-explain-batch"),
+
     # POST {"file_id": int, "text": "...", "current_settings": {...}} 
     path("agent/optimize-reading/", AgentOptimizeReadingView.as_view(), name="agent-optimize-reading"),
+
+    # POST {"file_ids": [...], "texts": [...], "current_settings": {...}} → per-item results
+    path("agent/optimize-reading/batch/", AgentOptimizeReadingBatchView.as_view(), name="agent-optimize-reading-batch"),
+
+    # POST {"file_id": int} or {"text": "..."} → per-paragraph / per-sentence
+    # scores with character offsets (cached per document; "stream": true for SSE)
+    path("annotate/", AnnotateView.as_view(), name="ai-annotate"),
+
+    # Async twins of the endpoints above for ASGI deployments — same payloads,
+    # but the upstream model / dictionary call never blocks a worker thread
+    path("async/simplify/", async_views.simplify, name="ai-simplify-async"),
+    path("async/structure/", async_views.structure, name="ai-structure-async"),
+    path("async/document/<str:task>/", async_views.document, name="ai-document-async"),
+    path("async/explain/", async_views.explain_word, name="ai-explain-async"),
+    path("async/explain/batch/", async_views.explain_batch, name="ai-explain-batch-async"),
+
+    # Background jobs — GET list / POST {"file_id": int} to queue precompute
+    path("jobs/", JobListCreateView.as_view(), name="ai-jobs"),
+    # GET → status + result of one job
+    path("jobs/<int:pk>/", JobDetailView.as_view(), name="ai-job-detail"),
+
+    # GET → result cache hit / miss counts (staff only)
+    path("cache/stats/", CacheStatsView.as_view(), name="ai-cache-stats"),
+
+    # GET → model chains, per-model latency / error counts (staff only)
+    path("gateway/stats/", GatewayStatsView.as_view(), name="ai-gateway-stats"),
+
+    # GET → per-stage timing histograms of the reading agent (staff only)
+    path("agent/stats/", AgentStatsView.as_view(), name="ai-agent-stats"),
 ]
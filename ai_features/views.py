@@ -1,96 +1,167 @@
+import json
+from concurrent.futures.process import BrokenProcessPool
+
 from django.conf import settings
+from django.http import StreamingHttpResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
-from huggingface_hub import InferenceClient
-import requests
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 
 from library.models import UserFile
+from . import analysis, annotation, batching, cache, dictionary, extractive, jobs
+from .completions import RESULT_KEYS, cache_key, complete, error_payload, warm
+from .document import TEXT_FILE_TYPES, document_cost, has_text, document_events, load_file_text, resolve_chunks, run_document
+from .gateway import get_gateway
+from .throttling import ThrottledViewMixin
+from .streaming import EventStreamRenderer, sse_event, sse_response, stream_completion, wants_stream
+from .models import Job
+from .serializers import JobSerializer
+from .agent import pool, stages
 from .agent.pipeline import ReadingOptimizationAgent
-from .agent.serializers import OptimizeReadingRequestSerializer, OptimizeReadingResponseSerializer
+from .agent.serializers import (
+    OptimizeReadingBatchRequestSerializer,
+    OptimizeReadingRequestSerializer,
+    OptimizeReadingResponseSerializer,
+)
 
 # ─────────────────────────────────────────────────────────────────────────────
-# AI Models — using HuggingFace Hub InferenceClient
-# The old raw requests endpoints (api-inference and router) are heavily 
-# restricted or deprecated. huggingface_hub manages correct routing.
+# AI Models — using HuggingFace Hub InferenceClient via the LLM gateway
+# (gateway.py), which owns the pooled clients and the per-task model fallback
+# chains configured in settings.AI_MODEL_CHAINS. Prompts live in completions.py.
 # ─────────────────────────────────────────────────────────────────────────────
 
-def get_hf_client():
-    api_key = getattr(settings, "HF_API_KEY", "")
-    return InferenceClient(api_key=api_key, timeout=25)
-
 
 def _err(e: Exception) -> Response:
-    msg = str(e).lower()
-    if "model_not_supported" in msg:
-        return Response({"error": "Hugging Face Free Tier no longer supports this Mistral model. Please use a PRO key or switch to a supported model (e.g. Qwen2.5-0.5B-Instruct)."}, status=502)
-    if "timeout" in msg or "read operation timed out" in msg:
-        return Response({"error": "AI model is waking up (cold start). Please try again in 30 seconds."}, status=503)
-    if "unauthorized" in msg or "invalid" in msg:
-        return Response({"error": "Invalid HuggingFace API key or missing permissions."}, status=502)
-    return Response({"error": f"AI request failed: {str(e)[:200]}"}, status=502)
+    payload, status = error_payload(e)
+    return Response(payload, status=status)
+
+
+def _batch(task: str, data) -> Response:
+    """{"paragraphs": [...]} → one result per paragraph, packed into few model calls."""
+    texts, error = batching.batch_paragraphs(data)
+    if error:
+        payload, status = error
+        return Response(payload, status=status)
+    return Response(batching.respond(task, texts, extractive.engine(data)))
 
 
 # ── 1. Simplify ───────────────────────────────────────────────────────────────
-class SimplifyView(APIView):
-    """POST /api/ai/simplify/"""
+class SimplifyView(ThrottledViewMixin, APIView):
+    """
+    POST /api/ai/simplify/
+    Send {"stream": true} or Accept: text/event-stream to receive tokens as SSE.
+    Send {"paragraphs": [...]} instead of "text" to batch many paragraphs.
+    """
     permission_classes = [IsAuthenticated]
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
 
     def post(self, request):
+        if "paragraphs" in request.data:
+            return _batch("simplify", request.data)
+
         text = (request.data.get("text") or "").strip()[:1500]
         if not text:
             return Response({"error": "No text provided."}, status=400)
 
-        # Use Llama-3.2-1B for simplification (supported on the free tier keys)
+        if wants_stream(request, request.data):
+            return sse_response(stream_completion("simplify", text))
+
+        # Models come from the "simplify" chain (Llama-3.2-1B first, free tier)
         try:
-            client = get_hf_client()
-            messages = [
-                {"role": "system", "content": "You are a helpful reading assistant. Simplify the user's text into plain, easy-to-understand language. Do not add any extra conversational filler, just return the simplified text directly."},
-                {"role": "user", "content": f"Simplify this text:\n\n{text}"}
-            ]
-            res = client.chat_completion(
-                messages=messages, 
-                model="meta-llama/Llama-3.2-1B-Instruct",
-                max_tokens=600
-            )
-            output = res.choices[0].message.content.strip()
-            return Response({"simplified": output})
+            output, cached = complete("simplify", text)
+            return Response({"simplified": output, "cached": cached})
         except Exception as e:
             return _err(e)
 
 
 # ── 2. Structure ──────────────────────────────────────────────────────────────
-class StructureView(APIView):
-    """POST /api/ai/structure/"""
+class StructureView(ThrottledViewMixin, APIView):
+    """
+    POST /api/ai/structure/
+    Send {"stream": true} or Accept: text/event-stream to receive tokens as SSE.
+    Send {"paragraphs": [...]} instead of "text" to batch many paragraphs.
+    "engine": llm | extractive | instant | fallback overrides AI_STRUCTURE_ENGINE.
+    """
     permission_classes = [IsAuthenticated]
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
 
     def post(self, request):
+        if "paragraphs" in request.data:
+            return _batch("structure", request.data)
+
         text = (request.data.get("text") or "").strip()[:1500]
         if not text:
             return Response({"error": "No text provided."}, status=400)
 
-        # Use Llama-3.2-1B for structuring text into bullet points
+        engine = extractive.engine(request.data)
+        stream = wants_stream(request, request.data)
+
+        # Local TF-IDF / TextRank bullets — no model call at all
+        if engine == "extractive":
+            return sse_response(extractive.events(text)) if stream else Response(extractive.payload(text))
+
+        # Model output when cached; otherwise local bullets now, model result warmed for next time
+        fallback = extractive.fallback if engine in ("fallback", "instant") else None
+        if engine == "instant":
+            if stream:
+                return sse_response(extractive.with_draft(text, stream_completion("structure", text, fallback)))
+            output = cache.get(cache_key("structure", text), "structure")
+            if output is not None:
+                return Response({"structured": output, "cached": True})
+            warm("structure", text)
+            return Response({**extractive.payload(text), "pending": True})
+
+        if stream:
+            return sse_response(stream_completion("structure", text, fallback))
+
+        # Models come from the "structure" chain (Llama-3.2-1B first, free tier)
         try:
-            client = get_hf_client()
-            messages = [
-                {"role": "system", "content": "You are a helpful reading assistant. Extract the main points from the user's text and format them as a concise bulleted list. Do not add conversational filler. Use a • character for each bullet point."},
-                {"role": "user", "content": f"Format this text as a structural bulleted list:\n\n{text}"}
-            ]
-            res = client.chat_completion(
-                messages=messages, 
-                model="meta-llama/Llama-3.2-1B-Instruct",
-                max_tokens=600
-            )
-            output = res.choices[0].message.content.strip()
-            return Response({"structured": output})
+            output, cached = complete("structure", text)
+            return Response({"structured": output, "cached": cached})
         except Exception as e:
+            body = fallback(text, e) if fallback else None
+            if body is not None:
+                return Response(body)
             return _err(e)
 
 
-# ── 3. Explain word (Dictionary API primary) ──────────────────────────────────
-class ExplainWordView(APIView):
+# ── 2b. Whole-document simplify / structure ────────────────────────────────────
+class DocumentView(ThrottledViewMixin, APIView):
+    """
+    POST /api/ai/document/<task>/    task: simplify | structure
+    Body: {"text": "..."} or {"file_id": int}. Processes the whole document in
+    token-bounded chunks instead of truncating it. Send {"stream": true} or
+    Accept: text/event-stream to receive each chunk as soon as it is ready.
+    A PDF whose text hasn't been extracted answers 202 / 422 (jobs.extraction_pending).
+    """
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+
+    def throttle_cost(self, request) -> int:
+        return document_cost(request.data, request.user)
+
+    def post(self, request, task):
+        if task not in RESULT_KEYS:
+            return Response({"error": f"Unknown task '{task}'."}, status=404)
+
+        chunks, error = resolve_chunks(request.data, request.user)
+        if error:
+            payload, status = error
+            return Response(payload, status=status)
+
+        if wants_stream(request, request.data):
+            return sse_response(document_events(task, chunks))
+
+        payload, status = run_document(task, chunks)
+        return Response(payload, status=status)
+
+
+# ── 3. Explain word (offline index, Dictionary API fallback) ──────────────────
+class ExplainWordView(ThrottledViewMixin, APIView):
     """POST /api/ai/explain/"""
     permission_classes = [IsAuthenticated]
+    throttle_scope = "explain"
 
     def post(self, request):
         word    = (request.data.get("word")    or "").strip().lower()
@@ -99,43 +170,58 @@ class ExplainWordView(APIView):
         if not word:
             return Response({"error": "No word provided."}, status=400)
 
-        # Primary: Free Dictionary API (super fast, reliable, no auth limits)
+        # Local index first (microseconds), dictionaryapi.dev only for misses
         try:
-            r = requests.get(f"https://api.dictionaryapi.dev/api/v2/entries/en/{word}", timeout=8)
-            if r.status_code == 200:
-                entries = r.json()
-                if entries:
-                    entry    = entries[0]
-                    phonetic = entry.get("phonetic", "")
-                    meanings = entry.get("meanings", [])
-                    parts    = []
-                    for m in meanings[:2]:
-                        pos  = m.get("partOfSpeech", "")
-                        defs = m.get("definitions", [])
-                        if defs:
-                            d = defs[0]
-                            defn    = d.get("definition", "")
-                            example = d.get("example",    "")
-                            part = f"[{pos}] {defn}"
-                            if example:
-                                part += f'\n  Example: "{example}"'
-                            parts.append(part)
-                    if parts:
-                        explanation = "\n\n".join(parts)
-                        if phonetic:
-                            explanation = f"{phonetic}\n\n" + explanation
-                        return Response({"word": word, "explanation": explanation})
-        except Exception:
-            pass
+            explanation, source = dictionary.explain(word)
+        except dictionary.DictionaryError:
+            return Response({"error": "Dictionary service unavailable. Please try again."}, status=503)
+        if explanation:
+            return Response({"word": word, "explanation": explanation, "source": source})
 
         return Response({"error": f"Definition not found in dictionary for '{word}'."}, status=404)
 
 
+class ExplainBatchView(ThrottledViewMixin, APIView):
+    """
+    POST /api/ai/explain/batch/
+    {"words": ["...", ...]} or {"words": [{"word": "...", "context": "..."}, ...]}
+    → {"results": [{"word", "explanation", "source", "status"} | {"word", "error", "status"}]}
+    Send {"stream": true} to receive one ``word`` event per result as SSE.
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_scope = "explain"
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+
+    def throttle_cost(self, request) -> int:
+        words = request.data.get("words")
+        return max(1, len(words)) if isinstance(words, list) else 1
+
+    def post(self, request):
+        words, error = dictionary.batch_words(request.data)
+        if error:
+            payload, status = error
+            return Response(payload, status=status)
+
+        if wants_stream(request, request.data):
+            def events():
+                for index, item in dictionary.explain_many(words):
+                    yield sse_event("word", {"index": index, **item})
+                yield sse_event("done", {"total": len(words)})
+            return sse_response(events())
+
+        results = [None] * len(words)
+        for index, item in dictionary.explain_many(words):
+            results[index] = item
+        return Response({"results": results})
+
+
 # ── 4. Agentic Reading Optimizer ──────────────────────────────────────────────
 class AgentOptimizeReadingView(APIView):
     """
     POST /api/agent/optimize-reading/
     Analyzes text/file and intelligently recommends UI settings to optimize reading.
+    A PDF whose text hasn't been extracted answers 202 while the extract job
+    runs and 422 if it can't be, like /api/library/files/<pk>/pages/.
     """
     permission_classes = [IsAuthenticated]
 
@@ -145,36 +231,232 @@ class AgentOptimizeReadingView(APIView):
             return Response(req_serializer.errors, status=400)
 
         data = req_serializer.validated_data
-        
-        # Extract text to analyze
         text_to_analyze = data.get("text", "")
         file_id = data.get("file_id")
+        agent = ReadingOptimizationAgent()
+        analysis_result = None
 
         if not text_to_analyze and file_id:
             try:
                 user_file = UserFile.objects.get(id=file_id, user=request.user)
-                # In a real app we would extract text from the PDF/File here
-                # As a fallback for demo, we read it if it's text-based or use a stub
-                if user_file.file_type in ["TXT", "MD", "HTML", "RTF"]:
-                    with user_file.file.open('r') as f:
-                        text_to_analyze = f.read()[:5000] # just sample first 5k chars
-                else:
-                    # PDF or generic - assume client passes 'text' if they want exact page analysis
-                    # Alternatively, default to generic placeholder for testing
-                    text_to_analyze = "The file is a PDF. Text extraction requires passing the 'text' field directly from the frontend."
             except UserFile.DoesNotExist:
                 return Response({"error": "File not found."}, status=404)
+            if not has_text(user_file):
+                # PDF whose text the extract job hasn't produced (yet): 202 / 422.
+                payload, status = jobs.extraction_pending(user_file)
+                return Response({"file_id": user_file.id, **payload}, status=status)
+            try:
+                # Stored per content hash; computed once by streaming the file.
+                analysis_result = analysis.analyze_file(user_file)
             except Exception as e:
                 return Response({"error": f"Could not read file text: {str(e)}"}, status=500)
 
         # Run through Agent Pipeline
-        agent = ReadingOptimizationAgent()
-        result = agent.process_text(
-            text=text_to_analyze, 
-            current_settings=data.get("current_settings", {})
-        )
+        current_settings = data.get("current_settings", {})
+        trace = data.get("trace") or getattr(settings, "AI_AGENT_TRACE", False)
+        if analysis_result is not None:
+            result = agent.process_analysis(analysis_result, current_settings, trace=trace)
+        else:
+            result = agent.process_text(text=text_to_analyze, current_settings=current_settings, trace=trace)
 
         resp_serializer = OptimizeReadingResponseSerializer(data=result)
         if resp_serializer.is_valid():
             return Response(resp_serializer.validated_data)
         return Response(resp_serializer.errors, status=500)
+
+
+def _pool_error(e: Exception) -> dict:
+    if isinstance(e, BrokenProcessPool):
+        return {"error": "Analysis worker crashed. Please retry.", "status": 503}
+    if isinstance(e, FileNotFoundError):
+        return {"error": "File not found.", "status": 404}
+    return {"error": f"Could not analyze: {e}", "status": 500}
+
+
+class AgentOptimizeReadingBatchView(APIView):
+    """
+    POST /api/ai/agent/optimize-reading/batch/
+    {"file_ids": [...], "texts": [...], "current_settings": {...}} → one
+    optimize-reading result per item, scored in parallel worker processes
+    (files with a stored FileAnalysis skip the pool). Items fail individually: each result carries its own "status".
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        req_serializer = OptimizeReadingBatchRequestSerializer(data=request.data)
+        if not req_serializer.is_valid():
+            return Response(req_serializer.errors, status=400)
+        data = req_serializer.validated_data
+
+        results = [{"file_id": file_id} for file_id in data["file_ids"]]
+        results += [{"text_index": i} for i in range(len(data["texts"]))]
+        items, positions = [], []   # (text, path) pairs for the pool, and their result slots
+        hashes = {}                 # result slot → content hash, to store fresh analyses
+
+        agent = ReadingOptimizationAgent()
+        trace = data["trace"] or getattr(settings, "AI_AGENT_TRACE", False)
+        files = UserFile.objects.filter(user=request.user).in_bulk(data["file_ids"])
+        known = analysis.stored(f.content_hash for f in files.values() if f.content_hash)
+        for position, file_id in enumerate(data["file_ids"]):
+            user_file = files.get(file_id)
+            if user_file is None:
+                results[position].update({"error": "File not found.", "status": 404})
+            elif not has_text(user_file):
+                # Same 202 / 422 as the single-file endpoint, with the extract job's state.
+                payload, code = jobs.extraction_pending(user_file)
+                results[position].update({
+                    "error": payload.get("error") or "Text extraction is still running. Retry shortly.",
+                    "extraction": payload,
+                    "status": code,
+                })
+            elif user_file.content_hash in known:
+                result = agent.process_analysis(known[user_file.content_hash], data["current_settings"], trace=trace)
+                results[position].update({**result, "status": 200})
+            else:
+                if user_file.file_type in TEXT_FILE_TYPES:
+                    try:
+                        items.append((None, user_file.file.path))
+                    except NotImplementedError:
+                        # Remote storage: read it here for the workers.
+                        items.append((load_file_text(user_file), None))
+                else:
+                    # Extracted text (PDF) comes from the page store.
+                    items.append((load_file_text(user_file), None))
+                positions.append(position)
+                if user_file.content_hash:
+                    hashes[position] = user_file.content_hash
+
+        for offset, text in enumerate(data["texts"]):
+            items.append((text, None))
+            positions.append(len(data["file_ids"]) + offset)
+
+        for index, result, error in pool.optimize_many(items, data["current_settings"], trace):
+            item = results[positions[index]]
+            item.update({**result, "status": 200} if error is None else _pool_error(error))
+            if error is None and positions[index] in hashes:
+                details = {k: v for k, v in result["analysis_details"].items() if k != "timings"}
+                analysis.store(hashes[positions[index]], details)
+
+        failed = sum(1 for item in results if item["status"] != 200)
+        return Response({"results": results, "succeeded": len(results) - failed, "failed": failed})
+
+
+# ── 4b. Difficulty annotation ────────────────────────────────────────────────
+def _annotation_json(records):
+    """Streams {"paragraphs": [...], "summary": {...}} without building it in memory."""
+    yield '{"paragraphs":['
+    separator = ""
+    for event, data in records:
+        if event == "summary":
+            yield '],"summary":' + json.dumps(data) + "}"
+        else:
+            yield separator + json.dumps(data)
+            separator = ","
+
+
+class AnnotateView(APIView):
+    """
+    POST /api/ai/annotate/
+    {"file_id": int} or {"text": "..."} → readability of every paragraph and
+    sentence with character offsets, so the reader can highlight the hard parts.
+    Optional: "sentences": false, "max_score": <only paragraphs scoring below>.
+    Send {"stream": true} or Accept: text/event-stream for one SSE event per paragraph.
+    A PDF whose text hasn't been extracted answers 202 / 422 (jobs.extraction_pending).
+    """
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+
+    def post(self, request):
+        records, error = annotation.resolve(request.data, request.user)
+        if error:
+            payload, status = error
+            return Response(payload, status=status)
+
+        max_score = request.data.get("max_score")
+        try:
+            max_score = float(max_score) if max_score is not None else None
+        except (TypeError, ValueError):
+            return Response({"error": "'max_score' must be a number."}, status=400)
+        sentences = request.data.get("sentences", True) not in (False, "false", "0", 0)
+        records = annotation.select(records, sentences, max_score)
+
+        if wants_stream(request, request.data):
+            return sse_response(
+                sse_event("done" if event == "summary" else event, data) for event, data in records
+            )
+        return StreamingHttpResponse(_annotation_json(records), content_type="application/json")
+
+
+# ── 5. Result cache stats ─────────────────────────────────────────────────────
+class CacheStatsView(APIView):
+    """
+    GET /api/ai/cache/stats/
+    Hit / miss counts and occupancy of the AI result cache (staff only).
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(cache.stats())
+
+
+# ── 6. LLM gateway stats ──────────────────────────────────────────────────────
+class GatewayStatsView(APIView):
+    """
+    GET /api/ai/gateway/stats/
+    Model chains plus per-model latency / error counts for this worker (staff only).
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_gateway().stats())
+
+
+# ── 6b. Agent stage timings ───────────────────────────────────────────────────
+class AgentStatsView(APIView):
+    """
+    GET /api/ai/agent/stats/
+    Per-stage wall / CPU time histograms of the reading agent for this worker (staff only).
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({"stages": [s.name for s in stages.load_stages()], "timings": stages.stats()})
+
+
+# ── 7. Background jobs ────────────────────────────────────────────────────────
+class JobListCreateView(APIView):
+    """
+    GET  /api/ai/jobs/?file_id=<id>  — current user's jobs (optionally for one file)
+    POST /api/ai/jobs/ {"file_id": int} — (re)queue extract → analyze → precompute
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        qs = Job.objects.filter(user=request.user)
+        file_id = request.query_params.get("file_id")
+        if file_id:
+            try:
+                qs = qs.filter(file_id=int(file_id))
+            except ValueError:
+                return Response({"error": "'file_id' must be an integer."}, status=400)
+        return Response(JobSerializer(qs[:100], many=True).data)
+
+    def post(self, request):
+        try:
+            user_file = UserFile.objects.get(id=request.data.get("file_id"), user=request.user)
+        except (UserFile.DoesNotExist, ValueError, TypeError):
+            return Response({"error": "File not found."}, status=404)
+        job = jobs.enqueue_file_pipeline(user_file)
+        return Response(JobSerializer(job).data, status=202)
+
+
+class JobDetailView(APIView):
+    """GET /api/ai/jobs/<id>/ — status and result of one job."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        try:
+            job = Job.objects.get(pk=pk, user=request.user)
+        except Job.DoesNotExist:
+            return Response({"error": "Job not found."}, status=404)
+        return Response(JobSerializer(job).data)
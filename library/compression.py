@@ -0,0 +1,109 @@
+"""
+Compressed storage for text uploads.
+
+TXT, MD, HTML and RTF blobs shrink 4–10×, so they are stored compressed:
+gzip, or zstd when settings.LIBRARY_COMPRESSION = "zstd" and the optional
+``zstandard`` package is installed. The suffix of the stored name (.gz /
+.zst) records which. Readers go through ``open_stored`` / ``open_path`` and
+see the original bytes; serving.py sends the stored bytes unchanged to
+clients whose Accept-Encoding allows it and decompresses on the fly for the
+rest.
+
+Only the standard library (plus zstandard) at import time: the analysis pool
+workers use ``open_path``.
+"""
+
+import gzip
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import zstandard
+except ImportError:  # optional: gzip only
+    zstandard = None
+
+COMPRESSIBLE_TYPES = ("TXT", "MD", "HTML", "RTF")
+SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 10
+COPY_BLOCK = 64 * 1024
+
+
+def encoding_of(name: str) -> str:
+    """Content coding of a stored file, from its name ("" if stored raw)."""
+    for encoding, suffix in SUFFIXES.items():
+        if name.endswith(suffix):
+            return encoding
+    return ""
+
+
+def storage_encoding(file_type: str) -> str:
+    """The encoding new blobs of ``file_type`` are stored with ("" = raw)."""
+    from django.conf import settings
+
+    if file_type not in COMPRESSIBLE_TYPES:
+        return ""   # PDFs are compressed internally already
+    encoding = getattr(settings, "LIBRARY_COMPRESSION", "gzip")
+    if encoding == "zstd" and zstandard is None:
+        return "gzip"
+    return encoding if encoding in SUFFIXES else ""
+
+
+def compressed(f, encoding: str):
+    """A temporary file holding binary file ``f`` compressed, rewound (for storage.save)."""
+    tmp = tempfile.TemporaryFile()
+    if encoding == "zstd":
+        zstandard.ZstdCompressor(level=ZSTD_LEVEL).copy_stream(f, tmp)
+    else:
+        with gzip.GzipFile(fileobj=tmp, mode="wb", compresslevel=GZIP_LEVEL, mtime=0) as z:
+            shutil.copyfileobj(f, z, COPY_BLOCK)
+    tmp.seek(0)
+    return tmp
+
+
+def open_path(path: str):
+    """Opens a stored file for reading its original bytes."""
+    encoding = encoding_of(path)
+    if encoding == "gzip":
+        return gzip.open(path, "rb")
+    if encoding == "zstd":
+        return zstandard.open(path, "rb")
+    return open(path, "rb")
+
+
+@contextmanager
+def open_stored(field_file):
+    """Like ``open_path`` for a FieldFile, on any storage backend."""
+    encoding = encoding_of(field_file.name)
+    with field_file.open("rb") as f:
+        if encoding == "gzip":
+            with gzip.GzipFile(fileobj=f, mode="rb") as raw:
+                yield raw
+        elif encoding == "zstd":
+            with zstandard.ZstdDecompressor().stream_reader(f, closefd=False) as raw:
+                yield raw
+        else:
+            yield f
+
+
+def accepts(accept_encoding: str, encoding: str) -> bool:
+    """Whether an Accept-Encoding header value allows ``encoding``."""
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.strip().lower()] = quality
+    if encoding == "gzip" and "gzip" not in qualities:
+        qualities["gzip"] = qualities.get("x-gzip")
+    quality = qualities.get(encoding)
+    if quality is None:
+        quality = qualities.get("*", 0.0)
+    return quality > 0
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from library import compression
+from library.models import Blob, UserFile, blob_path
+
+
+class Command(BaseCommand):
+    help = (
+        "Compresses text blobs (TXT, MD, HTML, RTF) stored raw — e.g. before "
+        "LIBRARY_COMPRESSION was set — and points their files at the compressed copy."
+    )
+
+    def handle(self, *args, **options):
+        compressed = saved = 0
+        for content_hash in Blob.objects.values_list("content_hash", flat=True).iterator():
+            with transaction.atomic():
+                blob = Blob.objects.select_for_update().filter(pk=content_hash).first()
+                if blob is None or compression.encoding_of(blob.file.name):
+                    continue
+                file_type = blob.files.values_list("file_type", flat=True).first()
+                encoding = compression.storage_encoding(file_type)
+                if not encoding:
+                    continue
+
+                storage, old_name = blob.file.storage, blob.file.name
+                with storage.open(old_name, "rb") as f, compression.compressed(f, encoding) as tmp:
+                    name = storage.save(blob_path(blob, None) + compression.SUFFIXES[encoding], tmp)
+                Blob.objects.filter(pk=content_hash).update(file=name)
+                UserFile.objects.filter(blob=blob).update(file=name)
+                saved += storage.size(old_name) - storage.size(name)
+                storage.delete(old_name)
+                compressed += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Compressed {compressed} blob(s), saving {saved} bytes."))
@@ -0,0 +1,46 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from library import compression
+from library.models import Blob, UserFile
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves files uploaded before content-addressed storage into blobs, so "
+        "identical uploads share one copy on disk. Safe to re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would be freed.")
+
+    def handle(self, *args, **options):
+        moved = freed = missing = 0
+        seen = set()
+        for user_file in UserFile.objects.filter(blob__isnull=True).iterator():
+            if not user_file.file or not os.path.isfile(user_file.file.path):
+                missing += 1
+                continue
+            old_path = user_file.file.path
+            content_hash = user_file.ensure_content_hash()
+            duplicate = content_hash in seen or Blob.objects.filter(pk=content_hash).exists()
+            seen.add(content_hash)
+            if options["dry_run"]:
+                freed += user_file.size if duplicate else 0
+                moved += 1
+                continue
+
+            with user_file.file.open("rb") as f:
+                blob = Blob.acquire(content_hash, f, compression.storage_encoding(user_file.file_type))
+            UserFile.objects.filter(pk=user_file.pk).update(blob=blob, file=blob.file.name)
+            if os.path.abspath(old_path) != os.path.abspath(blob.file.path):
+                os.remove(old_path)
+            freed += user_file.size if duplicate else 0
+            moved += 1
+
+        verb = "Would move" if options["dry_run"] else "Moved"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {moved} file(s) into blobs, freeing {freed} bytes of duplicates"
+            + (f"; {missing} file(s) missing on disk." if missing else ".")
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from library import progress
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes buffered reading progress (POST /api/library/progress/sync/) to the "
+        "database now, without waiting for the next sync or read."
+    )
+
+    def handle(self, *args, **options):
+        written = progress.flush()
+        self.stdout.write(self.style.SUCCESS(f"Flushed progress for {written} file(s)."))
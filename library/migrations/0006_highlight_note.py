@@ -0,0 +1,97 @@
+# Generated by Django 6.0.2 on 2026-10-18 18:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def _ts(value):
+    return int(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+def arrays_to_rows(apps, schema_editor):
+    UserReadingData = apps.get_model("library", "UserReadingData")
+    Highlight = apps.get_model("library", "Highlight")
+    Note = apps.get_model("library", "Note")
+    for rd in UserReadingData.objects.iterator():
+        Highlight.objects.bulk_create([
+            Highlight(
+                user_id=rd.user_id, file_id=rd.file_id,
+                client_id=str(item.get("id", ""))[:64], cls=str(item.get("cls", ""))[:32],
+                text=str(item.get("text", "")), ts=_ts(item.get("ts")),
+            )
+            for item in rd.highlights if isinstance(item, dict)
+        ])
+        Note.objects.bulk_create([
+            Note(
+                user_id=rd.user_id, file_id=rd.file_id,
+                text=str(item.get("text", "")), quote=str(item.get("quote", "")), ts=_ts(item.get("ts")),
+            )
+            for item in rd.notes if isinstance(item, dict)
+        ])
+
+
+def rows_to_arrays(apps, schema_editor):
+    UserReadingData = apps.get_model("library", "UserReadingData")
+    Highlight = apps.get_model("library", "Highlight")
+    Note = apps.get_model("library", "Note")
+    for rd in UserReadingData.objects.iterator():
+        rows = {"user_id": rd.user_id, "file_id": rd.file_id}
+        rd.highlights = [
+            {"id": h.client_id, "cls": h.cls, "text": h.text, "ts": h.ts}
+            for h in Highlight.objects.filter(**rows).order_by("id")
+        ]
+        rd.notes = [
+            {"text": n.text, "quote": n.quote, "ts": n.ts}
+            for n in Note.objects.filter(**rows).order_by("id")
+        ]
+        rd.save(update_fields=["highlights", "notes"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0005_uploadsession'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Highlight',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('client_id', models.CharField(blank=True, default='', max_length=64)),
+                ('cls', models.CharField(blank=True, default='', max_length=32)),
+                ('text', models.TextField(blank=True, default='')),
+                ('ts', models.BigIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('file', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='highlights', to='library.userfile')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='highlights', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'library_highlights',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['user', 'file'], name='library_highlights_user_file')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Note',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.TextField()),
+                ('quote', models.TextField(blank=True, default='')),
+                ('ts', models.BigIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('file', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notes', to='library.userfile')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'library_notes',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['user', 'file'], name='library_notes_user_file')],
+            },
+        ),
+        migrations.RunPython(arrays_to_rows, rows_to_arrays),
+    ]
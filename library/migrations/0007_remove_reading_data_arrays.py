@@ -0,0 +1,21 @@
+# Generated by Django 6.0.2 on 2026-10-18 18:11
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0006_highlight_note'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='userreadingdata',
+            name='highlights',
+        ),
+        migrations.RemoveField(
+            model_name='userreadingdata',
+            name='notes',
+        ),
+    ]
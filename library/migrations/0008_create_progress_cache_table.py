@@ -0,0 +1,20 @@
+# Generated by Django 6.0.2 on 2026-10-18 16:05
+
+from django.core.management import call_command
+from django.db import migrations
+
+
+def create_cache_table(apps, schema_editor):
+    # Backs settings.CACHES["progress"] when Redis is not configured; no-op for other backends.
+    call_command("createcachetable", database=schema_editor.connection.alias, verbosity=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0007_remove_reading_data_arrays"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_cache_table, migrations.RunPython.noop),
+    ]
@@ -1,17 +1,103 @@
+import hashlib
 import os
-from django.db import models
+import uuid
+from django.db import models, transaction
+from django.db.models import F
 from django.conf import settings
+from django.utils import timezone
+
+from . import compression
 
 
 def user_file_path(instance, filename):
-    """Store files in: media/user_files/<user_id>/<filename>"""
+    """Store files in: media/user_files/<user_id>/<filename> (uploads before blobs)"""
     return os.path.join("user_files", str(instance.user.id), filename)
 
 
+def blob_path(instance, filename):
+    """Store blobs in: media/blobs/<ab>/<cd>/<sha256>"""
+    h = instance.content_hash
+    return os.path.join("blobs", h[:2], h[2:4], h)
+
+
+def hash_file(f) -> str:
+    """SHA-256 of a file object, read in chunks; leaves it rewound."""
+    digest = hashlib.sha256()
+    f.seek(0)
+    for chunk in f.chunks() if hasattr(f, "chunks") else iter(lambda: f.read(64 * 1024), b""):
+        digest.update(chunk)
+    f.seek(0)
+    return digest.hexdigest()
+
+
+class Blob(models.Model):
+    """
+    One stored copy of some file contents, shared by every UserFile with
+    those contents; ``refcount`` counts them. Text extraction and analysis
+    are keyed by the same hash, so they are shared too. Text formats are
+    stored compressed (compression.py); ``size`` is the original size.
+    """
+
+    content_hash = models.CharField(max_length=64, primary_key=True)
+    file = models.FileField(upload_to=blob_path)
+    size = models.PositiveBigIntegerField(default=0)  # bytes
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "library_blobs"
+
+    def __str__(self):
+        return f"{self.content_hash} ({self.refcount} refs)"
+
+    @classmethod
+    def acquire(cls, content_hash: str, f, encoding: str = "") -> "Blob":
+        """
+        Adds a reference to the blob for ``f``'s contents, storing them
+        (compressed with ``encoding``, if any) when they are new.
+        """
+        with transaction.atomic():
+            blob, created = cls.objects.select_for_update().get_or_create(
+                content_hash=content_hash, defaults={"size": f.size},
+            )
+            storage = blob.file.storage
+            name = blob.file.name
+            if created or not name or not storage.exists(name):
+                name = blob_path(blob, None) + compression.SUFFIXES.get(encoding, "")
+                if storage.exists(name):
+                    storage.delete(name)   # left behind by an upload that failed half-way
+                f.seek(0)
+                if encoding:
+                    with compression.compressed(f, encoding) as tmp:
+                        name = storage.save(name, tmp)
+                else:
+                    name = storage.save(name, f)
+            if blob.file.name != name:
+                blob.file.name = name
+                cls.objects.filter(pk=content_hash).update(file=name)
+            cls.objects.filter(pk=content_hash).update(refcount=F("refcount") + 1)
+        return blob
+
+    @classmethod
+    def release(cls, content_hash: str):
+        """Drops a reference; the last one deletes the blob and its file."""
+        with transaction.atomic():
+            blob = cls.objects.select_for_update().filter(pk=content_hash).first()
+            if blob is None:
+                return
+            if blob.refcount > 1:
+                cls.objects.filter(pk=content_hash).update(refcount=F("refcount") - 1)
+                return
+            blob.delete()
+            # Still under the row lock, so a concurrent acquire writes a fresh copy.
+            blob.file.storage.delete(blob.file.name)
+
+
 class UserFile(models.Model):
     """
     Represents a file uploaded by a user.
-    The actual file is stored on disk under MEDIA_ROOT.
+    The bytes are stored once per distinct contents, as a Blob under
+    MEDIA_ROOT/blobs/; ``file`` points at the blob's file.
     """
 
     FILE_TYPE_CHOICES = [
@@ -31,26 +117,96 @@ class UserFile(models.Model):
     file = models.FileField(upload_to=user_file_path)
     file_type = models.CharField(max_length=10, choices=FILE_TYPE_CHOICES)
     size = models.PositiveBigIntegerField(default=0)  # bytes
+    # SHA-256 of the contents; cached analysis is keyed by it (see ai_features.analysis)
+    content_hash = models.CharField(max_length=64, blank=True, default="", db_index=True)
+    # Null for files uploaded before blobs (see `manage.py dedupe_uploads`)
+    blob = models.ForeignKey(Blob, null=True, blank=True, on_delete=models.PROTECT, related_name="files")
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         db_table = "library_user_files"
         ordering = ["-uploaded_at"]
+        indexes = [
+            # Keyset pagination of a user's library (library/pagination.py)
+            models.Index(fields=["user", "-uploaded_at", "-id"], name="library_files_user_recent"),
+        ]
 
     def __str__(self):
         return f"{self.user.email} — {self.title}"
 
-    def delete(self, *args, **kwargs):
-        """Delete the physical file from disk when the DB record is removed."""
-        if self.file and os.path.isfile(self.file.path):
-            os.remove(self.file.path)
-        super().delete(*args, **kwargs)
+    def save(self, *args, **kwargs):
+        # A newly assigned upload goes to the blob for its contents — usually
+        # hashed already while it was received (uploads.py).
+        if self.file and not self.file._committed:
+            upload = self.file.file
+            self.content_hash = getattr(upload, "content_hash", None) or hash_file(self.file)
+            with transaction.atomic():
+                self.blob = Blob.acquire(self.content_hash, upload, compression.storage_encoding(self.file_type))
+                self.file.name = self.blob.file.name
+                self.file._committed = True
+                # Reads go to the stored blob (maybe compressed), not the upload.
+                self.file.file = None
+                super().save(*args, **kwargs)
+            return
+        super().save(*args, **kwargs)
+
+    @property
+    def download_name(self) -> str:
+        """Filename shown to the user (blob files are named by their hash)."""
+        if self.blob_id is None:
+            return os.path.basename(self.file.name)
+        return f"{self.title}.{self.file_type.lower()}"
+
+    def ensure_content_hash(self) -> str:
+        """Hashes files stored before content_hash existed (streamed, once)."""
+        if not self.content_hash:
+            with self.file.open("rb") as f:
+                self.content_hash = hash_file(f)
+            UserFile.objects.filter(pk=self.pk).update(content_hash=self.content_hash)
+        return self.content_hash
+
+    # The file on disk is released by a post_delete receiver (signals.py),
+    # so queryset and cascade deletes free it as well.
+
+
+class UploadSession(models.Model):
+    """
+    A resumable upload in progress (library/uploads.py): chunks are appended
+    to ``part_path`` until ``offset`` reaches ``size``, then the session is
+    completed into a UserFile and deleted.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="upload_sessions",
+    )
+    filename = models.CharField(max_length=255)
+    title = models.CharField(max_length=255)
+    file_type = models.CharField(max_length=10, choices=UserFile.FILE_TYPE_CHOICES)
+    size = models.PositiveBigIntegerField()             # bytes, declared up front
+    offset = models.PositiveBigIntegerField(default=0)  # bytes received so far
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "library_upload_sessions"
+
+    def __str__(self):
+        return f"{self.user.email} — {self.filename} ({self.offset}/{self.size})"
+
+    @property
+    def part_path(self) -> str:
+        directory = getattr(settings, "LIBRARY_UPLOAD_DIR", settings.BASE_DIR / "data" / "uploads")
+        return os.path.join(str(directory), f"{self.id}.part")
 
 
 class UserReadingData(models.Model):
     """
     Tracks all reading state for one user + one file:
-    progress, PDF page, highlights, notes, bookmark flag.
+    progress, PDF page, bookmark flag. Highlights and notes are rows of their
+    own (Highlight, Note) so one can change without rewriting the rest.
     """
 
     user = models.ForeignKey(
@@ -66,8 +222,6 @@ class UserReadingData(models.Model):
     progress = models.FloatField(default=0.0)     # 0–100 percent
     pdf_page = models.PositiveIntegerField(default=1)
     bookmarked = models.BooleanField(default=False)
-    highlights = models.JSONField(default=list)   # [{id, cls, text, ts}]
-    notes = models.JSONField(default=list)        # [{text, quote, ts}]
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
@@ -76,3 +230,74 @@ class UserReadingData(models.Model):
 
     def __str__(self):
         return f"{self.user.email} — {self.file.title} ({self.progress:.0f}%)"
+
+    @classmethod
+    def touch(cls, user, file):
+        """Marks the reading data as changed (a highlight or note was), creating it if needed."""
+        if not cls.objects.filter(user=user, file=file).update(updated_at=timezone.now()):
+            cls.objects.get_or_create(user=user, file=file)
+
+
+class Highlight(models.Model):
+    """One highlight in a user's file (formerly an item of UserReadingData.highlights)."""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="highlights",
+    )
+    file = models.ForeignKey(
+        UserFile,
+        on_delete=models.CASCADE,
+        related_name="highlights",
+    )
+    client_id = models.CharField(max_length=64, blank=True, default="")  # the reader's data-hl-id
+    cls = models.CharField(max_length=32, blank=True, default="")        # highlight colour class
+    text = models.TextField(blank=True, default="")
+    ts = models.BigIntegerField(null=True, blank=True)                   # client time, ms since epoch
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "library_highlights"
+        ordering = ["id"]
+        indexes = [models.Index(fields=["user", "file"], name="library_highlights_user_file")]
+
+    def __str__(self):
+        return f"{self.user.email} — {self.file.title}: {self.text[:40]}"
+
+    def as_item(self) -> dict:
+        """The shape of the old JSON array items: {id, cls, text, ts}."""
+        return {"id": self.client_id, "cls": self.cls, "text": self.text, "ts": self.ts}
+
+
+class Note(models.Model):
+    """One note in a user's file (formerly an item of UserReadingData.notes)."""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="notes",
+    )
+    file = models.ForeignKey(
+        UserFile,
+        on_delete=models.CASCADE,
+        related_name="notes",
+    )
+    text = models.TextField()
+    quote = models.TextField(blank=True, default="")   # the highlighted passage it is about
+    ts = models.BigIntegerField(null=True, blank=True)  # client time, ms since epoch
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "library_notes"
+        ordering = ["id"]
+        indexes = [models.Index(fields=["user", "file"], name="library_notes_user_file")]
+
+    def __str__(self):
+        return f"{self.user.email} — {self.file.title}: {self.text[:40]}"
+
+    def as_item(self) -> dict:
+        """The shape of the old JSON array items: {text, quote, ts}."""
+        return {"text": self.text, "quote": self.quote, "ts": self.ts}
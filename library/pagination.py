@@ -0,0 +1,54 @@
+"""
+Keyset (cursor) pagination for the file library.
+
+Files are listed newest first, ordered by (uploaded_at, id) descending — the
+composite index ``library_files_user_recent`` serves it directly. A cursor is
+the (uploaded_at, id) of the last file on the previous page, so every page is
+a single index range scan, however deep, and uploads or deletions between
+requests never shift items across pages.
+"""
+
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+def encode_cursor(user_file) -> str:
+    raw = f"{user_file.uploaded_at.isoformat()}|{user_file.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        uploaded_at, pk = raw.split("|")
+        return datetime.fromisoformat(uploaded_at), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        raise ValidationError({"cursor": "Invalid cursor."})
+
+
+def parse_limit(value) -> int:
+    if value in (None, ""):
+        return DEFAULT_LIMIT
+    try:
+        return max(1, min(int(value), MAX_LIMIT))
+    except ValueError:
+        raise ValidationError({"limit": "Must be an integer."})
+
+
+def paginate(queryset, cursor: str = None, limit: int = DEFAULT_LIMIT) -> tuple:
+    """Returns (page of files, cursor for the next page or None)."""
+    queryset = queryset.order_by("-uploaded_at", "-id")
+    if cursor:
+        uploaded_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(uploaded_at__lt=uploaded_at) | Q(uploaded_at=uploaded_at, id__lt=pk))
+    page = list(queryset[:limit + 1])   # one extra row tells whether there is a next page
+    if len(page) > limit:
+        page = page[:limit]
+        return page, encode_cursor(page[-1])
+    return page, None
@@ -0,0 +1,183 @@
+"""
+Write-behind buffer for reading progress.
+
+``progress`` and ``pdf_page`` change on every scroll. POST
+/api/library/progress/sync/ takes updates for many files in one request and
+only writes them to a cache — settings.LIBRARY_PROGRESS_CACHE, which is Redis
+when REDIS_URL is set and a database cache table otherwise, shared by every
+worker either way. ``flush`` then moves them to UserReadingData in one bulk
+update. Syncs and reads trigger it at most every LIBRARY_PROGRESS_FLUSH_INTERVAL
+seconds, so buffered updates reach the database once the user is back even if
+they never sync again, and `manage.py flush_progress` runs it on demand.
+
+Last writer wins: an update replaces whatever is buffered for the file,
+unless it carries a client timestamp ``ts`` older than the buffered one.
+Reads (GET .../data/, the library listing) overlay the user's buffered
+values, so users always see their latest position.
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+from .models import UserFile, UserReadingData
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "library:progress:"
+DIRTY = PREFIX + "dirty"   # ids of users with buffered updates
+LOCK_WAIT = 0.5            # seconds to wait for a lock before going best-effort
+FIELDS = ("progress", "pdf_page")
+
+
+def _cache():
+    return caches[getattr(settings, "LIBRARY_PROGRESS_CACHE", "default")]
+
+
+def _user_key(user_id) -> str:
+    return f"{PREFIX}user:{user_id}"
+
+
+@contextmanager
+def _locked(key: str):
+    cache, lock = _cache(), key + ":lock"
+    deadline = time.monotonic() + LOCK_WAIT
+    acquired = cache.add(lock, 1, 5)
+    while not acquired and time.monotonic() < deadline:
+        time.sleep(0.002)
+        acquired = cache.add(lock, 1, 5)
+    try:
+        yield
+    finally:
+        if acquired:
+            cache.delete(lock)
+
+
+def buffered(user_id) -> dict:
+    """{file_id: {"progress"?, "pdf_page"?, "ts"?}} not yet written to the database."""
+    return _cache().get(_user_key(user_id)) or {}
+
+
+def overlay(data: dict, entry: dict) -> dict:
+    """Serialized reading data with a buffered entry's values on top."""
+    if entry:
+        data.update({field: entry[field] for field in FIELDS if field in entry})
+    return data
+
+
+def record(user_id, updates: list):
+    """
+    Buffers ``updates`` ({"file_id", "progress"?, "pdf_page"?, "ts"?}, in
+    order) for one user.
+    """
+    cache, key = _cache(), _user_key(user_id)
+    with _locked(key):
+        entries = cache.get(key) or {}
+        for update in updates:
+            entry = entries.get(update["file_id"], {})
+            if update.get("ts") is not None and entry.get("ts") is not None and update["ts"] < entry["ts"]:
+                continue   # an older write arriving late
+            entries[update["file_id"]] = {
+                **entry, **{k: v for k, v in update.items() if k != "file_id" and v is not None},
+            }
+        cache.set(key, entries, None)
+    _mark_dirty({user_id})
+
+
+def _mark_dirty(user_ids):
+    cache = _cache()
+    with _locked(DIRTY):
+        dirty = cache.get(DIRTY) or set()
+        if not set(user_ids) <= dirty:
+            cache.set(DIRTY, dirty | set(user_ids), None)
+
+
+def discard(user_id, file_id, fields=FIELDS):
+    """
+    Drops ``fields`` from a file's buffered update (they were just written
+    directly); any other buffered field is still flushed.
+    """
+    cache, key = _cache(), _user_key(user_id)
+    with _locked(key):
+        entries = cache.get(key) or {}
+        entry = entries.get(file_id)
+        if entry is None or not any(field in entry for field in fields):
+            return
+        entry = {k: v for k, v in entry.items() if k not in fields}
+        if any(field in entry for field in FIELDS):
+            entries[file_id] = entry
+        else:
+            del entries[file_id]
+        cache.set(key, entries, None)
+
+
+def maybe_flush():
+    """Flushes unless another flush ran within the interval; a failed flush is only logged."""
+    interval = getattr(settings, "LIBRARY_PROGRESS_FLUSH_INTERVAL", 10)
+    if _cache().add(PREFIX + "flushed", 1, interval):
+        try:
+            flush()
+        except Exception:
+            logger.exception("Flushing buffered reading progress failed; it is retried on the next flush")
+
+
+def flush() -> int:
+    """Writes every buffered update to UserReadingData; returns how many."""
+    cache = _cache()
+    with _locked(DIRTY):
+        users = cache.get(DIRTY) or set()
+        cache.delete(DIRTY)
+    pending = {user_id: buffered(user_id) for user_id in users}
+    pending = {user_id: entries for user_id, entries in pending.items() if entries}
+    if not pending:
+        return 0
+
+    pairs = {(user_id, file_id) for user_id, entries in pending.items() for file_id in entries}
+    user_ids = list(pending)
+    file_ids = {file_id for _, file_id in pairs}
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            rows = {
+                (rd.user_id, rd.file_id): rd
+                for rd in UserReadingData.objects.filter(user_id__in=user_ids, file_id__in=file_ids)
+                if (rd.user_id, rd.file_id) in pairs
+            }
+            # Files deleted since the update was buffered are skipped.
+            owned = set(UserFile.objects.filter(user_id__in=user_ids, id__in=file_ids).values_list("user_id", "id"))
+            created = [
+                UserReadingData(user_id=user_id, file_id=file_id)
+                for user_id, file_id in pairs & owned if (user_id, file_id) not in rows
+            ]
+            for rd in list(rows.values()) + created:
+                entry = pending[rd.user_id][rd.file_id]
+                for field in FIELDS:
+                    if field in entry:
+                        setattr(rd, field, entry[field])
+                rd.updated_at = now
+            UserReadingData.objects.bulk_update(list(rows.values()), [*FIELDS, "updated_at"])
+            UserReadingData.objects.bulk_create(created, ignore_conflicts=True)
+    except Exception:
+        # Nothing was written; the entries are still buffered, so the next flush retries them.
+        _mark_dirty(pending)
+        raise
+
+    # Drop what was written, keeping anything buffered meanwhile.
+    for user_id, entries in pending.items():
+        key = _user_key(user_id)
+        with _locked(key):
+            current = cache.get(key) or {}
+            for file_id, entry in entries.items():
+                if current.get(file_id) == entry:
+                    del current[file_id]
+            if current:
+                cache.set(key, current, None)
+                _mark_dirty({user_id})
+            else:
+                cache.delete(key)
+    return len(rows) + len(created)
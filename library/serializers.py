@@ -1,9 +1,57 @@
 import os
+from django.conf import settings
+from django.db import transaction
 from rest_framework import serializers
-from .models import UserFile, UserReadingData
+from . import progress
+from .models import Highlight, Note, UploadSession, UserFile, UserReadingData
+
+ALLOWED_EXTENSIONS = {"pdf", "txt", "md", "html", "rtf"}
+
+
+def check_extension(name: str) -> str:
+    """The upper-case file type of ``name``; ValidationError if not allowed."""
+    ext = os.path.splitext(name)[1].lstrip(".").lower()
+    if ext not in ALLOWED_EXTENSIONS:
+        raise serializers.ValidationError(
+            f"Unsupported file type: .{ext}. Allowed: {', '.join(ALLOWED_EXTENSIONS)}"
+        )
+    return ext.upper()
+
+
+def title_from_filename(name: str) -> str:
+    return (
+        os.path.splitext(name)[0]
+        .replace("-", " ")
+        .replace("_", " ")
+        .title()
+    )
+
+
+class HighlightSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Highlight
+        fields = ["id", "client_id", "cls", "text", "ts", "created_at", "updated_at"]
+        read_only_fields = ["id", "created_at", "updated_at"]
+
+
+class NoteSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Note
+        fields = ["id", "text", "quote", "ts", "created_at", "updated_at"]
+        read_only_fields = ["id", "created_at", "updated_at"]
 
 
 class UserReadingDataSerializer(serializers.ModelSerializer):
+    """
+    ``highlights`` and ``notes`` are the file's Highlight / Note rows in the
+    shape of the JSON arrays they replaced. A PATCH with either replaces the
+    whole list; the per-item endpoints change one at a time. Pass prefetched
+    rows as context["highlights"] / context["notes"] to skip their queries.
+    """
+
+    highlights = serializers.ListField(child=serializers.DictField(), required=False, write_only=True)
+    notes = serializers.ListField(child=serializers.DictField(), required=False, write_only=True)
+
     class Meta:
         model = UserReadingData
         fields = [
@@ -12,6 +60,62 @@ class UserReadingDataSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["id", "updated_at"]
 
+    def validate_highlights(self, value):
+        items = HighlightSerializer(data=[{**item, "client_id": item.get("id", "")} for item in value], many=True)
+        items.is_valid(raise_exception=True)
+        return items.validated_data
+
+    def validate_notes(self, value):
+        items = NoteSerializer(data=value, many=True)
+        items.is_valid(raise_exception=True)
+        return items.validated_data
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        rows = {"user_id": instance.user_id, "file_id": instance.file_id}
+        highlights = self.context.get("highlights")
+        notes = self.context.get("notes")
+        data["highlights"] = [h.as_item() for h in (highlights if highlights is not None
+                                                    else Highlight.objects.filter(**rows))]
+        data["notes"] = [n.as_item() for n in (notes if notes is not None else Note.objects.filter(**rows))]
+        return data
+
+    def update(self, instance, validated_data):
+        lists = {Highlight: validated_data.pop("highlights", None), Note: validated_data.pop("notes", None)}
+        with transaction.atomic():
+            instance = super().update(instance, validated_data)
+            for model, items in lists.items():
+                if items is not None:
+                    model.objects.filter(user_id=instance.user_id, file_id=instance.file_id).delete()
+                    model.objects.bulk_create(
+                        model(user_id=instance.user_id, file_id=instance.file_id, **item) for item in items
+                    )
+        return instance
+
+
+class ProgressUpdateSerializer(serializers.Serializer):
+    """One file's position in a progress sync (library/progress.py)."""
+
+    file_id = serializers.IntegerField()
+    progress = serializers.FloatField(required=False, min_value=0, max_value=100)
+    pdf_page = serializers.IntegerField(required=False, min_value=0)
+    ts = serializers.IntegerField(required=False, allow_null=True)   # client time, ms since epoch
+
+    def validate(self, attrs):
+        if "progress" not in attrs and "pdf_page" not in attrs:
+            raise serializers.ValidationError("Send progress, pdf_page or both.")
+        return attrs
+
+
+class ProgressSyncSerializer(serializers.Serializer):
+    updates = ProgressUpdateSerializer(many=True, allow_empty=False)
+
+    def validate_updates(self, value):
+        limit = getattr(settings, "LIBRARY_PROGRESS_SYNC_MAX", 500)
+        if len(value) > limit:
+            raise serializers.ValidationError(f"At most {limit} updates per request.")
+        return value
+
 
 class UserFileSerializer(serializers.ModelSerializer):
     """
@@ -31,12 +135,27 @@ class UserFileSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "uploaded_at", "file_url", "reading_data"]
 
     def get_reading_data(self, obj):
+        # Progress not yet flushed from the write-behind buffer (progress.py);
+        # the listing passes the user's whole buffer as context["progress"].
+        entries = self.context.get("progress")
+        if entries is None:
+            request = self.context.get("request")
+            entries = progress.buffered(request.user.id) if request else {}
+
+        # Listing prefetches the user's reading data, highlights and notes (UserFileListCreateView).
+        if hasattr(obj, "user_reading_data"):
+            rd = obj.user_reading_data[0] if obj.user_reading_data else None
+            context = {"highlights": obj.user_highlights, "notes": obj.user_notes}
+            if rd is None:
+                return None
+            return progress.overlay(UserReadingDataSerializer(rd, context=context).data, entries.get(obj.id))
+
         request = self.context.get("request")
         if not request:
             return None
         try:
             rd = UserReadingData.objects.get(user=request.user, file=obj)
-            return UserReadingDataSerializer(rd).data
+            return progress.overlay(UserReadingDataSerializer(rd).data, entries.get(obj.id))
         except UserReadingData.DoesNotExist:
             return None
 
@@ -56,30 +175,18 @@ class UserFileUploadSerializer(serializers.ModelSerializer):
     file = serializers.FileField()
     title = serializers.CharField(required=False, max_length=255)
 
-    ALLOWED_EXTENSIONS = {"pdf", "txt", "md", "html", "rtf"}
-
     class Meta:
         model = UserFile
         fields = ["title", "file"]
 
     def validate_file(self, value):
-        ext = os.path.splitext(value.name)[1].lstrip(".").lower()
-        if ext not in self.ALLOWED_EXTENSIONS:
-            raise serializers.ValidationError(
-                f"Unsupported file type: .{ext}. Allowed: {', '.join(self.ALLOWED_EXTENSIONS)}"
-            )
+        check_extension(value.name)
         return value
 
     def validate(self, attrs):
         # Auto-derive title from filename if not provided
         if not attrs.get("title"):
-            name = attrs["file"].name
-            attrs["title"] = (
-                os.path.splitext(name)[0]
-                .replace("-", " ")
-                .replace("_", " ")
-                .title()
-            )
+            attrs["title"] = title_from_filename(attrs["file"].name)
         return attrs
 
     def create(self, validated_data):
@@ -92,3 +199,43 @@ class UserFileUploadSerializer(serializers.ModelSerializer):
             file_type=ext if ext else "TXT",
             size=file.size,
         )
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """
+    Starts / reports a resumable upload (library/uploads.py).
+    Same file types and title rule as UserFileUploadSerializer.
+    """
+
+    title = serializers.CharField(required=False, max_length=255)
+    chunk_size = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = ["id", "filename", "title", "size", "offset", "chunk_size", "created_at"]
+        read_only_fields = ["id", "offset", "chunk_size", "created_at"]
+
+    def get_chunk_size(self, obj):
+        return getattr(settings, "LIBRARY_UPLOAD_CHUNK_BYTES", 8 * 1024 * 1024)
+
+    def validate_filename(self, value):
+        check_extension(value)
+        return os.path.basename(value)
+
+    def validate_size(self, value):
+        limit = getattr(settings, "LIBRARY_UPLOAD_MAX_BYTES", 1024 ** 3)
+        if value > limit:
+            raise serializers.ValidationError(f"Files are limited to {limit} bytes.")
+        return value
+
+    def validate(self, attrs):
+        if not attrs.get("title"):
+            attrs["title"] = title_from_filename(attrs["filename"])
+        return attrs
+
+    def create(self, validated_data):
+        return UploadSession.objects.create(
+            user=self.context["request"].user,
+            file_type=check_extension(validated_data["filename"]),
+            **validated_data,
+        )
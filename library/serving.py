@@ -0,0 +1,195 @@
+"""
+Byte serving for library files (UserFileServeView).
+
+* Validators: the ETag is the file's content hash and Last-Modified its mtime.
+  If-None-Match / If-Modified-Since get a 304 and If-Match /
+  If-Unmodified-Since a 412 before the file is even opened.
+* Range requests: one range gives a 206 with Content-Range, several give a
+  multipart/byteranges body. If-Range falls back to the whole file once the
+  validator no longer matches. pdf.js uses this to fetch only what it renders.
+* Compressed text blobs (compression.py) are sent as stored, with
+  Content-Encoding, when Accept-Encoding allows; otherwise they are
+  decompressed as they stream. Each representation has its own ETag, and
+  ranges apply to the bytes actually sent.
+* settings.LIBRARY_SENDFILE = "x-accel-redirect" (nginx) or "x-sendfile"
+  (Apache mod_xsendfile, lighttpd) leaves the transfer — ranges included — to
+  the front proxy once Django has checked ownership and preconditions.
+"""
+
+import mimetypes
+import os
+import secrets
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+from . import compression
+
+MAX_RANGES = 16          # more than this and the whole file is cheaper to send
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_range(header: str, size: int):
+    """
+    Byte ranges of a Range header as sorted, merged [(first, last)] pairs
+    (inclusive). None when the header is absent, malformed or has too many
+    ranges — the whole file is sent; [] when no range is satisfiable (416).
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    parts = spec.split(",")
+    if unit.strip().lower() != "bytes" or len(parts) > MAX_RANGES:
+        return None
+
+    ranges = []
+    for part in parts:
+        first, dash, last = part.strip().partition("-")
+        if not dash or not (first.isdigit() or first == "") or not (last.isdigit() or last == ""):
+            return None
+        if first:
+            start, end = int(first), int(last) if last else size - 1
+            if last and end < start:
+                return None
+        elif last:
+            start, end = max(size - int(last), 0), size - 1
+            if int(last) == 0:
+                continue
+        else:
+            return None
+        if start < size:
+            ranges.append((start, min(end, size - 1)))
+
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def if_range_passes(request, etag: str, last_modified: int) -> bool:
+    """False when If-Range names an older version; the Range is then ignored."""
+    value = request.headers.get("If-Range")
+    if not value:
+        return True
+    if value.startswith('"'):
+        return value == etag        # strong comparison; weak tags never match
+    if value.startswith("W/"):
+        return False
+    return parse_http_date_safe(value) == last_modified
+
+
+def _read(opener, start: int, end: int):
+    with opener() as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _multipart(opener, ranges: list, size: int, content_type: str):
+    """(body iterator, content length, content type) of a multipart/byteranges response."""
+    boundary = secrets.token_hex(16)
+    heads = [
+        f"\r\n--{boundary}\r\nContent-Type: {content_type}\r\n"
+        f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n".encode()
+        for start, end in ranges
+    ]
+    tail = f"\r\n--{boundary}--\r\n".encode()
+    length = sum(map(len, heads)) + sum(end - start + 1 for start, end in ranges) + len(tail)
+
+    def body():
+        for head, (start, end) in zip(heads, ranges):
+            yield head
+            yield from _read(opener, start, end)
+        yield tail
+
+    return body(), length, f"multipart/byteranges; boundary={boundary}"
+
+
+def _offload(path: str, content_type: str, mode: str) -> HttpResponse:
+    response = HttpResponse(content_type=content_type)
+    if mode == "x-accel-redirect":
+        relative = os.path.relpath(path, settings.MEDIA_ROOT).replace(os.sep, "/")
+        prefix = getattr(settings, "LIBRARY_SENDFILE_PREFIX", "/protected-media/")
+        response["X-Accel-Redirect"] = quote(prefix.rstrip("/") + "/" + relative)
+    else:
+        response["X-Sendfile"] = path
+    return response
+
+
+def serve(request, user_file):
+    """The response for GET/HEAD of ``user_file``'s bytes (which must exist locally)."""
+    path = user_file.file.path
+    stat = os.stat(path)
+    last_modified = int(stat.st_mtime)
+    tag = user_file.content_hash or f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+    content_type = mimetypes.guess_type(user_file.download_name)[0] or "application/octet-stream"
+
+    encoding = compression.encoding_of(path)
+    send_encoded = bool(encoding) and compression.accepts(request.headers.get("Accept-Encoding", ""), encoding)
+    decoding = bool(encoding) and not send_encoded   # decompressed as it is sent
+    if decoding:
+        size, opener = user_file.size, lambda: compression.open_path(path)
+    else:
+        size, opener = stat.st_size, lambda: open(path, "rb")
+    # Each representation has its own strong validator.
+    etag = f'"{tag}-{encoding}"' if send_encoded else f'"{tag}"'
+
+    max_age = getattr(settings, "LIBRARY_SERVE_MAX_AGE", 0)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(last_modified),
+        "Cache-Control": f"private, max-age={max_age}, must-revalidate" if max_age else "private, no-cache",
+    }
+    if encoding:
+        headers["Vary"] = "Accept-Encoding"
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    mode = getattr(settings, "LIBRARY_SENDFILE", "")
+    if mode and not decoding:
+        response = _offload(path, content_type, mode)
+    else:
+        ranges = None
+        if if_range_passes(request, etag, last_modified):
+            ranges = parse_range(request.headers.get("Range"), size)
+
+        if ranges == []:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+        elif ranges is None and not decoding:
+            response = FileResponse(open(path, "rb"), content_type=content_type)
+        elif ranges is None:
+            response = StreamingHttpResponse(_read(opener, 0, size - 1), content_type=content_type)
+            response["Content-Length"] = size
+        elif len(ranges) == 1:
+            start, end = ranges[0]
+            response = StreamingHttpResponse(_read(opener, start, end), status=206, content_type=content_type)
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+            response["Content-Length"] = end - start + 1
+        else:
+            body, length, multipart_type = _multipart(opener, ranges, size, content_type)
+            response = StreamingHttpResponse(body, status=206, content_type=multipart_type)
+            response["Content-Length"] = length
+
+    for name, value in headers.items():
+        response[name] = value
+    if send_encoded:
+        response["Content-Encoding"] = encoding
+    response["Accept-Ranges"] = "bytes"
+    response["Content-Disposition"] = f'inline; filename="{user_file.download_name}"'
+    return response
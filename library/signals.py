@@ -0,0 +1,23 @@
+import os
+
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import Blob, UploadSession, UserFile
+
+
+@receiver(post_delete, sender=UserFile)
+def release_file(sender, instance, **kwargs):
+    """Unlinks the bytes once no UserFile references them any more."""
+    if instance.blob_id:
+        Blob.release(instance.blob_id)
+    elif instance.file and os.path.isfile(instance.file.path):
+        os.remove(instance.file.path)   # uploaded before blobs: one file per row
+
+
+@receiver(post_delete, sender=UploadSession)
+def remove_part_file(sender, instance, **kwargs):
+    try:
+        os.remove(instance.part_path)
+    except FileNotFoundError:
+        pass   # completed: moved into its blob
@@ -0,0 +1,44 @@
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from library.models import UserFile
+
+
+def make_user():
+    make_user.count = getattr(make_user, "count", 0) + 1
+    return get_user_model().objects.create_user(email=f"reader{make_user.count}@example.com", password="pw-123456")
+
+
+class MediaMixin:
+    """Stores uploads (and their extracted text) under a temporary MEDIA_ROOT and queues no AI jobs for them."""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        overrides = override_settings(
+            MEDIA_ROOT=self.media, LIBRARY_UPLOAD_DIR=os.path.join(self.media, "parts"),
+            LIBRARY_SENDFILE="", AI_PRECOMPUTE_ON_UPLOAD=False,
+            AI_TEXT_STORE_DIR=os.path.join(self.media, "text"),
+            AI_ANNOTATION_DIR=os.path.join(self.media, "annotations"),
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.user = make_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, data: bytes, name="book.pdf", file_type="PDF", user=None):
+        return UserFile.objects.create(
+            user=user or self.user, title=name, file=ContentFile(data, name=name),
+            file_type=file_type, size=len(data),
+        )
+
+
+class MediaTestCase(MediaMixin, TestCase):
+    pass
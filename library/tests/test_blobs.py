@@ -0,0 +1,53 @@
+import hashlib
+import os
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from library.models import Blob, UserFile
+from library.tests import MediaTestCase, make_user
+
+
+class BlobRefcountTests(MediaTestCase):
+    def test_identical_uploads_share_one_blob(self):
+        other = make_user()
+        first = self.upload(b"%PDF same bytes")
+        second = self.upload(b"%PDF same bytes", user=other)
+        blob = Blob.objects.get()
+        self.assertEqual(blob.refcount, 2)
+        self.assertEqual(first.blob_id, second.blob_id)
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertEqual(blob.content_hash, hashlib.sha256(b"%PDF same bytes").hexdigest())
+
+    def test_last_delete_removes_the_blob_and_its_file(self):
+        first = self.upload(b"%PDF same bytes")
+        second = self.upload(b"%PDF same bytes", user=make_user())
+        path = first.file.path
+
+        first.delete()
+        self.assertEqual(Blob.objects.get().refcount, 1)
+        self.assertTrue(os.path.isfile(path))
+
+        second.delete()
+        self.assertFalse(Blob.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+    def test_queryset_delete_releases_every_reference(self):
+        self.upload(b"%PDF one")
+        self.upload(b"%PDF one")
+        self.upload(b"%PDF two")
+        UserFile.objects.filter(user=self.user).delete()
+        self.assertFalse(Blob.objects.exists())
+
+    def test_blobs_are_sharded_by_hash(self):
+        user_file = self.upload(b"%PDF sharded")
+        digest = hashlib.sha256(b"%PDF sharded").hexdigest()
+        self.assertIn(f"{digest[:2]}/{digest[2:4]}/{digest}", user_file.file.name)
+
+    def test_multipart_uploads_of_the_same_file_share_its_blob(self):
+        for _ in range(2):
+            response = self.client.post(
+                "/api/library/files/", {"file": SimpleUploadedFile("handout.pdf", b"%PDF handout")}, format="multipart",
+            )
+            self.assertEqual(response.status_code, 201)
+        self.assertEqual(UserFile.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(Blob.objects.get().refcount, 2)
@@ -0,0 +1,63 @@
+import gzip
+import os
+
+from django.test import SimpleTestCase
+
+from ai_features.document import iter_file_text
+from library import compression
+from library.models import Blob
+from library.tests import MediaTestCase
+
+TEXT = b"Plain text, stored compressed. " * 200
+
+
+class AcceptsTests(SimpleTestCase):
+    def test_accept_encoding(self):
+        self.assertTrue(compression.accepts("gzip, deflate, br", "gzip"))
+        self.assertTrue(compression.accepts("x-gzip", "gzip"))
+        self.assertTrue(compression.accepts("*", "zstd"))
+        self.assertFalse(compression.accepts("", "gzip"))
+        self.assertFalse(compression.accepts("gzip;q=0, br", "gzip"))
+        self.assertFalse(compression.accepts("*, gzip;q=0", "gzip"))
+        self.assertFalse(compression.accepts("gzip;q=abc", "gzip"))
+
+
+class CompressedStorageTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user_file = self.upload(TEXT, name="notes.txt", file_type="TXT")
+        self.url = f"/api/library/files/{self.user_file.pk}/serve/"
+
+    def test_text_is_stored_compressed_and_read_back(self):
+        path = self.user_file.file.path
+        self.assertTrue(path.endswith(".gz"))
+        self.assertLess(os.path.getsize(path), self.user_file.size)
+        self.assertEqual(Blob.objects.get().size, self.user_file.size)
+        with compression.open_stored(self.user_file.file) as f:
+            self.assertEqual(f.read(), TEXT)
+        self.assertEqual("".join(iter_file_text(self.user_file)), TEXT.decode())
+
+    def test_pdfs_are_stored_raw(self):
+        self.assertFalse(self.upload(b"%PDF-1.4 raw").file.name.endswith(".gz"))
+
+    def test_served_as_stored_when_accepted(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(gzip.decompress(response.getvalue()), TEXT)
+        etag = response["ETag"]
+        self.assertTrue(etag.endswith('-gzip"'))
+        self.assertEqual(self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_decompressed_otherwise(self):
+        response = self.client.get(self.url)
+        self.assertNotIn("Content-Encoding", response)
+        self.assertEqual(response["ETag"], f'"{self.user_file.content_hash}"')
+        self.assertEqual(b"".join(response.streaming_content), TEXT)
+        self.assertEqual(int(response["Content-Length"]), len(TEXT))
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=10-19")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b"".join(response.streaming_content), TEXT[10:20])
+        self.assertEqual(response["Content-Range"], f"bytes 10-19/{len(TEXT)}")
@@ -0,0 +1,110 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+from rest_framework.test import APIClient
+
+from library.models import Highlight, Note, UserReadingData
+from library.tests import MediaTestCase, make_user
+
+
+class HighlightNoteMigrationTests(TransactionTestCase):
+    """0006 moves the highlight / note JSON arrays into rows and back."""
+
+    before = [("library", "0005_uploadsession")]
+    after = [("library", "0006_highlight_note")]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+        super().tearDown()
+
+    def test_arrays_to_rows_and_back(self):
+        apps = self.migrate(self.before)
+        user = apps.get_model("accounts", get_user_model()._meta.model_name).objects.create(
+            email="migrate@example.com", password="x",
+        )
+        user_file = apps.get_model("library", "UserFile").objects.create(
+            user=user, title="t", file="user_files/t.pdf", file_type="PDF",
+        )
+        highlights = [
+            {"id": "hl-1", "cls": "hl-yellow", "text": "first", "ts": 1700000000000},
+            {"id": "hl-2", "cls": "hl-green", "text": "second", "ts": "not a number"},
+            "not an item",
+        ]
+        notes = [{"text": "remember", "quote": "first", "ts": 1700000000001}]
+        apps.get_model("library", "UserReadingData").objects.create(
+            user=user, file=user_file, highlights=highlights, notes=notes,
+        )
+
+        apps = self.migrate(self.after)
+        rows = apps.get_model("library", "Highlight").objects.order_by("id")
+        self.assertEqual(
+            [(h.client_id, h.cls, h.text, h.ts) for h in rows],
+            [("hl-1", "hl-yellow", "first", 1700000000000), ("hl-2", "hl-green", "second", None)],
+        )
+        note = apps.get_model("library", "Note").objects.get()
+        self.assertEqual((note.text, note.quote, note.ts), ("remember", "first", 1700000000001))
+
+        apps = self.migrate(self.before)
+        rd = apps.get_model("library", "UserReadingData").objects.get()
+        self.assertEqual(rd.highlights, [
+            {"id": "hl-1", "cls": "hl-yellow", "text": "first", "ts": 1700000000000},
+            {"id": "hl-2", "cls": "hl-green", "text": "second", "ts": None},
+        ])
+        self.assertEqual(rd.notes, notes)
+
+
+class ReadingItemViewTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user_file = self.upload(b"%PDF annotated")
+        self.files_url = f"/api/library/files/{self.user_file.pk}"
+
+    def test_highlights_one_at_a_time(self):
+        url = f"{self.files_url}/highlights/"
+        response = self.client.post(url, {"client_id": "hl-1", "cls": "hl-yellow", "text": "first"}, format="json")
+        self.assertEqual(response.status_code, 201)
+        item_url = f"{url}{response.data['id']}/"
+        self.client.post(url, {"client_id": "hl-2", "text": "second"}, format="json")
+        self.assertEqual([h["client_id"] for h in self.client.get(url).data], ["hl-1", "hl-2"])
+        self.assertTrue(UserReadingData.objects.filter(user=self.user, file=self.user_file).exists())
+
+        response = self.client.patch(item_url, {"cls": "hl-green"}, format="json")
+        self.assertEqual((response.data["cls"], response.data["text"]), ("hl-green", "first"))
+
+        self.assertEqual(self.client.delete(item_url).status_code, 204)
+        self.assertEqual(list(Highlight.objects.values_list("client_id", flat=True)), ["hl-2"])
+        self.assertEqual(self.client.delete(item_url).status_code, 404)
+
+    def test_notes_one_at_a_time(self):
+        url = f"{self.files_url}/notes/"
+        self.assertEqual(self.client.post(url, {"quote": "no text"}, format="json").status_code, 400)
+        note_id = self.client.post(url, {"text": "remember", "quote": "first", "ts": 5}, format="json").data["id"]
+        response = self.client.patch(f"{url}{note_id}/", {"text": "remembered"}, format="json")
+        self.assertEqual((response.data["text"], response.data["quote"]), ("remembered", "first"))
+        self.assertEqual(self.client.delete(f"{url}{note_id}/").status_code, 204)
+        self.assertFalse(Note.objects.exists())
+
+    def test_array_shape_stays_available(self):
+        self.client.post(f"{self.files_url}/highlights/", {"client_id": "hl-1", "text": "first", "ts": 1},
+                         format="json")
+        data = self.client.get(f"{self.files_url}/data/").data
+        self.assertEqual(data["highlights"], [{"id": "hl-1", "cls": "", "text": "first", "ts": 1}])
+
+        self.client.patch(f"{self.files_url}/data/", {"notes": [{"text": "a"}, {"text": "b"}]}, format="json")
+        self.assertEqual([n["text"] for n in self.client.get(f"{self.files_url}/notes/").data], ["a", "b"])
+        self.assertEqual(Highlight.objects.count(), 1)   # only the lists sent are replaced
+
+    def test_other_users_items_are_hidden(self):
+        item_id = self.client.post(f"{self.files_url}/highlights/", {"text": "mine"}, format="json").data["id"]
+        client = APIClient()
+        client.force_authenticate(make_user())
+        self.assertEqual(client.get(f"{self.files_url}/highlights/").status_code, 404)
+        self.assertEqual(client.delete(f"{self.files_url}/highlights/{item_id}/").status_code, 404)
+        self.assertTrue(Highlight.objects.exists())
@@ -0,0 +1,66 @@
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from library import progress
+from library.models import Highlight, Note, UserReadingData
+from library.tests import MediaTestCase
+
+URL = "/api/library/files/"
+
+
+class LibraryListingTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        progress._cache().clear()
+
+    def upload_many(self, count):
+        return [self.upload(f"%PDF {i}".encode(), name=f"book{i}.pdf") for i in range(count)]
+
+    def test_plain_list_without_parameters(self):
+        files = self.upload_many(3)
+        response = self.client.get(URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([f["id"] for f in response.data], [f.pk for f in reversed(files)])
+
+    def test_cursor_pages_cover_every_file_once(self):
+        files = self.upload_many(5)
+        seen, url = [], f"{URL}?limit=2"
+        while url:
+            body = self.client.get(url).data
+            seen += [f["id"] for f in body["results"]]
+            url = body["next"]
+        self.assertEqual(seen, [f.pk for f in reversed(files)])
+
+    def test_bad_cursor_or_limit(self):
+        self.assertEqual(self.client.get(f"{URL}?cursor=!!!").status_code, 400)
+        self.assertEqual(self.client.get(f"{URL}?limit=many").status_code, 400)
+
+    @override_settings(LIBRARY_PROGRESS_FLUSH_INTERVAL=3600)
+    def test_query_count_does_not_grow_with_the_library(self):
+        progress.maybe_flush()   # start the interval, so neither request below flushes
+        [first] = self.upload_many(1)
+        UserReadingData.objects.create(user=self.user, file=first, progress=10.0)
+        Highlight.objects.create(user=self.user, file=first, client_id="hl-1", text="a")
+        with CaptureQueriesContext(connection) as one:
+            self.client.get(URL)
+
+        for user_file in self.upload_many(4):
+            UserReadingData.objects.create(user=self.user, file=user_file, progress=20.0)
+            Note.objects.create(user=self.user, file=user_file, text="n")
+        with self.assertNumQueries(len(one)):
+            self.assertEqual(len(self.client.get(URL).data), 5)
+
+    def test_revalidation(self):
+        [user_file] = self.upload_many(1)
+        etag = self.client.get(URL)["ETag"]
+        self.assertEqual(self.client.get(URL, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertNotEqual(self.client.get(f"{URL}?limit=1")["ETag"], etag)   # another page, another tag
+
+        progress.record(self.user.id, [{"file_id": user_file.pk, "progress": 30.0}])
+        response = self.client.get(URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+
+        self.upload_many(1)
+        self.assertEqual(self.client.get(URL, HTTP_IF_NONE_MATCH=etag).status_code, 200)
@@ -0,0 +1,107 @@
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import override_settings
+
+from library import progress
+from library.models import UserReadingData
+from library.tests import MediaTestCase
+
+
+class ProgressBufferTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        progress._cache().clear()
+        self.user_file = self.upload(b"%PDF progress")
+
+    def test_last_writer_wins(self):
+        file_id = self.user_file.pk
+        progress.record(self.user.id, [{"file_id": file_id, "progress": 40.0, "ts": 2000}])
+        progress.record(self.user.id, [{"file_id": file_id, "progress": 10.0, "ts": 1000}])   # arrives late
+        self.assertEqual(progress.buffered(self.user.id)[file_id]["progress"], 40.0)
+
+        progress.record(self.user.id, [{"file_id": file_id, "pdf_page": 7, "ts": 3000}])
+        self.assertEqual(progress.buffered(self.user.id)[file_id], {"progress": 40.0, "pdf_page": 7, "ts": 3000})
+
+        # Updates in one batch apply in order; an update without ts always wins.
+        progress.record(self.user.id, [
+            {"file_id": file_id, "progress": 50.0},
+            {"file_id": file_id, "progress": 55.0},
+        ])
+        self.assertEqual(progress.buffered(self.user.id)[file_id]["progress"], 55.0)
+
+    def test_flush_writes_and_clears_the_buffer(self):
+        other = self.upload(b"%PDF another", name="other.pdf")
+        UserReadingData.objects.create(user=self.user, file=self.user_file, progress=5.0, pdf_page=2)
+        progress.record(self.user.id, [
+            {"file_id": self.user_file.pk, "progress": 60.0},
+            {"file_id": other.pk, "pdf_page": 3},
+        ])
+
+        self.assertEqual(progress.flush(), 2)
+        rd = UserReadingData.objects.get(file=self.user_file)
+        self.assertEqual((rd.progress, rd.pdf_page), (60.0, 2))
+        self.assertEqual(UserReadingData.objects.get(file=other).pdf_page, 3)
+        self.assertEqual(progress.buffered(self.user.id), {})
+        self.assertEqual(progress.flush(), 0)
+
+    def test_flush_skips_deleted_files(self):
+        progress.record(self.user.id, [{"file_id": self.user_file.pk, "progress": 60.0}])
+        self.user_file.delete()
+        self.assertEqual(progress.flush(), 0)
+
+    def test_failed_flush_is_retried(self):
+        progress.record(self.user.id, [{"file_id": self.user_file.pk, "progress": 60.0}])
+        with mock.patch.object(UserReadingData.objects, "bulk_create", side_effect=RuntimeError("db down")):
+            with self.assertRaises(RuntimeError):
+                progress.flush()
+        self.assertEqual(progress.flush(), 1)
+        self.assertEqual(UserReadingData.objects.get().progress, 60.0)
+
+    def test_sync_endpoint_buffers_and_reads_overlay(self):
+        with override_settings(LIBRARY_PROGRESS_FLUSH_INTERVAL=3600):
+            progress.maybe_flush()   # start the interval, so the sync below only buffers
+            response = self.client.post("/api/library/progress/sync/", {"updates": [
+                {"file_id": self.user_file.pk, "progress": 75.0, "pdf_page": 9, "ts": 1},
+                {"file_id": 999999, "progress": 1.0},
+            ]}, format="json")
+        self.assertEqual(response.data, {"accepted": 1, "not_found": [999999]})
+        self.assertEqual(UserReadingData.objects.get().progress, 0.0)
+
+        data = self.client.get(f"/api/library/files/{self.user_file.pk}/data/").data
+        self.assertEqual((data["progress"], data["pdf_page"]), (75.0, 9))
+
+    def test_patch_discards_only_the_fields_it_wrote(self):
+        url = f"/api/library/files/{self.user_file.pk}/data/"
+        with override_settings(LIBRARY_PROGRESS_FLUSH_INTERVAL=3600):
+            progress.maybe_flush()   # start the interval, so nothing below is flushed
+            progress.record(self.user.id, [{"file_id": self.user_file.pk, "progress": 75.0, "pdf_page": 9, "ts": 1}])
+            data = self.client.patch(url, {"progress": 20.0, "bookmarked": True}, format="json").data
+        self.assertEqual((data["progress"], data["pdf_page"]), (20.0, 9))
+        self.assertEqual(progress.buffered(self.user.id)[self.user_file.pk], {"pdf_page": 9, "ts": 1})
+
+        progress.discard(self.user.id, self.user_file.pk, ["pdf_page"])
+        self.assertEqual(progress.buffered(self.user.id), {})
+
+    def test_reads_flush_the_buffer(self):
+        UserReadingData.objects.create(user=self.user, file=self.user_file)
+        progress.record(self.user.id, [{"file_id": self.user_file.pk, "progress": 40.0}])
+        self.client.get("/api/library/files/")
+        self.assertEqual(UserReadingData.objects.get().progress, 40.0)
+        self.assertEqual(progress.buffered(self.user.id), {})
+
+        progress._cache().delete(progress.PREFIX + "flushed")   # the interval is over
+        progress.record(self.user.id, [{"file_id": self.user_file.pk, "pdf_page": 4}])
+        self.assertEqual(self.client.get(f"/api/library/files/{self.user_file.pk}/data/").data["pdf_page"], 4)
+        self.assertEqual(UserReadingData.objects.get().pdf_page, 4)
+
+    @override_settings(CACHES={**settings.CACHES, "default": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache", "LOCATION": "django_cache",
+        "OPTIONS": {"MAX_ENTRIES": 10},
+    }})
+    def test_culling_the_default_cache_keeps_buffered_progress(self):
+        progress.record(self.user.id, [{"file_id": self.user_file.pk, "progress": 40.0}])
+        for i in range(30):
+            caches["default"].set(f"filler-{i}", i)
+        self.assertEqual(progress.flush(), 1)
@@ -0,0 +1,99 @@
+from django.test import RequestFactory, SimpleTestCase
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+
+from library import serving
+from library.tests import MediaTestCase, make_user
+
+
+class ParseRangeTests(SimpleTestCase):
+    def test_satisfiable_ranges(self):
+        cases = {
+            "bytes=0-99": [(0, 99)],
+            "bytes=500-": [(500, 999)],
+            "bytes=-100": [(900, 999)],
+            "bytes=-5000": [(0, 999)],
+            "bytes=990-2000": [(990, 999)],
+            "bytes=0-10,5-20,21-30,50-60": [(0, 30), (50, 60)],
+            "bytes=50-60, 0-9": [(0, 9), (50, 60)],
+        }
+        for header, ranges in cases.items():
+            with self.subTest(header=header):
+                self.assertEqual(serving.parse_range(header, 1000), ranges)
+
+    def test_unsatisfiable_ranges(self):
+        self.assertEqual(serving.parse_range("bytes=1000-", 1000), [])
+        self.assertEqual(serving.parse_range("bytes=-0", 1000), [])
+
+    def test_malformed_or_excessive_ranges_mean_the_whole_file(self):
+        too_many = "bytes=" + ",".join(f"{i * 10}-{i * 10 + 1}" for i in range(serving.MAX_RANGES + 1))
+        for header in ["", "items=0-1", "bytes=5-1", "bytes=a-b", "bytes=-", "bytes=0-1;2-3", too_many]:
+            with self.subTest(header=header):
+                self.assertIsNone(serving.parse_range(header, 1000))
+
+    def test_if_range(self):
+        factory = RequestFactory()
+        etag, mtime = '"abc"', 1_700_000_000
+        self.assertTrue(serving.if_range_passes(factory.get("/"), etag, mtime))
+        self.assertTrue(serving.if_range_passes(factory.get("/", HTTP_IF_RANGE='"abc"'), etag, mtime))
+        self.assertFalse(serving.if_range_passes(factory.get("/", HTTP_IF_RANGE='"old"'), etag, mtime))
+        self.assertFalse(serving.if_range_passes(factory.get("/", HTTP_IF_RANGE='W/"abc"'), etag, mtime))
+        self.assertTrue(serving.if_range_passes(factory.get("/", HTTP_IF_RANGE=http_date(mtime)), etag, mtime))
+        self.assertFalse(serving.if_range_passes(factory.get("/", HTTP_IF_RANGE=http_date(mtime - 60)), etag, mtime))
+
+
+class ServeTests(MediaTestCase):
+    data = b"%PDF-1.4 " + bytes(range(256)) * 4
+
+    def setUp(self):
+        super().setUp()
+        self.user_file = self.upload(self.data)
+        self.url = f"/api/library/files/{self.user_file.pk}/serve/"
+        self.etag = f'"{self.user_file.content_hash}"'
+
+    def test_whole_file_with_validators(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.getvalue(), self.data)
+        self.assertEqual(response["ETag"], self.etag)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+
+    def test_conditional_requests(self):
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=self.etag).status_code, 304)
+        last_modified = self.client.get(self.url)["Last-Modified"]
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MATCH='"other"').status_code, 412)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MATCH=self.etag).status_code, 200)
+
+    def test_single_range(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=4-13")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.getvalue(), self.data[4:14])
+        self.assertEqual(response["Content-Range"], f"bytes 4-13/{len(self.data)}")
+        self.assertEqual(response["Content-Length"], "10")
+
+    def test_multiple_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-3,100-103")
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response["Content-Type"].startswith("multipart/byteranges; boundary="))
+        body = response.getvalue()
+        self.assertEqual(int(response["Content-Length"]), len(body))
+        self.assertIn(self.data[0:4], body)
+        self.assertIn(f"Content-Range: bytes 100-103/{len(self.data)}".encode(), body)
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE=f"bytes={len(self.data)}-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(self.data)}")
+
+    def test_stale_if_range_sends_the_whole_file(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.getvalue(), self.data)
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE=self.etag)
+        self.assertEqual(response.status_code, 206)
+
+    def test_other_users_files_are_not_served(self):
+        client = APIClient()
+        client.force_authenticate(make_user())
+        self.assertEqual(client.get(self.url).status_code, 404)
@@ -0,0 +1,79 @@
+import hashlib
+import os
+
+from library import uploads
+from library.models import UploadSession, UserFile
+from library.tests import MediaTestCase
+
+
+class ChunkedUploadTests(MediaTestCase):
+    data = bytes(range(256)) * 40   # 10240 bytes
+
+    def start(self):
+        response = self.client.post("/api/library/uploads/", {"filename": "big.pdf", "size": len(self.data)},
+                                    format="json")
+        self.assertEqual(response.status_code, 201)
+        return f"/api/library/uploads/{response.data['id']}/"
+
+    def put(self, url, first, last):
+        return self.client.generic(
+            "PUT", url, self.data[first:last + 1], content_type="application/octet-stream",
+            HTTP_CONTENT_RANGE=f"bytes {first}-{last}/{len(self.data)}",
+        )
+
+    def test_resume_and_complete(self):
+        url = self.start()
+        self.assertEqual(self.put(url, 0, 4095).data["offset"], 4096)
+
+        # A retried chunk that no longer matches the offset is told where to resume.
+        response = self.put(url, 0, 4095)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data["offset"], 4096)
+        self.assertEqual(self.client.get(url).data["offset"], 4096)
+
+        response = self.client.post(url + "complete/")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data["offset"], 4096)
+
+        self.assertEqual(self.put(url, 4096, len(self.data) - 1).data["offset"], len(self.data))
+        response = self.client.post(url + "complete/")
+        self.assertEqual(response.status_code, 201)
+
+        user_file = UserFile.objects.get(pk=response.data["id"])
+        self.assertEqual(user_file.content_hash, hashlib.sha256(self.data).hexdigest())
+        with user_file.file.open("rb") as f:
+            self.assertEqual(f.read(), self.data)
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertFalse(os.listdir(os.path.join(self.media, "parts")))
+
+    def test_completes_in_a_worker_without_the_running_hash(self):
+        url = self.start()
+        self.put(url, 0, 4095)
+        uploads._hashers.clear()   # the next chunk lands in another process
+        self.put(url, 4096, len(self.data) - 1)
+        response = self.client.post(url + "complete/")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(UserFile.objects.get().content_hash, hashlib.sha256(self.data).hexdigest())
+
+    def test_rejects_ranges_outside_the_upload(self):
+        url = self.start()
+        response = self.client.generic("PUT", url, b"xx", content_type="application/octet-stream",
+                                       HTTP_CONTENT_RANGE="bytes 0-1/99")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.put(url, 0, 0).status_code, 200)
+        self.assertEqual(self.client.generic("PUT", url, b"x").status_code, 400)   # no Content-Range
+
+    def test_oversized_chunks_are_refused(self):
+        url = self.start()
+        with self.settings(LIBRARY_UPLOAD_CHUNK_BYTES=1024):
+            self.assertEqual(self.put(url, 0, 1024).status_code, 413)
+            self.assertEqual(self.put(url, 0, 1023).status_code, 200)
+
+    def test_abandoned_upload_is_removed(self):
+        url = self.start()
+        self.put(url, 0, 4095)
+        session = UploadSession.objects.get()
+        self.assertTrue(os.path.isfile(session.part_path))
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertFalse(os.path.exists(session.part_path))
+        self.assertEqual(self.client.get(url).status_code, 404)
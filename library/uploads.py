@@ -0,0 +1,185 @@
+"""
+Upload handling.
+
+Multipart uploads (POST /api/library/files/) are SHA-256'd while they are
+received by the handlers below (settings.FILE_UPLOAD_HANDLERS), so a stored
+upload never has to be read back just to find its blob — UserFile.save picks
+the digest up from ``uploaded_file.content_hash``.
+
+Large files use the resumable protocol instead (UploadSession):
+
+    POST   /api/library/uploads/                {"filename", "size"} → {"id", "offset": 0, "chunk_size"}
+    PUT    /api/library/uploads/<id>/           raw bytes, Content-Range: bytes <first>-<last>/<size>
+    GET    /api/library/uploads/<id>/           → {"offset": n, ...} — resume from there
+    POST   /api/library/uploads/<id>/complete/  → the new file
+
+Each chunk is streamed from the request straight onto the end of the part
+file, so memory stays flat whatever the file size. The running hash is kept
+in this process between chunks; if the next chunk lands in another worker
+(or after a restart) the part file is hashed once when the upload completes.
+"""
+
+import fcntl
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+from django.db.models import F
+from django.utils import timezone
+
+from .models import UploadSession, UserFile, hash_file
+
+READ_BLOCK = 64 * 1024
+MAX_HASHERS = 256   # sessions whose running hash is kept in this process
+
+
+class HashingMixin:
+    def new_file(self, *args, **kwargs):
+        self.digest = hashlib.sha256()
+        super().new_file(*args, **kwargs)   # may raise StopFutureHandlers
+
+    def receive_data_chunk(self, raw_data, start):
+        if getattr(self, "activated", True):
+            self.digest.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        uploaded = super().file_complete(file_size)
+        if uploaded is not None:
+            uploaded.content_hash = self.digest.hexdigest()
+        return uploaded
+
+
+class HashingMemoryFileUploadHandler(HashingMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(HashingMixin, TemporaryFileUploadHandler):
+    pass
+
+
+# ── resumable uploads ─────────────────────────────────────────────────────────
+class OffsetMismatch(Exception):
+    """The chunk doesn't start where the upload stands; ``offset`` says where it does."""
+
+    def __init__(self, offset: int):
+        super().__init__(f"Upload is at byte {offset}.")
+        self.offset = offset
+
+
+class UploadBusy(Exception):
+    """Another request is writing to the same upload."""
+
+
+_hashers = OrderedDict()   # session id → (offset, sha256)
+_hashers_lock = threading.Lock()
+
+
+def _take_hasher(session_id, offset: int):
+    """The running hash up to ``offset``, or None if this process doesn't have it."""
+    with _hashers_lock:
+        entry = _hashers.pop(session_id, None)
+    if entry is not None and entry[0] == offset:
+        return entry[1]
+    return hashlib.sha256() if offset == 0 else None
+
+
+def _keep_hasher(session_id, offset: int, hasher):
+    with _hashers_lock:
+        _hashers[session_id] = (offset, hasher)
+        while len(_hashers) > MAX_HASHERS:
+            _hashers.popitem(last=False)
+
+
+def _open_locked(path: str):
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    f = os.fdopen(fd, "r+b")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        f.close()
+        raise UploadBusy("Another chunk of this upload is being written.")
+    return f
+
+
+def prune_sessions():
+    """Deletes sessions idle for longer than LIBRARY_UPLOAD_SESSION_TTL (and their part files)."""
+    ttl = getattr(settings, "LIBRARY_UPLOAD_SESSION_TTL", 60 * 60 * 24)
+    stale = UploadSession.objects.filter(updated_at__lt=timezone.now() - timedelta(seconds=ttl))
+    for session in stale:
+        session.delete()
+
+
+def append(session, stream, start: int, length: int) -> int:
+    """
+    Writes up to ``length`` bytes read from ``stream`` at byte ``start`` of
+    the upload and returns its new offset. A short read (dropped connection)
+    keeps what arrived; the client resumes from the returned offset.
+    """
+    os.makedirs(os.path.dirname(session.part_path), exist_ok=True)
+    with _open_locked(session.part_path) as f:
+        offset = UploadSession.objects.values_list("offset", flat=True).get(pk=session.pk)
+        if start != offset:
+            raise OffsetMismatch(offset)
+        f.seek(start)
+        f.truncate()   # drop bytes a failed request wrote past the recorded offset
+        hasher = _take_hasher(session.pk, start)
+        received = 0
+        while received < length and stream is not None:
+            chunk = stream.read(min(READ_BLOCK, length - received))
+            if not chunk:
+                break
+            f.write(chunk)
+            if hasher is not None:
+                hasher.update(chunk)
+            received += len(chunk)
+        f.flush()
+
+        session.offset = start + received
+        UploadSession.objects.filter(pk=session.pk).update(
+            offset=F("offset") + received, updated_at=timezone.now(),
+        )
+        if hasher is not None:
+            _keep_hasher(session.pk, session.offset, hasher)
+    return session.offset
+
+
+class AssembledUpload(File):
+    """A completed part file; storage moves it into its blob instead of copying."""
+
+    def __init__(self, path: str, name: str, content_hash: str):
+        super().__init__(open(path, "rb"), name=name)
+        self.content_hash = content_hash
+        self._path = path
+
+    def temporary_file_path(self) -> str:
+        return self._path
+
+
+def complete(session) -> UserFile:
+    """Turns a fully received upload into a UserFile and deletes the session."""
+    with _open_locked(session.part_path) as f:
+        session.refresh_from_db()
+        if session.offset != session.size:
+            raise OffsetMismatch(session.offset)
+        hasher = _take_hasher(session.pk, session.offset)
+        content_hash = hasher.hexdigest() if hasher is not None else hash_file(f)
+
+        upload = AssembledUpload(session.part_path, session.filename, content_hash)
+        try:
+            user_file = UserFile.objects.create(
+                user=session.user,
+                title=session.title,
+                file=upload,
+                file_type=session.file_type,
+                size=session.size,
+            )
+        finally:
+            upload.close()
+    session.delete()   # the part file is gone (moved) or removed by signals.py
+    return user_file
@@ -4,6 +4,16 @@ from .views import (
     UserFileDetailView,
     UserFileServeView,
     UserReadingDataView,
+    HighlightListView,
+    HighlightDetailView,
+    NoteListView,
+    NoteDetailView,
+    ProgressSyncView,
+    UserFilePagesView,
+    UserFilePageTextView,
+    UploadSessionCreateView,
+    UploadSessionDetailView,
+    UploadSessionCompleteView,
 )
 
 urlpatterns = [
@@ -18,4 +28,34 @@ urlpatterns = [
 
     # Get / Update reading data (progress, highlights, notes, bookmarks)
     path("files/<int:pk>/data/", UserReadingDataView.as_view(), name="library-reading-data"),
+
+    # List / add highlights, one request per highlight
+    path("files/<int:pk>/highlights/", HighlightListView.as_view(), name="library-highlights"),
+
+    # Update / delete one highlight
+    path("files/<int:pk>/highlights/<int:item_id>/", HighlightDetailView.as_view(), name="library-highlight-detail"),
+
+    # List / add notes
+    path("files/<int:pk>/notes/", NoteListView.as_view(), name="library-notes"),
+
+    # Update / delete one note
+    path("files/<int:pk>/notes/<int:item_id>/", NoteDetailView.as_view(), name="library-note-detail"),
+
+    # Save the reading position of many files in one request (write-behind)
+    path("progress/sync/", ProgressSyncView.as_view(), name="library-progress-sync"),
+
+    # Page count of the server-side extracted text (202 while extraction runs)
+    path("files/<int:pk>/pages/", UserFilePagesView.as_view(), name="library-file-pages"),
+
+    # Text of one page, without re-parsing the document
+    path("files/<int:pk>/pages/<int:number>/text/", UserFilePageTextView.as_view(), name="library-file-page-text"),
+
+    # Start a resumable (chunked) upload
+    path("uploads/", UploadSessionCreateView.as_view(), name="library-uploads"),
+
+    # Upload status / PUT one chunk / abandon
+    path("uploads/<uuid:pk>/", UploadSessionDetailView.as_view(), name="library-upload-detail"),
+
+    # Turn the finished upload into a library file
+    path("uploads/<uuid:pk>/complete/", UploadSessionCompleteView.as_view(), name="library-upload-complete"),
 ]
@@ -1,24 +1,58 @@
-import mimetypes
+import hashlib
 import os
+import re
 
-from django.http import FileResponse, Http404
+from django.conf import settings
+from django.db.models import Count, Max, Prefetch
+from django.http import Http404
+from django.utils.http import parse_etags
 from rest_framework import status
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
 
-from .models import UserFile, UserReadingData
+from ai_features import extraction, jobs
+from . import progress, serving, uploads
+from .models import Highlight, Note, UploadSession, UserFile, UserReadingData
+from .pagination import paginate, parse_limit
 from .serializers import (
+    HighlightSerializer,
+    NoteSerializer,
+    ProgressSyncSerializer,
+    UploadSessionSerializer,
     UserFileSerializer,
     UserFileUploadSerializer,
     UserReadingDataSerializer,
 )
 
+CONTENT_RANGE = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+
+
+def _library_etag(request) -> str:
+    """
+    Weak ETag for the user's file listing: two aggregate queries that change
+    whenever a file is added or removed or any reading data is saved, plus
+    the user's buffered progress.
+    """
+    files = UserFile.objects.filter(user=request.user).aggregate(
+        count=Count("id"), last_id=Max("id"), last_upload=Max("uploaded_at"),
+    )
+    reading = UserReadingData.objects.filter(user=request.user).aggregate(
+        count=Count("id"), last_update=Max("updated_at"),
+    )
+    # file_url is absolute and the page depends on the query, so both are part of the tag.
+    buffered = sorted(progress.buffered(request.user.id).items())
+    version = f"{files}|{reading}|{buffered}|{request.get_host()}|{request.get_full_path()}"
+    return f'W/"{hashlib.sha256(version.encode()).hexdigest()[:32]}"'
+
 
 class UserFileListCreateView(APIView):
     """
     GET  /api/library/files/   — list current user's files
+         ?limit=<n>&cursor=<c>  — one page: {"results": [...], "next": <url or null>}
+         If-None-Match          — 304 when the library hasn't changed
     POST /api/library/files/   — upload a new file (multipart/form-data)
     """
 
@@ -26,9 +60,39 @@ class UserFileListCreateView(APIView):
     parser_classes = [MultiPartParser, FormParser]
 
     def get(self, request):
-        files = UserFile.objects.filter(user=request.user)
-        serializer = UserFileSerializer(files, many=True, context={"request": request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        progress.maybe_flush()   # buffered progress is written on reads too, not only on syncs
+        etag = _library_etag(request)
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            response["ETag"] = etag
+            return response
+
+        files = UserFile.objects.filter(user=request.user).order_by("-uploaded_at", "-id").prefetch_related(
+            Prefetch(
+                "reading_data",
+                queryset=UserReadingData.objects.filter(user=request.user),
+                to_attr="user_reading_data",
+            ),
+            Prefetch("highlights", queryset=Highlight.objects.filter(user=request.user), to_attr="user_highlights"),
+            Prefetch("notes", queryset=Note.objects.filter(user=request.user), to_attr="user_notes"),
+        )
+        context = {"request": request, "progress": progress.buffered(request.user.id)}
+
+        params = request.query_params
+        if "cursor" in params or "limit" in params:
+            page, next_cursor = paginate(files, params.get("cursor"), parse_limit(params.get("limit")))
+            data = {
+                "results": UserFileSerializer(page, many=True, context=context).data,
+                "next": replace_query_param(request.build_absolute_uri(), "cursor", next_cursor)
+                if next_cursor else None,
+            }
+        else:
+            data = UserFileSerializer(files, many=True, context=context).data
+
+        response = Response(data, status=status.HTTP_200_OK)
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, no-cache"   # always revalidate
+        return response
 
     def post(self, request):
         serializer = UserFileUploadSerializer(
@@ -70,7 +134,9 @@ class UserFileServeView(APIView):
     """
     GET /api/library/files/<pk>/serve/
     Streams the actual file bytes to the authenticated user.
-    The browser / pdf.js fetches this with the JWT Authorization header.
+    The browser / pdf.js fetches this with the JWT Authorization header,
+    and may ask for byte ranges and revalidate with ETag / Last-Modified
+    (see serving.py).
     """
 
     permission_classes = [IsAuthenticated]
@@ -87,19 +153,15 @@ class UserFileServeView(APIView):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        mime_type, _ = mimetypes.guess_type(user_file.file.name)
-        mime_type = mime_type or "application/octet-stream"
-
-        response = FileResponse(
-            open(user_file.file.path, "rb"),
-            content_type=mime_type,
-        )
-        response["Content-Disposition"] = (
-            f'inline; filename="{os.path.basename(user_file.file.name)}"'
-        )
+        response = serving.serve(request, user_file)
         # Allow pdf.js (running on file://) to read the response
         response["Access-Control-Allow-Origin"] = "*"
-        response["Access-Control-Allow-Headers"] = "Authorization, Content-Type"
+        response["Access-Control-Allow-Headers"] = (
+            "Authorization, Content-Type, Range, If-Range, If-None-Match, If-Modified-Since"
+        )
+        response["Access-Control-Expose-Headers"] = (
+            "Accept-Ranges, Content-Range, Content-Length, ETag, Last-Modified"
+        )
         return response
 
 
@@ -108,6 +170,9 @@ class UserReadingDataView(APIView):
     GET  /api/library/files/<pk>/data/  — get reading data for a file
     PATCH /api/library/files/<pk>/data/ — update progress, highlights, notes, etc.
     Creates the record automatically if it doesn't exist yet.
+    Highlights / notes sent here replace the whole list; to add, change or
+    remove one, use the item endpoints below. Frequent progress saves should
+    go to POST /api/library/progress/sync/ instead.
     """
 
     permission_classes = [IsAuthenticated]
@@ -120,10 +185,12 @@ class UserReadingDataView(APIView):
 
     def get(self, request, pk):
         user_file = self._get_file(pk, request.user)
+        progress.maybe_flush()
         rd, _ = UserReadingData.objects.get_or_create(
             user=request.user, file=user_file
         )
-        return Response(UserReadingDataSerializer(rd).data)
+        data = UserReadingDataSerializer(rd).data
+        return Response(progress.overlay(data, progress.buffered(request.user.id).get(user_file.id)))
 
     def patch(self, request, pk):
         user_file = self._get_file(pk, request.user)
@@ -133,5 +200,284 @@ class UserReadingDataView(APIView):
         serializer = UserReadingDataSerializer(rd, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
+            written = [field for field in progress.FIELDS if field in serializer.validated_data]
+            if written:
+                progress.discard(request.user.id, user_file.id, written)   # this write is newer
+            return Response(progress.overlay(
+                serializer.data, progress.buffered(request.user.id).get(user_file.id),
+            ))
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ProgressSyncView(APIView):
+    """
+    POST /api/library/progress/sync/
+         {"updates": [{"file_id", "progress"?, "pdf_page"?, "ts"?}, ...]}
+    Saves the reading position of many files at once. Updates are buffered
+    and written to the database in bulk every few seconds (progress.py);
+    reads see them straight away. Unknown file ids come back in "not_found".
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = ProgressSyncSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        updates = serializer.validated_data["updates"]
+        requested = {update["file_id"] for update in updates}
+        owned = set(UserFile.objects.filter(user=request.user, id__in=requested).values_list("id", flat=True))
+        # Reading data exists from a file's first sync on, so reads always have a row to overlay.
+        missing = owned - set(UserReadingData.objects.filter(user=request.user, file_id__in=owned)
+                              .values_list("file_id", flat=True))
+        if missing:
+            UserReadingData.objects.bulk_create(
+                [UserReadingData(user=request.user, file_id=file_id) for file_id in missing],
+                ignore_conflicts=True,
+            )
+        progress.record(request.user.id, [update for update in updates if update["file_id"] in owned])
+        progress.maybe_flush()
+        return Response({"accepted": len(owned), "not_found": sorted(requested - owned)})
+
+
+class _ReadingItemsView(APIView):
+    """Shared by the highlight and note endpoints; subclasses set the serializer."""
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = None
+
+    @property
+    def model(self):
+        return self.serializer_class.Meta.model
+
+    def get_file(self, pk, user):
+        try:
+            return UserFile.objects.get(pk=pk, user=user)
+        except UserFile.DoesNotExist:
+            raise Http404
+
+    def get_item(self, pk, item_id, user):
+        try:
+            return self.model.objects.select_related("file").get(pk=item_id, file_id=pk, user=user)
+        except self.model.DoesNotExist:
+            raise Http404
+
+
+class _ReadingItemListView(_ReadingItemsView):
+    def get(self, request, pk):
+        user_file = self.get_file(pk, request.user)
+        items = self.model.objects.filter(user=request.user, file=user_file)
+        return Response(self.serializer_class(items, many=True).data)
+
+    def post(self, request, pk):
+        user_file = self.get_file(pk, request.user)
+        serializer = self.serializer_class(data=request.data)
+        if serializer.is_valid():
+            serializer.save(user=request.user, file=user_file)
+            UserReadingData.touch(request.user, user_file)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class _ReadingItemDetailView(_ReadingItemsView):
+    def patch(self, request, pk, item_id):
+        item = self.get_item(pk, item_id, request.user)
+        serializer = self.serializer_class(item, data=request.data, partial=True)
+        if serializer.is_valid():
+            serializer.save()
+            UserReadingData.touch(request.user, item.file)
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    def delete(self, request, pk, item_id):
+        item = self.get_item(pk, item_id, request.user)
+        item.delete()
+        UserReadingData.touch(request.user, item.file)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class HighlightListView(_ReadingItemListView):
+    """
+    GET  /api/library/files/<pk>/highlights/ — the file's highlights, with their ids
+    POST /api/library/files/<pk>/highlights/ — add one {client_id?, cls?, text, ts?}
+    """
+
+    serializer_class = HighlightSerializer
+
+
+class HighlightDetailView(_ReadingItemDetailView):
+    """
+    PATCH  /api/library/files/<pk>/highlights/<id>/ — change one highlight
+    DELETE /api/library/files/<pk>/highlights/<id>/ — remove it
+    """
+
+    serializer_class = HighlightSerializer
+
+
+class NoteListView(_ReadingItemListView):
+    """
+    GET  /api/library/files/<pk>/notes/ — the file's notes, with their ids
+    POST /api/library/files/<pk>/notes/ — add one {text, quote?, ts?}
+    """
+
+    serializer_class = NoteSerializer
+
+
+class NoteDetailView(_ReadingItemDetailView):
+    """
+    PATCH  /api/library/files/<pk>/notes/<id>/ — change one note
+    DELETE /api/library/files/<pk>/notes/<id>/ — remove it
+    """
+
+    serializer_class = NoteSerializer
+
+
+class UserFilePagesView(APIView):
+    """
+    GET /api/library/files/<pk>/pages/
+    Page count of the file's server-side extracted text. While extraction is
+    still queued or running the response is 202 with the job's status.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        try:
+            user_file = UserFile.objects.get(pk=pk, user=request.user)
+        except UserFile.DoesNotExist:
+            raise Http404
+
+        pages = extraction.page_count(user_file)
+        if pages is not None:
+            return Response({"id": user_file.id, "pages": pages, "status": "ready"})
+        return _not_extracted(user_file)
+
+
+class UserFilePageTextView(APIView):
+    """
+    GET /api/library/files/<pk>/pages/<n>/text/
+    Text of page n (1-based) from the extracted text store — no need to
+    download and parse the whole document on the client.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk, number):
+        try:
+            user_file = UserFile.objects.get(pk=pk, user=request.user)
+        except UserFile.DoesNotExist:
+            raise Http404
+
+        try:
+            text = extraction.page_text(user_file, number)
+        except IndexError as e:
+            return Response({"error": str(e)}, status=status.HTTP_404_NOT_FOUND)
+        if text is None:
+            return _not_extracted(user_file)
+
+        response = Response({"id": user_file.id, "page": number, "text": text})
+        response["Cache-Control"] = "private, max-age=86400"   # a file's pages never change
+        return response
+
+
+def _not_extracted(user_file):
+    """202 while the extract job is pending (queuing one if needed), 422 if it failed or was skipped."""
+    payload, code = jobs.extraction_pending(user_file)
+    return Response({"id": user_file.id, **payload}, status=code)
+
+
+class UploadSessionCreateView(APIView):
+    """
+    POST /api/library/uploads/  {"filename": "...", "size": n, "title"?: "..."}
+    Starts a resumable upload for files too large for one request
+    (protocol in uploads.py).
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        uploads.prune_sessions()
+        serializer = UploadSessionSerializer(data=request.data, context={"request": request})
+        if serializer.is_valid():
+            serializer.save()
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class UploadSessionDetailView(APIView):
+    """
+    GET    /api/library/uploads/<id>/ — bytes received so far (resume from "offset")
+    PUT    /api/library/uploads/<id>/ — one chunk as the raw body, with
+           Content-Range: bytes <first>-<last>/<size>; 409 + "offset" if it
+           doesn't start where the upload stands
+    DELETE /api/library/uploads/<id>/ — abandon the upload
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get_object(self, pk, user):
+        try:
+            return UploadSession.objects.get(pk=pk, user=user)
+        except UploadSession.DoesNotExist:
+            raise Http404
+
+    def get(self, request, pk):
+        session = self.get_object(pk, request.user)
+        return Response(UploadSessionSerializer(session).data)
+
+    def put(self, request, pk):
+        session = self.get_object(pk, request.user)
+        match = CONTENT_RANGE.match(request.headers.get("Content-Range", ""))
+        if not match:
+            return Response({"error": "Content-Range: bytes <first>-<last>/<size> is required."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        first, last, size = map(int, match.groups())
+        length = last - first + 1
+        if size != session.size or length < 1 or last >= size:
+            return Response({"error": f"Range must lie within the {session.size}-byte upload."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        limit = getattr(settings, "LIBRARY_UPLOAD_CHUNK_BYTES", 8 * 1024 * 1024)
+        if length > limit:
+            return Response({"error": f"Chunks are limited to {limit} bytes."},
+                            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        try:
+            offset = uploads.append(session, request.stream, first, length)
+        except uploads.OffsetMismatch as e:
+            return Response({"error": str(e), "offset": e.offset}, status=status.HTTP_409_CONFLICT)
+        except uploads.UploadBusy as e:
+            return Response({"error": str(e), "offset": session.offset}, status=status.HTTP_409_CONFLICT)
+        return Response({"id": session.id, "offset": offset, "size": session.size})
+
+    def delete(self, request, pk):
+        self.get_object(pk, request.user).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UploadSessionCompleteView(APIView):
+    """
+    POST /api/library/uploads/<id>/complete/
+    Stores the fully received upload as a library file (same response as
+    POST /api/library/files/).
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        try:
+            session = UploadSession.objects.get(pk=pk, user=request.user)
+        except UploadSession.DoesNotExist:
+            raise Http404
+
+        try:
+            user_file = uploads.complete(session)
+        except uploads.OffsetMismatch as e:
+            return Response({"error": f"Only {e.offset} of {session.size} bytes have been received.",
+                             "offset": e.offset}, status=status.HTTP_409_CONFLICT)
+        except uploads.UploadBusy as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        return Response(
+            UserFileSerializer(user_file, context={"request": request}).data,
+            status=status.HTTP_201_CREATED,
+        )
@@ -1,21 +1,34 @@
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from deep_translator import GoogleTranslator
 
-@api_view(['POST'])
-@permission_classes([IsAuthenticated])
-def translate_text(request):
-    text = request.data.get('text', '')
-    target_lang = request.data.get('target', 'kn')
-
-    if not text:
-        return Response({'error': 'No text provided'}, status=status.HTTP_400_BAD_REQUEST)
-        
-    try:
-        # Use deep-translator to convert English to target
-        translated = GoogleTranslator(source='auto', target=target_lang).translate(text)
-        return Response({'translated_text': translated})
-    except Exception as e:
-        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+from ai_features.throttling import ThrottledViewMixin
+
+
+class TranslateView(ThrottledViewMixin, APIView):
+    """
+    POST /api/translator/translate/
+    Rate-limited per user and globally (AI_THROTTLE_RATES["translate"]) so
+    one client cannot spend the whole translation quota.
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_scope = "translate"
+
+    def post(self, request):
+        text = request.data.get('text', '')
+        target_lang = request.data.get('target', 'kn')
+
+        if not text:
+            return Response({'error': 'No text provided'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # Use deep-translator to convert English to target
+            translated = GoogleTranslator(source='auto', target=target_lang).translate(text)
+            return Response({'translated_text': translated})
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+translate_text = TranslateView.as_view()